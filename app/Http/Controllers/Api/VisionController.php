@@ -11,12 +11,18 @@
 class VisionController extends Controller
 {
     private $visionServiceUrl;
+    private $visionServiceSocket;
     private $confidenceThreshold;
     private $timeout;
 
     public function __construct()
     {
         $this->visionServiceUrl = env('VISION_SERVICE_URL', 'http://localhost:5000');
+        // Unix socket of a vision service on the same machine (its VISION_UDS); skips loopback TCP
+        $this->visionServiceSocket = env('VISION_SERVICE_SOCKET');
+        if ($this->visionServiceSocket) {
+            $this->visionServiceUrl = 'http://localhost';
+        }
         $this->confidenceThreshold = env('VISION_CONFIDENCE_THRESHOLD', 0.60);
         $this->timeout = 10; // 10 seconds timeout
     }
@@ -27,7 +33,8 @@ public function __construct()
     public function detectProduct(Request $request)
     {
         $request->validate([
-            'image' => 'required|string'
+            'image' => 'required|string',
+            'priority' => 'nullable|in:interactive,background'
         ]);
 
         try {
@@ -39,9 +46,15 @@ public function detectProduct(Request $request)
             ]);
 
             // Call YOLO11 vision service
-            $response = Http::timeout($this->timeout)
+            // Tell the vision service how long we will wait so it can drop stale frames
+            $response = $this->visionHttp($this->timeout)
+                ->withHeaders([
+                    'X-Request-Timeout-Ms' => $this->timeout * 1000,
+                    'Accept-Encoding' => 'gzip',
+                ])
                 ->post("{$this->visionServiceUrl}/detect", [
-                    'image' => $imageData
+                    'image' => $imageData,
+                    'priority' => $request->input('priority', 'interactive')
                 ]);
 
             if (!$response->successful()) {
@@ -135,7 +148,7 @@ public function detectProduct(Request $request)
     public function healthCheck()
     {
         try {
-            $response = Http::timeout(5)->get("{$this->visionServiceUrl}/health");
+            $response = $this->visionHttp(5)->get("{$this->visionServiceUrl}/health");
             
             $data = $response->json();
             
@@ -143,6 +156,7 @@ public function healthCheck()
                 'vision_service' => $response->successful() ? 'online' : 'offline',
                 'status_code' => $response->status(),
                 'url' => $this->visionServiceUrl,
+                'socket' => $this->visionServiceSocket,
                 'model_loaded' => $data['model_loaded'] ?? false,
                 'yolo_version' => $data['yolo_version'] ?? 'unknown',
                 'timestamp' => $data['timestamp'] ?? now()
@@ -153,6 +167,7 @@ public function healthCheck()
                 'vision_service' => 'offline',
                 'error' => $e->getMessage(),
                 'url' => $this->visionServiceUrl,
+                'socket' => $this->visionServiceSocket,
                 'message' => 'Vision service not reachable. Manual entry still available.'
             ], 503);
         }
@@ -164,7 +179,7 @@ public function healthCheck()
     public function getSupportedProducts()
     {
         try {
-            $response = Http::timeout(5)->get("{$this->visionServiceUrl}/products");
+            $response = $this->visionHttp(5)->get("{$this->visionServiceUrl}/products");
             
             if ($response->successful()) {
                 return response()->json([
@@ -193,7 +208,7 @@ public function getSupportedProducts()
     public function getModelInfo()
     {
         try {
-            $response = Http::timeout(5)->get("{$this->visionServiceUrl}/model/info");
+            $response = $this->visionHttp(5)->get("{$this->visionServiceUrl}/model/info");
             
             if ($response->successful()) {
                 return response()->json([
@@ -216,6 +231,22 @@ public function getModelInfo()
         }
     }
 
+    /**
+     * HTTP client for the vision service, over its Unix socket when one is configured
+     */
+    private function visionHttp($timeout)
+    {
+        $http = Http::timeout($timeout);
+
+        if ($this->visionServiceSocket) {
+            $http = $http->withOptions([
+                'curl' => [CURLOPT_UNIX_SOCKET_PATH => $this->visionServiceSocket]
+            ]);
+        }
+
+        return $http;
+    }
+
     /**
      * Get products from database based on detections
      */
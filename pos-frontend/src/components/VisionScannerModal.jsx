@@ -109,7 +109,7 @@ const VisionScannerModal = ({ isOpen, onClose, onProductDetected, API_BASE }) =>
     return canvas.toDataURL('image/jpeg', 0.7);
   }, [isScanning]);
 
-  const detectProduct = useCallback(async (imageData) => {
+  const detectProduct = useCallback(async (imageData, priority = 'interactive') => {
     if (!imageData) return false;
 
     const now = Date.now();
@@ -123,7 +123,7 @@ const VisionScannerModal = ({ isOpen, onClose, onProductDetected, API_BASE }) =>
       const response = await fetch(`${API_BASE}/vision/detect`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ image: imageData })
+        body: JSON.stringify({ image: imageData, priority })
       });
 
       const result = await response.json();
@@ -200,7 +200,7 @@ const VisionScannerModal = ({ isOpen, onClose, onProductDetected, API_BASE }) =>
       if (!isScanning) {
         const frame = captureFrame();
         if (frame) {
-          const added = await detectProduct(frame);
+          const added = await detectProduct(frame, 'background');
           if (added) {
             stopAutoScanning();
           }
@@ -283,7 +283,7 @@ const VisionScannerModal = ({ isOpen, onClose, onProductDetected, API_BASE }) =>
   const manualScan = async () => {
     const frame = captureFrame();
     if (frame) {
-      const added = await detectProduct(frame);
+      const added = await detectProduct(frame, 'interactive');
       if (!added) {
         setTimeout(() => {
           if (!showSuggestions) {
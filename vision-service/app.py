@@ -12,19 +12,46 @@ Your 7 Products:
 - wings
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+import asyncio
 import base64
+import functools
+import json
+import math
+from concurrent.futures import ThreadPoolExecutor
+import os
+import time
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import logging
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Union
 import io
 from PIL import Image
 
+from barcode_reader import BarcodeReader
+from calibration import CalibrationTable
+from camera_stream import CameraStream
+from catalog import ProductCatalog
+from embeddings import VisualIndex, crop_box, embed_images
+from suggestions import SuggestionIndex
+from tiling import make_tiles, merge_full_frame, nms
+from inference_queue import (
+    DeadlineExceededError,
+    InferenceQueue,
+    QueueFullError,
+    PRIORITIES,
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+)
+from inference_router import CircuitBreaker, InferenceRouter
+from remote_inference import RemoteInferenceError, RoboflowClient
+from video_sources import SourceError
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -55,9 +82,117 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress responses for clients that send Accept-Encoding: gzip
+# (tiny auto-scan replies are not worth the CPU)
+CAMERA_EVENTS_PATH = "/camera/events"
+
+class StreamFriendlyGZipMiddleware(GZipMiddleware):
+    """GZip, except for the Server-Sent Events stream (compressing it would hold events back)"""
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] == CAMERA_EVENTS_PATH:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+app.add_middleware(StreamFriendlyGZipMiddleware, minimum_size=512)
+
 # ===== YOUR MODEL AND PRODUCTS =====
 MODEL_PATH = "my_model.pt"  # Your trained model
-CONFIDENCE_THRESHOLD = 0.5   # 50% confidence minimum
+CONFIDENCE_THRESHOLD = 0.5   # 50% confidence minimum (default for uncalibrated classes)
+
+# Detector backend - 'yolo' (my_model.pt) or 'fake' (see fake_detector.py)
+VISION_BACKEND = os.getenv("VISION_BACKEND", "yolo")
+FAKE_SEED = int(os.getenv("VISION_FAKE_SEED", "0"))
+FAKE_BATCH_LATENCY_MS = float(os.getenv("VISION_FAKE_LATENCY_MS", "50"))
+FAKE_IMAGE_LATENCY_MS = float(os.getenv("VISION_FAKE_IMAGE_LATENCY_MS", "0"))
+FAKE_SCRIPT = os.getenv("VISION_FAKE_SCRIPT")  # JSON file of scripted detections
+
+# Catalog snapshot - SQLite copy or JSON export of the Laravel products/product_units
+# tables. Without one, PRODUCT_DATABASE below is used as-is.
+CATALOG_SNAPSHOT = os.getenv("VISION_CATALOG_SNAPSHOT")
+CATALOG_CLASS_MAP = os.getenv("VISION_CLASS_MAP")  # JSON {class_name: barcode}
+CATALOG_REFRESH_S = float(os.getenv("VISION_CATALOG_REFRESH_S", "30"))
+
+# Batch detection
+MAX_BATCH_IMAGES = int(os.getenv("VISION_MAX_BATCH_IMAGES", "32"))  # per request
+INFERENCE_BATCH_SIZE = int(os.getenv("VISION_INFERENCE_BATCH_SIZE", "8"))  # per model call
+DECODE_WORKERS = int(os.getenv("VISION_DECODE_WORKERS", "4"))
+
+# Tiled inference for dense trays/shelves - only used when a request asks for it
+TILE_SIZE = int(os.getenv("VISION_TILE_SIZE", "640"))
+TILE_OVERLAP = float(os.getenv("VISION_TILE_OVERLAP", "0.2"))
+TILE_MERGE_THRESHOLD = 0.5    # intersection over smaller box, for tile seams and big-item pieces
+TILE_INCLUDE_FULL_FRAME = True  # also run the downscaled full frame for items bigger than a tile
+
+# Basket mode - count every item in the frame
+BASKET_DEDUP_IOU = 0.7  # boxes overlapping this much are the same physical item
+AUTO_ADD_CONFIDENCE = 0.75  # default for uncalibrated classes
+
+# Per-class thresholds from calibrate_thresholds.py - replace the two
+# defaults above for every class the table covers
+CALIBRATION_PATH = os.getenv("VISION_CALIBRATION")
+
+# Fallback suggestions shown when a scan isn't confident
+SUGGESTION_LIMIT = int(os.getenv("VISION_SUGGESTION_LIMIT", "10"))
+
+# Visual suggestions - reference embeddings built by build_embeddings.py
+# (<prefix>.npy + <prefix>.json). Unset = category-based suggestions only.
+EMBEDDINGS_PATH = os.getenv("VISION_EMBEDDINGS")
+
+# Confusion table from build_confusion.py - classes the model mixes up
+# (e.g. ariel/wings/downy) are suggested right after the detected one
+CONFUSIONS_PATH = os.getenv("VISION_CONFUSIONS")
+CONFUSION_ALTERNATIVES = 3
+
+# Barcode stage (optional) - 'off', 'frame' (whole frame, in parallel with
+# inference) or 'boxes' (only inside detected boxes, after inference)
+BARCODE_MODES = ('off', 'frame', 'boxes')
+BARCODE_MODE = os.getenv("VISION_BARCODE_MODE", "off")
+BARCODE_WORKERS = int(os.getenv("VISION_BARCODE_WORKERS", "2"))
+# How long a finished detection waits for a still-running frame scan
+BARCODE_GRACE_S = float(os.getenv("VISION_BARCODE_GRACE_MS", "20")) / 1000
+
+# Inference queue - manual scans jump ahead of auto-scan frames
+INFERENCE_WORKERS = int(os.getenv("VISION_INFERENCE_WORKERS", "1"))
+BACKGROUND_MAX_SHARE = float(os.getenv("VISION_BACKGROUND_MAX_SHARE", "0.5"))
+MAX_PENDING_PER_CLASS = int(os.getenv("VISION_MAX_PENDING", "32"))
+
+# Remote fallback - hosted Roboflow model (or mock_remote.py for testing).
+# Frames still go to the local model first; the remote takes overflow when the
+# queue is full or the model errors, and optionally hedges slow local calls.
+REMOTE_ENDPOINT = os.getenv("VISION_REMOTE_ENDPOINT")  # unset = local only
+REMOTE_API_KEY = os.getenv("VISION_REMOTE_API_KEY", "")
+REMOTE_TIMEOUT_S = float(os.getenv("VISION_REMOTE_TIMEOUT_S", "5"))
+REMOTE_MAX_CONCURRENCY = int(os.getenv("VISION_REMOTE_MAX_CONCURRENCY", "4"))
+REMOTE_OVERLAP = 45  # Roboflow NMS overlap, percent
+HEDGE_PERCENTILE = float(os.getenv("VISION_HEDGE_PERCENTILE", "0")) or None  # e.g. 95; 0 = no hedging
+BREAKER_FAILURES = int(os.getenv("VISION_BREAKER_FAILURES", "5"))
+BREAKER_RESET_S = float(os.getenv("VISION_BREAKER_RESET_S", "30"))
+
+# Camera mode - the service owns a camera attached to this machine and pushes
+# confirmed detections over Server-Sent Events (GET /camera/events) instead of
+# receiving every frame over HTTP. Source specs are the ones yolo_detect.py takes.
+CAMERA_SOURCE = os.getenv("VISION_CAMERA_SOURCE")  # e.g. usb0; unset = off
+CAMERA_RESOLUTION = os.getenv("VISION_CAMERA_RESOLUTION")  # e.g. 640x480; unset = camera default
+CAMERA_MAX_FPS = float(os.getenv("VISION_CAMERA_MAX_FPS", "10"))
+CAMERA_CONFIRM_FRAMES = int(os.getenv("VISION_CAMERA_CONFIRM_FRAMES", "3"))  # frames in a row to confirm
+CAMERA_CLEAR_FRAMES = int(os.getenv("VISION_CAMERA_CLEAR_FRAMES", "5"))  # frames gone before re-announcing
+CAMERA_HEARTBEAT_S = 15.0  # keep-alive comment so proxies don't close an idle stream
+
+# Serving - TCP, a Unix domain socket, or both. When Laravel runs on the same
+# box, pointing it at the socket (VISION_SERVICE_SOCKET) skips loopback TCP.
+SERVE_HOST = os.getenv("VISION_HOST", "0.0.0.0")
+SERVE_PORT = int(os.getenv("VISION_PORT", "5000"))
+SERVE_TCP = os.getenv("VISION_TCP", "1") != "0"  # 0 = socket only
+SERVE_UDS = os.getenv("VISION_UDS")  # e.g. /run/vision/vision.sock; unset = TCP only
+SERVE_UDS_MODE = int(os.getenv("VISION_UDS_MODE", "660"), 8)  # PHP-FPM's group needs rw
+KEEPALIVE_S = float(os.getenv("VISION_KEEPALIVE_S", "75"))  # idle keep-alive; uvicorn's 5s drops pooled connections
+
+# Deadlines - Laravel gives up after 10s, so by default so do we
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+DEFAULT_REQUEST_BUDGET = float(os.getenv("VISION_REQUEST_BUDGET_S", "10"))
+MAX_REQUEST_BUDGET = float(os.getenv("VISION_MAX_REQUEST_BUDGET_S", "60"))  # longer client budgets are clamped
+DISCONNECT_POLL_INTERVAL = 0.1  # seconds between client-disconnect checks
 
 # YOUR 7 PRODUCTS - Update barcodes with your real ones!
 PRODUCT_DATABASE = {
@@ -106,12 +241,79 @@ PRODUCT_DATABASE = {
 }
 # ===================================
 
+catalog = ProductCatalog(
+    static=PRODUCT_DATABASE,
+    snapshot_path=CATALOG_SNAPSHOT,
+    class_map_path=CATALOG_CLASS_MAP,
+    refresh_interval=CATALOG_REFRESH_S,
+)
+
+# Rebuilt on every catalog change, so requests never scan the catalog
+suggestion_index = SuggestionIndex(max_k=SUGGESTION_LIMIT)
+catalog.add_listener(lambda c: suggestion_index.rebuild(c.items()))
+
 # Load model
 model = None
+visual_index = None
+confusion_table = {}  # predicted class -> likely true classes, most likely first
+calibration = CalibrationTable(CONFIDENCE_THRESHOLD, AUTO_ADD_CONFIDENCE)
+
+inference_queue = InferenceQueue(
+    workers=INFERENCE_WORKERS,
+    background_max_share=BACKGROUND_MAX_SHARE,
+    max_pending=MAX_PENDING_PER_CLASS,
+)
+
+remote_client = RoboflowClient(
+    REMOTE_ENDPOINT,
+    REMOTE_API_KEY,
+    timeout=REMOTE_TIMEOUT_S,
+    max_concurrency=REMOTE_MAX_CONCURRENCY,
+    max_retries=0,  # a fallback that retries only adds tail latency
+) if REMOTE_ENDPOINT else None
+
+router = InferenceRouter(
+    CircuitBreaker(failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_S),
+    hedge_percentile=HEDGE_PERCENTILE,
+)
+
+decode_executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix="decode")
+
+barcode_reader = BarcodeReader()
+barcode_executor = ThreadPoolExecutor(max_workers=BARCODE_WORKERS, thread_name_prefix="barcode")
+
+visual_stats = {
+    'searches': 0,
+    'skipped': 0,  # no time left after detection
+    'search_time': 0.0,
+}
+
+barcode_stats = {
+    'frames_scanned': 0,
+    'barcodes_read': 0,
+    'catalog_matches': 0,
+    'short_circuits': 0,  # barcode answered before the model finished
+    'scans_abandoned': 0,  # model finished first and the scan missed the grace period
+}
+
+# Work dropped because nobody would read the result
+cancellation_stats = {
+    'expired_on_arrival': 0,         # deadline already gone when the request arrived
+    'expired_in_queue': 0,           # deadline passed while waiting for a worker
+    'client_disconnected': 0,        # client left before inference started
+    'disconnected_during_inference': 0,  # client left mid-inference (compute wasted)
+}
 
 # Request/Response Models
 class DetectionRequest(BaseModel):
     image: str
+    priority: str = PRIORITY_INTERACTIVE  # 'interactive' (manual) or 'background' (auto-scan)
+    barcode: Optional[str] = None  # 'off', 'frame' or 'boxes'; defaults to VISION_BARCODE_MODE
+    tiled: bool = False  # split large frames into overlapping tiles (slower, finds small items)
+    tile_size: Optional[int] = None
+    tile_overlap: Optional[float] = None
+    basket: bool = False  # return cart lines with quantities instead of picking one product
+    slim: bool = False  # compact response: class ids, confidences and boxes only (see /catalog)
 
 class BoundingBox(BaseModel):
     x: float
@@ -127,6 +329,23 @@ class Detection(BaseModel):
     price: float
     category: str
     bbox: BoundingBox
+    unit_id: Optional[int] = None      # product_units.id when loaded from a snapshot
+    product_id: Optional[int] = None
+    unit_name: Optional[str] = None
+    stock: Optional[float] = None
+    source: str = "model"  # 'model', 'remote' or 'barcode'
+    calibrated_confidence: Optional[float] = None  # probability it's right, per-class calibrated
+
+class BasketLine(BaseModel):
+    class_name: str
+    product_name: str
+    barcode: str
+    unit_id: Optional[int] = None
+    price: float
+    quantity: int
+    line_total: float
+    min_confidence: float
+    needs_review: bool  # at least one box below the auto-add confidence
 
 class DetectionResponse(BaseModel):
     success: bool
@@ -136,14 +355,63 @@ class DetectionResponse(BaseModel):
     fallback: bool = False
     message: Optional[str] = None
     suggestions: Optional[List[dict]] = None
+    basket: Optional[List[BasketLine]] = None
+    basket_total: Optional[float] = None
+
+class SlimDetectionResponse(BaseModel):
+    """
+    Compact /detect reply for clients that cache /catalog
+
+    Each detection is [class_id, confidence, x, y, width, height]; class_id
+    indexes the /catalog class list for `catalog_version`. Barcode matches
+    for units the model has no class for are sent in full in `extra`.
+    """
+    success: bool
+    fallback: bool
+    catalog_version: int
+    detections: List[List[Union[int, float]]]
+    processing_time: float
+    extra: Optional[List[Detection]] = None
+
+class BatchDetectionRequest(BaseModel):
+    images: List[str]  # base64 encoded images
+    priority: str = PRIORITY_INTERACTIVE
+    tally: str = "none"  # 'none', 'max' (several angles of one basket) or 'sum' (separate photos)
+
+class TallyItem(BaseModel):
+    class_name: str
+    product_name: str
+    barcode: str
+    price: float
+    quantity: int
+    images: List[int]  # indexes of the images the product was seen in
+
+class BatchDetectionResponse(BaseModel):
+    success: bool
+    results: List[DetectionResponse]
+    processing_time: float
+    timestamp: str
+    tally: Optional[List[TallyItem]] = None
 
 # Helper Functions
 def load_model():
-    """Load your YOLO model"""
+    """Load your YOLO model (or the fake detector when VISION_BACKEND=fake)"""
     global model
     try:
-        logger.info(f"Loading model from: {MODEL_PATH}")
-        model = YOLO(MODEL_PATH)
+        if VISION_BACKEND == "fake":
+            from fake_detector import FakeDetector
+            logger.info(f"Loading fake detector (seed={FAKE_SEED}, latency={FAKE_BATCH_LATENCY_MS}ms)")
+            model = FakeDetector(
+                class_names=list(PRODUCT_DATABASE.keys()),
+                seed=FAKE_SEED,
+                batch_latency=FAKE_BATCH_LATENCY_MS / 1000,
+                image_latency=FAKE_IMAGE_LATENCY_MS / 1000,
+                script_path=FAKE_SCRIPT,
+            )
+        else:
+            from ultralytics import YOLO
+            logger.info(f"Loading model from: {MODEL_PATH}")
+            model = YOLO(MODEL_PATH)
         logger.info("✓ Model loaded successfully!")
         
         # Warm up
@@ -155,6 +423,42 @@ def load_model():
         logger.error(f"✗ Failed to load model: {e}")
         return False
 
+def load_visual_index():
+    """Memory-map the reference embeddings, if configured"""
+    global visual_index
+    if not EMBEDDINGS_PATH:
+        return
+    try:
+        visual_index = VisualIndex(EMBEDDINGS_PATH)
+    except Exception as e:
+        logger.error(f"✗ Visual suggestions disabled, could not load {EMBEDDINGS_PATH}: {e}")
+
+def load_calibration():
+    """Load per-class thresholds, if configured"""
+    global calibration
+    if not CALIBRATION_PATH:
+        return
+    try:
+        calibration = CalibrationTable.load(CALIBRATION_PATH, CONFIDENCE_THRESHOLD, AUTO_ADD_CONFIDENCE)
+    except Exception as e:
+        logger.error(f"✗ Using global thresholds, could not load {CALIBRATION_PATH}: {e}")
+
+def load_confusions():
+    """Load the per-class alternatives table, if configured"""
+    global confusion_table
+    if not CONFUSIONS_PATH:
+        return
+    try:
+        with open(CONFUSIONS_PATH) as f:
+            alternatives = json.load(f)['alternatives']
+        confusion_table = {
+            class_name: [a['class'] for a in ranked[:CONFUSION_ALTERNATIVES]]
+            for class_name, ranked in alternatives.items()
+        }
+        logger.info(f"✓ Confusion table for {len(confusion_table)} classes from {CONFUSIONS_PATH}")
+    except Exception as e:
+        logger.error(f"✗ Could not load confusion table {CONFUSIONS_PATH}: {e}")
+
 def decode_base64_image(base64_string: str) -> np.ndarray:
     """Convert base64 to OpenCV image"""
     try:
@@ -162,8 +466,16 @@ def decode_base64_image(base64_string: str) -> np.ndarray:
         if ',' in base64_string:
             base64_string = base64_string.split(',')[1]
         
-        # Decode
         img_data = base64.b64decode(base64_string)
+    except Exception as e:
+        logger.error(f"Error decoding image: {e}")
+        raise HTTPException(status_code=400, detail=f"Invalid image: {str(e)}")
+    
+    return decode_image_bytes(img_data)
+
+def decode_image_bytes(img_data: bytes) -> np.ndarray:
+    """Convert raw JPEG/PNG bytes to OpenCV image"""
+    try:
         img = Image.open(io.BytesIO(img_data))
         img = img.convert('RGB')
         img_array = np.array(img)
@@ -178,12 +490,15 @@ def decode_base64_image(base64_string: str) -> np.ndarray:
 
 def map_detection_to_product(class_name: str, confidence: float, bbox_coords) -> Optional[Detection]:
     """Map detection to product info"""
-    product_info = PRODUCT_DATABASE.get(class_name)
+    product_info = catalog.get(class_name)
     
     if not product_info:
         logger.warning(f"Unknown class: {class_name}")
         return None
     
+    if not calibration.keeps(class_name, confidence):
+        return None
+    
     x1, y1, x2, y2 = bbox_coords
     width = x2 - x1
     height = y2 - y1
@@ -202,21 +517,633 @@ def map_detection_to_product(class_name: str, confidence: float, bbox_coords) ->
             y=center_y,
             width=width,
             height=height
+        ),
+        unit_id=product_info.get('unit_id'),
+        product_id=product_info.get('product_id'),
+        unit_name=product_info.get('unit_name'),
+        stock=product_info.get('stock'),
+        calibrated_confidence=round(calibration.calibrate(class_name, confidence), 4)
+    )
+
+def product_suggestion(class_name: str) -> dict:
+    info = suggestion_index.info(class_name)
+    return {
+        'name': info['name'],
+        'barcode': info['barcode'],
+        'price': info['price'],
+        'category': info['category'],
+        'class': class_name,
+        'unit_id': info.get('unit_id')
+    }
+
+def get_all_products_suggestions(limit: int = SUGGESTION_LIMIT):
+    """Products for fallback, up to `limit`"""
+    return [product_suggestion(c) for c, _ in suggestion_index.browse(limit)]
+
+def ranked_suggestions(classes, limit: int) -> List[dict]:
+    """Suggestions for classes in order, skipping repeats and unknown classes"""
+    seen, suggestions = set(), []
+    for class_name in classes:
+        if len(suggestions) >= limit:
+            break
+        if class_name in seen or suggestion_index.info(class_name) is None:
+            continue
+        seen.add(class_name)
+        suggestions.append(product_suggestion(class_name))
+    return suggestions
+
+def get_similar_suggestions(class_name: str, limit: int = SUGGESTION_LIMIT):
+    """
+    The detected product first, then the classes it is most often confused
+    with, then related ones (same category, then brand)
+    """
+    if suggestion_index.info(class_name) is None:
+        return get_all_products_suggestions(limit)
+    similar = suggestion_index.similar(class_name, limit - 1, fill=True)
+    return ranked_suggestions(
+        [class_name, *confusion_table.get(class_name, ()), *(c for c, _ in similar)], limit
+    )
+
+def get_visual_suggestions(matches: List[str], detected: Optional[str] = None,
+                           limit: int = SUGGESTION_LIMIT):
+    """The detected product (if any) and its usual confusions, then visual matches best first"""
+    lead = [detected, *confusion_table.get(detected, ())] if detected else []
+    return ranked_suggestions([*lead, *matches], limit)
+
+def visual_search(img: np.ndarray, detections: List[Detection]) -> List[str]:
+    """
+    Products that look most like the detected crop, or the whole frame when
+    nothing was detected (called on an inference worker thread)
+    """
+    started = time.perf_counter()
+    if detections:
+        b = detections[0].bbox
+        img = crop_box(img, b.x - b.width / 2, b.y - b.height / 2, b.x + b.width / 2, b.y + b.height / 2)
+    
+    query = embed_images(model, [img])[0]
+    matches = visual_index.search(query, SUGGESTION_LIMIT + 1)
+    
+    visual_stats['searches'] += 1
+    visual_stats['search_time'] += time.perf_counter() - started
+    return [class_name for class_name, _ in matches if class_name in catalog]
+
+async def get_visual_matches(http_request: Request, deadline: float, priority: str,
+                             img: np.ndarray, detections: List[Detection]) -> Optional[List[str]]:
+    """Visual search for an unconfident scan; None to fall back to category suggestions"""
+    if visual_index is None or is_confident(detections) or len(detections) > 1:
+        return None
+    try:
+        return await run_on_queue(http_request, deadline, priority, visual_search, img, detections)
+    except HTTPException as e:
+        if e.status_code not in (503, 504):
+            raise
+        visual_stats['skipped'] += 1
+        return None
+    except Exception as e:
+        logger.error(f"Visual search failed: {e}")
+        return None
+
+def get_request_deadline(http_request: Request) -> float:
+    """Deadline for this request as a time.perf_counter() value"""
+    header = http_request.headers.get(DEADLINE_HEADER)
+    if header is None:
+        return time.perf_counter() + DEFAULT_REQUEST_BUDGET
+    
+    try:
+        budget_ms = float(header)
+    except ValueError:
+        budget_ms = None
+    # NaN never compares as passed and inf never expires
+    if budget_ms is None or not math.isfinite(budget_ms) or budget_ms < 0:
+        raise HTTPException(status_code=400, detail=f"Invalid {DEADLINE_HEADER}: {header}")
+    
+    return time.perf_counter() + min(budget_ms / 1000, MAX_REQUEST_BUDGET)
+
+async def run_on_queue(http_request: Request, deadline: float, priority: str, fn, *args,
+                       on_submit=None):
+    """
+    Run fn(*args) on the inference queue, dropping it if the client goes away
+
+    Queued work is cancelled as soon as the client disconnects; the queue
+    itself drops jobs whose deadline passes before a worker is free.
+    `on_submit(future)` is called with the queue's future once submitted.
+    """
+    try:
+        future = inference_queue.submit(fn, *args, priority=priority, deadline=deadline)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if on_submit is not None:
+        on_submit(future)
+    
+    waiter = asyncio.wrap_future(future)
+    
+    while True:
+        try:
+            done, _ = await asyncio.wait({waiter}, timeout=DISCONNECT_POLL_INTERVAL)
+        except asyncio.CancelledError:
+            # Answered some other way (e.g. barcode) - drop the frame if still queued
+            future.cancel()
+            raise
+        if done:
+            break
+        
+        if await http_request.is_disconnected():
+            if future.cancel():
+                cancellation_stats['client_disconnected'] += 1
+                logger.info("✗ Client disconnected - dropped queued frame")
+            else:
+                cancellation_stats['disconnected_during_inference'] += 1
+                logger.info("✗ Client disconnected during inference")
+            raise HTTPException(status_code=499, detail="Client disconnected")
+    
+    try:
+        return waiter.result()
+    except DeadlineExceededError as e:
+        cancellation_stats['expired_in_queue'] += 1
+        logger.info(f"✗ Deadline exceeded - {e}")
+        raise HTTPException(status_code=504, detail="Deadline exceeded before inference")
+
+def scan_barcodes(img: np.ndarray, boxes=None) -> list:
+    """Decode barcodes in the frame (or only inside boxes); never raises"""
+    try:
+        barcode_stats['frames_scanned'] += 1
+        if boxes is None:
+            return barcode_reader.decode(img)
+        return barcode_reader.decode_regions(img, boxes)
+    except Exception as e:
+        logger.warning(f"Barcode decode failed: {e}")
+        return []
+
+def match_barcodes(hits: list) -> List[Detection]:
+    """Catalog products for decoded barcodes, as full-confidence detections"""
+    barcode_stats['barcodes_read'] += len(hits)
+    
+    detections = []
+    seen = set()
+    for hit in hits:
+        product_info = catalog.get_by_barcode(hit.value)
+        if product_info is None or hit.value in seen:
+            continue
+        seen.add(hit.value)
+        
+        x1, y1, x2, y2 = hit.box
+        detections.append(Detection(
+            class_name=catalog.class_for_barcode(hit.value) or "barcode",
+            product_name=product_info['name'],
+            barcode=hit.value,
+            confidence=1.0,
+            price=product_info['price'],
+            category=product_info['category'],
+            bbox=BoundingBox(x=(x1 + x2) / 2, y=(y1 + y2) / 2, width=x2 - x1, height=y2 - y1),
+            unit_id=product_info.get('unit_id'),
+            product_id=product_info.get('product_id'),
+            unit_name=product_info.get('unit_name'),
+            stock=product_info.get('stock'),
+            source="barcode"
+        ))
+        logger.info(f"✓ Barcode: {product_info['name']} ({hit.value}, {hit.symbology})")
+    
+    barcode_stats['catalog_matches'] += len(detections)
+    return detections
+
+async def run_remote_inference(image_b64: str, deadline: float) -> List[Detection]:
+    """Detect on the remote backend, within what is left of the deadline"""
+    remaining = deadline - time.perf_counter()
+    if remaining <= 0:
+        raise HTTPException(status_code=504, detail="Deadline exceeded before inference")
+    
+    try:
+        result = await asyncio.wait_for(
+            remote_client.detect(image_b64, confidence=int(calibration.floor * 100), overlap=REMOTE_OVERLAP),
+            remaining
         )
+    except RemoteInferenceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    
+    detections = []
+    for p in result.get('predictions', []):
+        x, y, w, h = p['x'], p['y'], p['width'], p['height']
+        detection = map_detection_to_product(p['class'], float(p['confidence']), [x - w / 2, y - h / 2, x + w / 2, y + h / 2])
+        if detection:
+            detection.source = "remote"
+            detections.append(detection)
+    return detections
+
+def overflow_reason(error: BaseException) -> Optional[str]:
+    """Which local failures the remote should pick up"""
+    if isinstance(error, HTTPException):
+        return 'saturated' if error.status_code == 503 else None  # 499/504: nobody is waiting
+    return 'error'
+
+async def run_detection(http_request: Request, deadline: float, priority: str,
+                        infer, img: np.ndarray, image_b64: Optional[str] = None) -> List[Detection]:
+    """
+    Local inference queue, with remote overflow/hedging when configured
+
+    Only plain full-frame inference can go remote (pass `image_b64`).
+    """
+    if remote_client is None or image_b64 is None:
+        return await run_on_queue(http_request, deadline, priority, infer, img)
+    
+    detections, backend = await router.route(
+        local=lambda on_submit: run_on_queue(http_request, deadline, priority, infer, img, on_submit=on_submit),
+        remote=lambda: run_remote_inference(image_b64, deadline),
+        overflow_on=overflow_reason,
     )
+    if backend != 'local':
+        logger.info(f"↪ Served by {backend} backend")
+    return detections
 
-def get_all_products_suggestions():
-    """Return all products for fallback"""
-    return [
-        {
-            'name': info['name'],
-            'barcode': info['barcode'],
-            'price': info['price'],
-            'category': info['category'],
-            'class': class_name
-        }
-        for class_name, info in PRODUCT_DATABASE.items()
-    ]
+async def detect_with_barcode(http_request: Request, deadline: float, priority: str,
+                              img: np.ndarray, mode: str, infer=None,
+                              image_b64: Optional[str] = None) -> List[Detection]:
+    """
+    Run YOLO and the barcode stage on the same decoded frame
+
+    A barcode that matches the catalog wins outright: if it is read before
+    the model gets to the frame, the queued inference is cancelled. If the
+    model answers first, the scan gets BARCODE_GRACE_S to catch up before
+    the model's result is returned without it.
+    """
+    loop = asyncio.get_running_loop()
+    inference = asyncio.ensure_future(
+        run_detection(http_request, deadline, priority, infer or run_inference, img, image_b64)
+    )
+    
+    if mode == 'frame':
+        scan = loop.run_in_executor(barcode_executor, scan_barcodes, img)
+        await asyncio.wait({inference, scan}, return_when=asyncio.FIRST_COMPLETED)
+        
+        if not scan.done() and inference.exception() is None:
+            await asyncio.wait({scan}, timeout=BARCODE_GRACE_S)
+            if not scan.done():
+                scan.cancel()
+                barcode_stats['scans_abandoned'] += 1
+                return inference.result()
+        
+        try:
+            matched = match_barcodes(await scan)
+        except BaseException:
+            inference.cancel()
+            raise
+        
+        if matched:
+            if not inference.done():
+                inference.cancel()
+                barcode_stats['short_circuits'] += 1
+            elif not inference.cancelled():
+                inference.exception()  # retrieved, result no longer needed
+            return matched
+        
+        return await inference
+    
+    detections = await inference
+    
+    if mode == 'boxes' and detections:
+        boxes = [
+            (d.bbox.x - d.bbox.width / 2, d.bbox.y - d.bbox.height / 2,
+             d.bbox.x + d.bbox.width / 2, d.bbox.y + d.bbox.height / 2)
+            for d in detections
+        ]
+        matched = match_barcodes(
+            await loop.run_in_executor(barcode_executor, scan_barcodes, img, boxes)
+        )
+        if matched:
+            return matched
+    
+    return detections
+
+def run_inference(img: np.ndarray) -> List[Detection]:
+    """Run the model on one image (called on an inference worker thread)"""
+    results = model(img, conf=calibration.floor, verbose=False)
+    
+    detections = []
+    for result in results:
+        detections.extend(detections_from_result(result))
+    
+    return detections
+
+def run_inference_batch(imgs: List[np.ndarray]) -> List[List[Detection]]:
+    """Run the model once over several images; one detection list per image"""
+    results = model(imgs, conf=calibration.floor, verbose=False)
+    return [detections_from_result(result) for result in results]
+
+def run_tiled_inference(img: np.ndarray, tile_size: int, overlap: float) -> List[Detection]:
+    """
+    Run the model over overlapping tiles and merge boxes back together
+
+    All tiles (plus the full frame) go through the model in batches; tile
+    boxes are shifted into full-image coordinates and de-duplicated with
+    cross-tile NMS, then the full frame adds only items bigger than a tile.
+    """
+    h, w = img.shape[:2]
+    tiles = make_tiles(w, h, tile_size, overlap)
+    if len(tiles) == 1:
+        return run_inference(img)
+    
+    crops = [img[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    offsets = [(x1, y1) for x1, y1, _, _ in tiles]
+    if TILE_INCLUDE_FULL_FRAME:
+        crops.append(img)
+        offsets.append((0, 0))
+    
+    # Tile boxes and full-frame boxes are collected apart and merged differently
+    found = {'tiles': ([], [], []), 'full': ([], [], [])}
+    names = {}
+    for start in range(0, len(crops), INFERENCE_BATCH_SIZE):
+        results = model(crops[start:start + INFERENCE_BATCH_SIZE], conf=calibration.floor, verbose=False)
+        for n, ((off_x, off_y), result) in enumerate(zip(offsets[start:start + INFERENCE_BATCH_SIZE], results)):
+            names = result.names
+            if result.boxes is None:
+                continue
+            boxes, scores, class_ids = found['full' if start + n >= len(tiles) else 'tiles']
+            for box in result.boxes:
+                x1, y1, x2, y2 = box.xyxy[0].tolist()
+                boxes.append([x1 + off_x, y1 + off_y, x2 + off_x, y2 + off_y])
+                scores.append(float(box.conf[0]))
+                class_ids.append(int(box.cls[0]))
+    
+    def as_arrays(part):
+        boxes, scores, class_ids = found[part]
+        return (np.array(boxes, dtype=np.float32).reshape(-1, 4),
+                np.array(scores, dtype=np.float32),
+                np.array(class_ids, dtype=np.int64))
+    
+    tile_boxes, tile_scores, tile_classes = as_arrays('tiles')
+    full_boxes, full_scores, full_classes = as_arrays('full')
+    
+    keep = nms(tile_boxes, tile_scores, tile_classes, TILE_MERGE_THRESHOLD, metric='ios')
+    tile_boxes, tile_scores, tile_classes = tile_boxes[keep], tile_scores[keep], tile_classes[keep]
+    keep_tiles, keep_full = merge_full_frame(
+        tile_boxes, tile_classes, full_boxes, full_scores, full_classes, tile_size, TILE_MERGE_THRESHOLD
+    )
+    
+    merged = ([(tile_boxes[i], tile_scores[i], tile_classes[i]) for i in keep_tiles]
+              + [(full_boxes[i], full_scores[i], full_classes[i]) for i in keep_full])
+    merged.sort(key=lambda m: -m[1])
+    
+    logger.info(f"🧩 {len(tiles)} tiles: {len(found['tiles'][1]) + len(full_scores)} raw boxes → {len(merged)} after merge")
+    
+    detections = []
+    for box, score, class_id in merged:
+        detection = map_detection_to_product(names[int(class_id)], float(score), box.tolist())
+        if detection:
+            detections.append(detection)
+    
+    return detections
+
+def detections_from_result(result) -> List[Detection]:
+    """Map one model result to catalog detections"""
+    detections = []
+    boxes = result.boxes
+    
+    if boxes is not None and len(boxes) > 0:
+        for box in boxes:
+            confidence = float(box.conf[0])
+            class_id = int(box.cls[0])
+            
+            # Get class name from model
+            class_name = result.names[class_id]
+            
+            # Get bbox coordinates
+            x1, y1, x2, y2 = box.xyxy[0].tolist()
+            
+            # Map to product
+            detection = map_detection_to_product(
+                class_name, 
+                confidence,
+                [x1, y1, x2, y2]
+            )
+            
+            if detection:
+                detections.append(detection)
+                logger.info(
+                    f"✓ Detected: {detection.product_name} "
+                    f"({confidence*100:.1f}%)"
+                )
+    
+    return detections
+
+def dedupe_detections(detections: List[Detection]) -> List[Detection]:
+    """
+    Drop boxes that cover the same physical item
+
+    Class-agnostic, so one bottle predicted as both soy_sauce and
+    sukang_puti counts once (as the more confident class).
+    """
+    if len(detections) <= 1:
+        return detections
+    
+    boxes = np.array([
+        [d.bbox.x - d.bbox.width / 2, d.bbox.y - d.bbox.height / 2,
+         d.bbox.x + d.bbox.width / 2, d.bbox.y + d.bbox.height / 2]
+        for d in detections
+    ], dtype=np.float32)
+    scores = np.array([d.confidence for d in detections], dtype=np.float32)
+    keep = nms(boxes, scores, np.zeros(len(detections)), BASKET_DEDUP_IOU, metric='iou')
+    
+    return [detections[i] for i in keep]
+
+def build_basket_response(detections: List[Detection], processing_time: float) -> DetectionResponse:
+    """Group every detected item into cart lines with quantities and totals"""
+    detections = dedupe_detections(detections)
+    
+    lines = {}
+    for d in detections:
+        line = lines.get(d.class_name)
+        if line is None:
+            lines[d.class_name] = line = BasketLine(
+                class_name=d.class_name,
+                product_name=d.product_name,
+                barcode=d.barcode,
+                unit_id=d.unit_id,
+                price=d.price,
+                quantity=0,
+                line_total=0.0,
+                min_confidence=d.confidence,
+                needs_review=False
+            )
+        line.quantity += 1
+        line.line_total = round(line.price * line.quantity, 2)
+        line.min_confidence = min(line.min_confidence, d.confidence)
+        line.needs_review = line.needs_review or not should_auto_add(d)
+    
+    basket = sorted(lines.values(), key=lambda l: l.line_total, reverse=True)
+    total = round(sum(l.line_total for l in basket), 2)
+    
+    if not basket:
+        return DetectionResponse(
+            success=False,
+            detections=[],
+            processing_time=processing_time,
+            timestamp=datetime.now().isoformat(),
+            fallback=True,
+            message="No products detected. Please try again or use manual entry.",
+            suggestions=get_all_products_suggestions(),
+            basket=[],
+            basket_total=0.0
+        )
+    
+    items = sum(l.quantity for l in basket)
+    review = sum(1 for l in basket if l.needs_review)
+    return DetectionResponse(
+        success=True,
+        detections=detections,
+        processing_time=processing_time,
+        timestamp=datetime.now().isoformat(),
+        fallback=False,
+        message=f"🛒 {items} item(s), {len(basket)} product(s) - ₱{total:.2f}"
+                + (f" ({review} to confirm)" if review else ""),
+        basket=basket,
+        basket_total=total
+    )
+
+def build_tally(per_image: List[List[Detection]], mode: str) -> List[TallyItem]:
+    """
+    Merge per-image detections into one product count
+
+    'max' treats the images as angles of the same basket, so a product counts
+    as many times as the most it was seen in any single image. 'sum' treats
+    them as separate photos and adds the counts up.
+    """
+    counts = {}
+    for idx, detections in enumerate(per_image):
+        seen = {}
+        for d in detections:
+            seen[d.class_name] = seen.get(d.class_name, 0) + 1
+        
+        for class_name, n in seen.items():
+            entry = counts.setdefault(class_name, {'quantity': 0, 'images': []})
+            entry['quantity'] = max(entry['quantity'], n) if mode == 'max' else entry['quantity'] + n
+            entry['images'].append(idx)
+    
+    tally = []
+    for class_name, entry in counts.items():
+        info = catalog.get(class_name)
+        if info is None:
+            continue
+        tally.append(TallyItem(
+            class_name=class_name,
+            product_name=info['name'],
+            barcode=info['barcode'],
+            price=info['price'],
+            quantity=entry['quantity'],
+            images=entry['images']
+        ))
+    
+    return sorted(tally, key=lambda t: t.quantity, reverse=True)
+
+def should_auto_add(detection: Detection) -> bool:
+    """Barcode reads always; model detections above their class's auto-add threshold"""
+    return detection.source == "barcode" or calibration.is_auto_add(detection.class_name, detection.confidence)
+
+def is_confident(detections: List[Detection]) -> bool:
+    """Same success rule as build_detection_response"""
+    if len(detections) == 1:
+        return should_auto_add(detections[0])
+    return len(detections) > 1
+
+def build_slim_response(detections: List[Detection], processing_time: float) -> SlimDetectionResponse:
+    """Class ids, confidences and boxes only - names and prices come from /catalog"""
+    rows, extra = [], []
+    for d in detections:
+        class_id = catalog.class_id(d.class_name)
+        if class_id is None:
+            extra.append(d)
+            continue
+        rows.append([
+            class_id, round(d.confidence, 3),
+            round(d.bbox.x, 1), round(d.bbox.y, 1),
+            round(d.bbox.width, 1), round(d.bbox.height, 1)
+        ])
+    
+    success = is_confident(detections)
+    return SlimDetectionResponse(
+        success=success,
+        fallback=not success,
+        catalog_version=catalog.version,
+        detections=rows,
+        processing_time=round(processing_time, 4),
+        extra=extra or None
+    )
+
+def build_detection_response(detections: List[Detection], processing_time: float,
+                             visual_matches: Optional[List[str]] = None) -> DetectionResponse:
+    """
+    Turn detections into the response the POS frontend expects
+
+    `visual_matches` (class names from the visual index, best first) replace
+    the category-based suggestions when given.
+    """
+    if len(detections) == 0:
+        # No detection
+        return DetectionResponse(
+            success=False,
+            detections=[],
+            processing_time=processing_time,
+            timestamp=datetime.now().isoformat(),
+            fallback=True,
+            message="No products detected. Please try again or use manual entry.",
+            suggestions=(get_visual_suggestions(visual_matches) if visual_matches
+                         else get_all_products_suggestions())
+        )
+    
+    elif len(detections) == 1:
+        # Single detection
+        detection = detections[0]
+        
+        if should_auto_add(detection):
+            # High confidence - auto add
+            return DetectionResponse(
+                success=True,
+                detections=[detection],
+                processing_time=processing_time,
+                timestamp=datetime.now().isoformat(),
+                fallback=False,
+                message=f"✓ {detection.product_name} detected!"
+            )
+        else:
+            # Lower confidence - show suggestions
+            return DetectionResponse(
+                success=False,
+                detections=[detection],
+                processing_time=processing_time,
+                timestamp=datetime.now().isoformat(),
+                fallback=True,
+                message=f"Is this {detection.product_name}? ({(detection.calibrated_confidence or detection.confidence)*100:.0f}% confidence)",
+                suggestions=(get_visual_suggestions(visual_matches, detection.class_name) if visual_matches
+                             else get_similar_suggestions(detection.class_name))
+            )
+    
+    else:
+        # Multiple detections
+        return DetectionResponse(
+            success=True,
+            detections=detections,
+            processing_time=processing_time,
+            timestamp=datetime.now().isoformat(),
+            fallback=False,
+            message=f"Found {len(detections)} products. Select the correct one."
+        )
+
+# Camera mode
+def camera_event(detection: Detection) -> dict:
+    """What SSE subscribers get for a confirmed camera detection"""
+    return {
+        "type": "detection",
+        "detection": detection.model_dump(),
+        "auto_add": should_auto_add(detection),
+    }
+
+camera = CameraStream(
+    CAMERA_SOURCE,
+    detect=lambda img: inference_queue.submit(run_inference, img, priority=PRIORITY_BACKGROUND),
+    to_event=camera_event,
+    resolution=tuple(int(v) for v in CAMERA_RESOLUTION.split('x')) if CAMERA_RESOLUTION else None,
+    max_fps=CAMERA_MAX_FPS,
+    confirm_frames=CAMERA_CONFIRM_FRAMES,
+    clear_frames=CAMERA_CLEAR_FRAMES,
+) if CAMERA_SOURCE else None
 
 # API Endpoints
 @app.on_event("startup")
@@ -226,15 +1153,42 @@ async def startup_event():
     logger.info("🚀 Family Store Vision Service - Local Mode")
     logger.info("=" * 60)
     
+    catalog.start()
+    
     if not load_model():
         logger.error("Failed to load model! Check if my_model.pt exists")
     else:
-        logger.info(f"Products: {len(PRODUCT_DATABASE)}")
-        logger.info(f"Classes: {list(PRODUCT_DATABASE.keys())}")
+        load_calibration()
+        if remote_client is not None:
+            await remote_client.start()
+            logger.info(f"Remote fallback: {REMOTE_ENDPOINT} (hedging at p{HEDGE_PERCENTILE or '-'})")
+        load_visual_index()
+        load_confusions()
+        inference_queue.start()
+        if camera is not None:
+            try:
+                camera.start(asyncio.get_running_loop())
+            except SourceError as e:
+                logger.error(f"✗ Camera mode disabled: {e}")
+        logger.info(f"Products: {len(catalog)} (catalog v{catalog.version}, {catalog.source})")
+        logger.info(f"Classes: {catalog.keys()}")
         logger.info(f"Confidence threshold: {CONFIDENCE_THRESHOLD}")
         logger.info("=" * 60)
         logger.info("✓ Service ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop inference workers and catalog refresh, remove the Unix socket"""
+    if camera is not None:
+        camera.stop()
+    inference_queue.stop()
+    if remote_client is not None:
+        await remote_client.close()
+    barcode_executor.shutdown(wait=False)
+    decode_executor.shutdown(wait=False)
+    catalog.stop()
+    remove_uds_socket()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -242,9 +1196,10 @@ async def root():
         "service": "Family Store Vision API - Local",
         "version": "1.0.0",
         "model": MODEL_PATH,
+        "backend": VISION_BACKEND,
         "status": "online" if model is not None else "model not loaded",
-        "products": len(PRODUCT_DATABASE),
-        "classes": list(PRODUCT_DATABASE.keys())
+        "products": len(catalog),
+        "classes": catalog.keys()
     }
 
 @app.get("/health")
@@ -254,113 +1209,78 @@ async def health_check():
         "status": "healthy" if model is not None else "unhealthy",
         "model_loaded": model is not None,
         "model_path": MODEL_PATH,
+        "backend": VISION_BACKEND,
+        "catalog": catalog.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
-@app.post("/detect", response_model=DetectionResponse)
-async def detect_products(request: DetectionRequest):
+@app.post("/detect", response_model=Union[DetectionResponse, SlimDetectionResponse])
+async def detect_products(request: DetectionRequest, http_request: Request):
     """
     Main detection endpoint - works with your React frontend
+    
+    Send X-Request-Timeout-Ms to say how long the caller will wait; frames
+    that cannot be answered in time are dropped before inference.
     """
-    import time
     start_time = time.time()
     
     if model is None:
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    if request.priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority: {request.priority}")
+    
+    barcode_mode = request.barcode or BARCODE_MODE
+    if barcode_mode not in BARCODE_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid barcode mode: {barcode_mode}")
+    if not barcode_reader.available:
+        barcode_mode = 'off'
+    
+    infer = run_inference
+    if request.tiled:
+        tile_size = request.tile_size or TILE_SIZE
+        tile_overlap = TILE_OVERLAP if request.tile_overlap is None else request.tile_overlap
+        if tile_size < 64 or not 0 <= tile_overlap < 1:
+            raise HTTPException(status_code=400, detail="tile_size must be >= 64 and tile_overlap in [0, 1)")
+        infer = functools.partial(run_tiled_inference, tile_size=tile_size, overlap=tile_overlap)
+    
+    deadline = get_request_deadline(http_request)
+    if time.perf_counter() >= deadline:
+        cancellation_stats['expired_on_arrival'] += 1
+        raise HTTPException(status_code=504, detail="Deadline already exceeded")
+    
     try:
-        logger.info("📸 Processing detection request...")
+        logger.info(f"📸 Processing detection request ({request.priority})...")
         
-        # Decode image
-        img = decode_base64_image(request.image)
+        # Decode image off the event loop
+        loop = asyncio.get_running_loop()
+        img = await loop.run_in_executor(decode_executor, decode_base64_image, request.image)
         logger.info(f"Image size: {img.shape}")
         
-        # Run detection
-        results = model(img, conf=CONFIDENCE_THRESHOLD, verbose=False)
+        # Tiled frames need the local model; plain ones may go remote
+        image_b64 = None if request.tiled else request.image.split(',', 1)[-1]
         
-        # Process results
-        detections = []
-        
-        for result in results:
-            boxes = result.boxes
-            
-            if boxes is not None and len(boxes) > 0:
-                for box in boxes:
-                    confidence = float(box.conf[0])
-                    class_id = int(box.cls[0])
-                    
-                    # Get class name from model
-                    class_name = result.names[class_id]
-                    
-                    # Get bbox coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].tolist()
-                    
-                    # Map to product
-                    detection = map_detection_to_product(
-                        class_name, 
-                        confidence,
-                        [x1, y1, x2, y2]
-                    )
-                    
-                    if detection:
-                        detections.append(detection)
-                        logger.info(
-                            f"✓ Detected: {detection.product_name} "
-                            f"({confidence*100:.1f}%)"
-                        )
+        # Run detection on the inference queue (plus the barcode stage)
+        if barcode_mode == 'off':
+            detections = await run_detection(
+                http_request, deadline, request.priority, infer, img, image_b64
+            )
+        else:
+            detections = await detect_with_barcode(
+                http_request, deadline, request.priority, img, barcode_mode, infer, image_b64
+            )
         
         processing_time = time.time() - start_time
         logger.info(f"⏱ Processing time: {processing_time:.3f}s")
         
-        # Build response
-        if len(detections) == 0:
-            # No detection
-            return DetectionResponse(
-                success=False,
-                detections=[],
-                processing_time=processing_time,
-                timestamp=datetime.now().isoformat(),
-                fallback=True,
-                message="No products detected. Please try again or use manual entry.",
-                suggestions=get_all_products_suggestions()
-            )
-        
-        elif len(detections) == 1:
-            # Single detection
-            detection = detections[0]
-            
-            if detection.confidence >= 0.75:
-                # High confidence - auto add
-                return DetectionResponse(
-                    success=True,
-                    detections=[detection],
-                    processing_time=processing_time,
-                    timestamp=datetime.now().isoformat(),
-                    fallback=False,
-                    message=f"✓ {detection.product_name} detected!"
-                )
-            else:
-                # Lower confidence - show suggestions
-                return DetectionResponse(
-                    success=False,
-                    detections=[detection],
-                    processing_time=processing_time,
-                    timestamp=datetime.now().isoformat(),
-                    fallback=True,
-                    message=f"Is this {detection.product_name}? ({detection.confidence*100:.0f}% confidence)",
-                    suggestions=get_all_products_suggestions()
-                )
+        if request.basket:
+            return build_basket_response(detections, processing_time)
+        if request.slim:
+            return build_slim_response(detections, processing_time)
         
-        else:
-            # Multiple detections
-            return DetectionResponse(
-                success=True,
-                detections=detections,
-                processing_time=processing_time,
-                timestamp=datetime.now().isoformat(),
-                fallback=False,
-                message=f"Found {len(detections)} products. Select the correct one."
-            )
+        visual_matches = await get_visual_matches(http_request, deadline, request.priority, img, detections)
+        processing_time = time.time() - start_time
+        return build_detection_response(detections, processing_time, visual_matches)
         
     except HTTPException:
         raise
@@ -378,6 +1298,110 @@ async def detect_products(request: DetectionRequest):
             suggestions=get_all_products_suggestions()
         )
 
+@app.post("/detect/batch", response_model=BatchDetectionResponse)
+async def detect_products_batch(http_request: Request):
+    """
+    Detect products in several images with one request
+    
+    Accepts either JSON ({"images": [base64, ...], "priority": ..., "tally": ...})
+    or multipart/form-data with one or more `images` files plus optional
+    `priority` and `tally` fields. Images are decoded in parallel and sent
+    through the model in batches of VISION_INFERENCE_BATCH_SIZE.
+    """
+    start_time = time.time()
+    
+    if model is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    
+    deadline = get_request_deadline(http_request)
+    if time.perf_counter() >= deadline:
+        cancellation_stats['expired_on_arrival'] += 1
+        raise HTTPException(status_code=504, detail="Deadline already exceeded")
+    
+    loop = asyncio.get_running_loop()
+    
+    # Parse either body format
+    if http_request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await http_request.form()
+        uploads = form.getlist("images")
+        payloads = [await upload.read() for upload in uploads]
+        decode = decode_image_bytes
+        priority = form.get("priority", PRIORITY_INTERACTIVE)
+        tally_mode = form.get("tally", "none")
+    else:
+        try:
+            body = BatchDetectionRequest(**await http_request.json())
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid batch request: {e}")
+        payloads = body.images
+        decode = decode_base64_image
+        priority = body.priority
+        tally_mode = body.tally
+    
+    if not payloads:
+        raise HTTPException(status_code=400, detail="No images provided")
+    if len(payloads) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images per request")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority: {priority}")
+    if tally_mode not in ("none", "max", "sum"):
+        raise HTTPException(status_code=400, detail=f"Invalid tally mode: {tally_mode}")
+    
+    logger.info(f"📸 Processing batch of {len(payloads)} images ({priority})...")
+    
+    # Decode all images in parallel; bad images fail on their own
+    decoded = await asyncio.gather(
+        *[loop.run_in_executor(decode_executor, decode, payload) for payload in payloads],
+        return_exceptions=True
+    )
+    
+    valid = [i for i, img in enumerate(decoded) if not isinstance(img, BaseException)]
+    per_image: List[Optional[List[Detection]]] = [None] * len(decoded)
+    errors = {i: img for i, img in enumerate(decoded) if isinstance(img, BaseException)}
+    
+    # Real model batches, each one job on the inference queue; a chunk that
+    # fails (queue full, deadline) fails only its own images
+    chunks = [valid[i:i + INFERENCE_BATCH_SIZE] for i in range(0, len(valid), INFERENCE_BATCH_SIZE)]
+    chunk_results = await asyncio.gather(*[
+        run_on_queue(http_request, deadline, priority, run_inference_batch, [decoded[i] for i in chunk])
+        for chunk in chunks
+    ], return_exceptions=True)
+    for chunk, detections_list in zip(chunks, chunk_results):
+        if isinstance(detections_list, BaseException):
+            if isinstance(detections_list, HTTPException) and detections_list.status_code == 499:
+                raise detections_list  # client is gone, nobody reads the rest
+            logger.warning(f"✗ Batch chunk of {len(chunk)} failed: {getattr(detections_list, 'detail', detections_list)}")
+            errors.update((i, detections_list) for i in chunk)
+            continue
+        for i, detections in zip(chunk, detections_list):
+            per_image[i] = detections
+    
+    processing_time = time.time() - start_time
+    logger.info(f"⏱ Batch processing time: {processing_time:.3f}s")
+    
+    results = []
+    for i, detections in enumerate(per_image):
+        if detections is None:
+            error = errors[i]
+            results.append(DetectionResponse(
+                success=False,
+                detections=[],
+                processing_time=processing_time,
+                timestamp=datetime.now().isoformat(),
+                fallback=True,
+                message=str(getattr(error, "detail", error))
+            ))
+        else:
+            results.append(build_detection_response(detections, processing_time))
+    
+    return BatchDetectionResponse(
+        success=any(r.success for r in results),
+        results=results,
+        processing_time=processing_time,
+        timestamp=datetime.now().isoformat(),
+        tally=build_tally([d or [] for d in per_image], tally_mode) if tally_mode != "none" else None
+    )
+
 @app.get("/products")
 async def get_products():
     """Get all products"""
@@ -387,28 +1411,165 @@ async def get_products():
             "name": info['name'],
             "barcode": info['barcode'],
             "price": info['price'],
-            "category": info['category']
+            "category": info['category'],
+            "unit_id": info.get('unit_id'),
+            "unit_name": info.get('unit_name'),
+            "stock": info.get('stock')
         }
-        for class_name, info in PRODUCT_DATABASE.items()
+        for class_name, info in catalog.items()
     ]
     
     return {
+        "catalog_version": catalog.version,
         "total": len(products),
         "products": products
     }
 
+@app.get("/catalog")
+async def get_catalog(http_request: Request):
+    """
+    Catalog metadata for slim /detect responses
+    
+    Class ids match the `class_id` in slim detections. Clients should cache
+    this and send If-None-Match; it only changes when `version` does.
+    """
+    etag = f'"catalog-{catalog.version}"'
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    classes = sorted(
+        (
+            {
+                "id": catalog.class_id(class_name),
+                "class": class_name,
+                "name": info['name'],
+                "barcode": info['barcode'],
+                "price": info['price'],
+                "category": info['category'],
+                "unit_id": info.get('unit_id')
+            }
+            for class_name, info in catalog.items()
+        ),
+        key=lambda c: c["id"]
+    )
+    
+    return JSONResponse(
+        {"version": catalog.version, "classes": classes},
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
+
 @app.get("/model/info")
 async def get_model_info():
     """Get model info"""
     return {
         "model_path": MODEL_PATH,
-        "model_type": "YOLO11",
-        "classes": list(PRODUCT_DATABASE.keys()),
-        "num_classes": len(PRODUCT_DATABASE),
-        "confidence_threshold": CONFIDENCE_THRESHOLD
+        "model_type": "YOLO11" if VISION_BACKEND == "yolo" else "Fake (deterministic)",
+        "classes": catalog.keys(),
+        "num_classes": len(catalog),
+        "tiling": {"tile_size": TILE_SIZE, "overlap": TILE_OVERLAP},
+        "confusions": confusion_table,
+        "confidence_threshold": CONFIDENCE_THRESHOLD,
+        "auto_add_confidence": AUTO_ADD_CONFIDENCE,
+        "calibration": calibration.stats()
+    }
+
+@app.get(CAMERA_EVENTS_PATH)
+async def camera_events(http_request: Request):
+    """
+    Server-Sent Events stream of detections confirmed by the service's own camera
+
+    Each event is a JSON detection with an auto_add flag; reconnecting
+    EventSource clients send Last-Event-ID and get what they missed.
+    """
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera mode is off - set VISION_CAMERA_SOURCE")
+    
+    last_id = http_request.headers.get("last-event-id")
+    queue = camera.subscribe(int(last_id) if last_id and last_id.isdigit() else None)
+    
+    async def stream():
+        try:
+            yield f"retry: 2000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=CAMERA_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            camera.unsubscribe(queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/camera/status")
+async def camera_status():
+    """Capture/detection rates and subscriber counts of camera mode"""
+    if camera is None:
+        return {"enabled": False}
+    return {"enabled": True, **camera.stats()}
+
+@app.get("/performance")
+async def get_performance():
+    """Inference queue metrics per priority class"""
+    return {
+        "queue": inference_queue.stats(),
+        "cancellations": cancellation_stats,
+        "barcode": dict(barcode_stats, backend=barcode_reader.backend, mode=BARCODE_MODE),
+        "routing": dict(router.stats(), remote=remote_client.stats()) if remote_client else None,
+        "visual_suggestions": dict(visual_stats, index=visual_index.stats() if visual_index else None),
+        "camera": camera.stats() if camera else None,
+        "timestamp": datetime.now().isoformat()
     }
 
 # Run server
+# Socket file this process bound, removed again on shutdown
+bound_uds_path = None
+
+def remove_uds_socket():
+    """Delete our Unix socket file; safe to call more than once"""
+    global bound_uds_path
+    if bound_uds_path and os.path.exists(bound_uds_path):
+        os.unlink(bound_uds_path)
+    bound_uds_path = None
+
+def bind_sockets() -> list:
+    """Pre-bound listening sockets for uvicorn: TCP and/or the Unix domain socket"""
+    import atexit
+    import socket
+    import stat
+    global bound_uds_path
+    
+    sockets = []
+    if SERVE_TCP:
+        tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        # asyncio only turns on TCP_NODELAY for sockets whose proto is
+        # IPPROTO_TCP, and this one (and every connection accepted on it) has
+        # proto 0 - set it here so accepted connections inherit it
+        tcp.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        tcp.bind((SERVE_HOST, SERVE_PORT))
+        sockets.append(tcp)
+    if SERVE_UDS:
+        # A socket file left by a previous run would make bind() fail
+        if os.path.exists(SERVE_UDS) and stat.S_ISSOCK(os.stat(SERVE_UDS).st_mode):
+            os.unlink(SERVE_UDS)
+        uds = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        uds.bind(SERVE_UDS)
+        bound_uds_path = SERVE_UDS
+        # Normally removed by the shutdown handler (uvicorn re-raises SIGTERM,
+        # so nothing after server.run() gets to); atexit covers failed startups
+        atexit.register(remove_uds_socket)
+        os.chmod(SERVE_UDS, SERVE_UDS_MODE)
+        sockets.append(uds)
+    if not sockets:
+        raise SystemExit("Nothing to serve on - set VISION_UDS or leave VISION_TCP on")
+    return sockets
+
 if __name__ == "__main__":
     import uvicorn
     
@@ -416,18 +1577,27 @@ if __name__ == "__main__":
     print("🚀 Family Store Vision Service - Local Mode")
     print("=" * 70)
     print(f"Model: {MODEL_PATH}")
+    print(f"Backend: {VISION_BACKEND}")
     print(f"Products: {len(PRODUCT_DATABASE)}")
     print(f"Classes: {', '.join(PRODUCT_DATABASE.keys())}")
-    print(f"\nServer: http://localhost:5000")
-    print(f"API Docs: http://localhost:5000/docs")
-    print(f"Health: http://localhost:5000/health")
+    if SERVE_TCP:
+        print(f"\nServer: http://localhost:{SERVE_PORT}")
+        print(f"API Docs: http://localhost:{SERVE_PORT}/docs")
+        print(f"Health: http://localhost:{SERVE_PORT}/health")
+    if SERVE_UDS:
+        print(f"\nUnix socket: {SERVE_UDS} (curl --unix-socket {SERVE_UDS} http://localhost/health)")
+    print(f"Keep-alive: {KEEPALIVE_S:g}s")
     print("=" * 70)
     print("\n⚠️  Make sure 'my_model.pt' is in the same folder as this script!")
-    print("⚠️  Update barcodes in PRODUCT_DATABASE with your real barcodes!\n")
+    print("⚠️  Update barcodes in PRODUCT_DATABASE with your real barcodes,")
+    print("    or set VISION_CATALOG_SNAPSHOT to load them from the POS database!\n")
     
-    uvicorn.run(
+    server = uvicorn.Server(uvicorn.Config(
         app,
-        host="0.0.0.0",
-        port=5000,
-        log_level="info"
-    )
\ No newline at end of file
+        log_level="info",
+        timeout_keep_alive=KEEPALIVE_S,
+    ))
+    try:
+        server.run(sockets=bind_sockets())
+    except KeyboardInterrupt:
+        pass  # already shut down gracefully, same as uvicorn.run()
@@ -11,21 +11,27 @@ Improvements:
 - Caching for repeated detections
 """
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, validator
 import base64
-import requests
 import logging
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
 from functools import lru_cache
 import io
 from PIL import Image
-import hashlib
+import os
 import time
 
+from calibration import CalibrationTable
+from inventory_stats import InventoryAggregates
+from latency_stats import LatencyRecorder
+from remote_inference import RemoteInferenceError, RoboflowClient
+from suggestions import REASON_BRAND, REASON_CATEGORY, SuggestionIndex
+from ttl_cache import TTLCache, payload_digest
+
 # Configure enhanced logging
 logging.basicConfig(
     level=logging.INFO,
@@ -55,7 +61,14 @@ app.add_middleware(
 # ===== ROBOFLOW CONFIGURATION =====
 ROBOFLOW_API_KEY = "ROBOFLOW_API_KEY"
 ROBOFLOW_MODEL_URL = "ROBOFLOW_MODEL_UR"
-ROBOFLOW_API_ENDPOINT = f"https://detect.roboflow.com/{ROBOFLOW_MODEL_URL}"
+ROBOFLOW_API_ENDPOINT = os.getenv("ROBOFLOW_API_ENDPOINT", f"https://detect.roboflow.com/{ROBOFLOW_MODEL_URL}")
+
+# Remote client - pooled keep-alive connections, bounded concurrency
+ROBOFLOW_TIMEOUT_S = float(os.getenv("ROBOFLOW_TIMEOUT_S", "10"))
+ROBOFLOW_CONNECT_TIMEOUT_S = float(os.getenv("ROBOFLOW_CONNECT_TIMEOUT_S", "3"))
+ROBOFLOW_MAX_CONCURRENCY = int(os.getenv("ROBOFLOW_MAX_CONCURRENCY", "4"))
+ROBOFLOW_MAX_RETRIES = int(os.getenv("ROBOFLOW_MAX_RETRIES", "2"))
+ROBOFLOW_HEALTH_URL = os.getenv("ROBOFLOW_HEALTH_URL", "https://detect.roboflow.com/")
 
 # Enhanced confidence thresholds per category
 CONFIDENCE_THRESHOLDS = {
@@ -64,7 +77,7 @@ CONFIDENCE_THRESHOLDS = {
     'low_confidence': 25,       # Minimum to show at all
 }
 
-# Category-specific confidence adjustments
+# Category-specific confidence adjustments (only for classes without calibration)
 CATEGORY_CONFIDENCE_BOOST = {
     'Beverages': 5,          # Easier to detect (distinct shapes)
     'Instant Noodles': 5,    # Clear packaging
@@ -78,6 +91,24 @@ CATEGORY_CONFIDENCE_BOOST = {
 }
 
 OVERLAP_THRESHOLD = 45  # IoU threshold for NMS
+
+# Per-class calibration from calibrate_thresholds.py. Calibrated classes get
+# their own minimum and auto-add thresholds and a calibrated confidence
+# instead of the category boost.
+CALIBRATION_PATH = os.getenv("VISION_CALIBRATION")
+calibration = CalibrationTable(
+    CONFIDENCE_THRESHOLDS['low_confidence'] / 100,
+    CONFIDENCE_THRESHOLDS['high_confidence'] / 100,
+)
+
+roboflow_client = RoboflowClient(
+    ROBOFLOW_API_ENDPOINT,
+    ROBOFLOW_API_KEY,
+    timeout=ROBOFLOW_TIMEOUT_S,
+    connect_timeout=ROBOFLOW_CONNECT_TIMEOUT_S,
+    max_concurrency=ROBOFLOW_MAX_CONCURRENCY,
+    max_retries=ROBOFLOW_MAX_RETRIES,
+)
 # ==================================
 
 # Enhanced Product Database with metadata
@@ -324,18 +355,25 @@ PRODUCT_DATABASE = {
     },
 }
 
-# Performance monitoring
-detection_stats = {
-    'total_requests': 0,
-    'successful_detections': 0,
-    'failed_detections': 0,
-    'average_processing_time': 0,
-    'total_processing_time': 0,
-}
+# Category/brand indexes for suggestions, built once instead of per request
+suggestion_index = SuggestionIndex(PRODUCT_DATABASE.items())
+
+# Category/brand/store totals for the dashboard. Anything that changes a price or
+# stock level in PRODUCT_DATABASE must do it through inventory_stats.update()
+inventory_stats = InventoryAggregates(PRODUCT_DATABASE, CATEGORY_CONFIDENCE_BOOST)
+
+# Performance monitoring: latency percentiles and throughput over 1m/5m/1h windows
+OUTCOME_SUCCESS = 'success'
+OUTCOME_FAILED = 'failed'
+# Cache hits keep the success flag of the reply they repeat
+OUTCOME_CACHED_SUCCESS = 'cached_success'
+OUTCOME_CACHED_FAILED = 'cached_failed'
+detection_stats = LatencyRecorder([OUTCOME_SUCCESS, OUTCOME_FAILED, OUTCOME_CACHED_SUCCESS, OUTCOME_CACHED_FAILED])
 
-# Simple cache for recent detections (helps with accidental re-scans)
-detection_cache = {}
-CACHE_DURATION = timedelta(seconds=5)
+# Cache for recent detections (helps with accidental re-scans)
+CACHE_SIZE = int(os.getenv("VISION_CACHE_SIZE", "50"))
+CACHE_DURATION = timedelta(seconds=float(os.getenv("VISION_CACHE_TTL_S", "5")))
+detection_cache = TTLCache(max_entries=CACHE_SIZE, ttl=CACHE_DURATION.total_seconds())
 
 # Request/Response Models
 class DetectionRequest(BaseModel):
@@ -439,98 +477,48 @@ def validate_and_preprocess_image(base64_image: str) -> tuple[str, dict]:
         raise ValueError(f"Invalid image data: {str(e)}")
 
 def get_cache_key(base64_image: str) -> str:
-    """Generate cache key from image hash"""
-    return hashlib.md5(base64_image[:1000].encode()).hexdigest()
+    """Generate cache key from a digest of the whole image"""
+    return payload_digest(base64_image)
 
 def check_cache(cache_key: str) -> Optional[dict]:
     """Check if we have a recent detection for this image"""
-    if cache_key in detection_cache:
-        cached_data, timestamp = detection_cache[cache_key]
-        if datetime.now() - timestamp < CACHE_DURATION:
-            logger.info("✓ Using cached detection result")
-            return cached_data
-        else:
-            # Clean up expired cache
-            del detection_cache[cache_key]
-    return None
+    cached_data = detection_cache.get(cache_key)
+    if cached_data is None:
+        return None
+    
+    logger.info("✓ Using cached detection result")
+    # Callers stamp processing_time/metadata - don't let that leak into the cache
+    return dict(cached_data, metadata=dict(cached_data.get('metadata') or {}))
 
 def update_cache(cache_key: str, data: dict):
-    """Store detection result in cache"""
-    detection_cache[cache_key] = (data, datetime.now())
-    
-    # Clean old cache entries (keep only last 50)
-    if len(detection_cache) > 50:
-        oldest_key = min(detection_cache.keys(), 
-                        key=lambda k: detection_cache[k][1])
-        del detection_cache[oldest_key]
+    """Store detection result in cache (least recently used entry evicted when full)"""
+    detection_cache.put(cache_key, data)
 
-def call_roboflow_api(base64_image: str) -> dict:
-    """Call Roboflow hosted inference API with retry logic"""
-    max_retries = 2
-    retry_delay = 1
-    
-    for attempt in range(max_retries):
-        try:
-            url = ROBOFLOW_API_ENDPOINT
-            params = {
-                "api_key": ROBOFLOW_API_KEY,
-                "confidence": CONFIDENCE_THRESHOLDS['low_confidence'],
-                "overlap": OVERLAP_THRESHOLD
-            }
-            
-            logger.info(f"📡 Calling Roboflow API (attempt {attempt + 1}/{max_retries})")
-            
-            # Send request
-            response = requests.post(
-                url,
-                params=params,
-                data=base64_image,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                prediction_count = len(result.get('predictions', []))
-                logger.info(f"✓ Roboflow returned {prediction_count} predictions")
-                return result
-            elif response.status_code == 429:
-                # Rate limit - wait and retry
-                logger.warning(f"Rate limit hit, waiting {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-                continue
-            else:
-                logger.error(f"Roboflow API error: {response.status_code}")
-                logger.error(f"Response: {response.text}")
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Roboflow API error: {response.text}"
-                )
-                
-        except requests.exceptions.Timeout:
-            if attempt < max_retries - 1:
-                logger.warning(f"Timeout, retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                continue
-            logger.error("Roboflow API timeout after retries")
-            raise HTTPException(status_code=504, detail="Detection service timeout")
-            
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                logger.warning(f"Network error, retrying: {e}")
-                time.sleep(retry_delay)
-                continue
-            logger.error(f"Network error: {e}")
-            raise HTTPException(status_code=503, detail="Cannot reach detection service")
+async def call_roboflow_api(base64_image: str) -> dict:
+    """Call Roboflow hosted inference API (pooled connection, jittered retries)"""
+    try:
+        result = await roboflow_client.detect(
+            base64_image,
+            confidence=int(calibration.floor * 100),  # lowest per-class minimum
+            overlap=OVERLAP_THRESHOLD
+        )
+    except RemoteInferenceError as e:
+        logger.error(f"Roboflow API error: {e.detail}")
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     
-    raise HTTPException(status_code=503, detail="Detection service unavailable after retries")
+    logger.info(f"✓ Roboflow returned {len(result.get('predictions', []))} predictions")
+    return result
 
-def adjust_confidence(confidence: float, category: str) -> float:
+def adjust_confidence(confidence: float, category: str, class_name: str = None) -> float:
     """
     Adjust confidence score based on product category
     Some products are easier/harder to detect
+    
+    Classes in the calibration table use their calibrated probability instead.
     """
+    if class_name in calibration:
+        return calibration.calibrate(class_name, confidence / 100) * 100
+    
     boost = CATEGORY_CONFIDENCE_BOOST.get(category, 0)
     adjusted = min(100, confidence + boost)
     
@@ -552,9 +540,13 @@ def map_detection_to_product(prediction: dict) -> Optional[Detection]:
         logger.warning(f"⚠ Unknown product class: {class_name}")
         return None
     
-    # Adjust confidence based on category
+    if not calibration.keeps(class_name, raw_confidence / 100):
+        logger.info(f"Below {class_name} threshold: {raw_confidence:.1f}%")
+        return None
+    
+    # Adjust confidence based on category (or calibration)
     category = product_info['category']
-    adjusted_confidence = adjust_confidence(raw_confidence, category)
+    adjusted_confidence = adjust_confidence(raw_confidence, category, class_name)
     
     detection = Detection(
         class_name=class_name,
@@ -578,6 +570,12 @@ def map_detection_to_product(prediction: dict) -> Optional[Detection]:
     
     return detection
 
+def should_auto_add(detection: Detection) -> bool:
+    """Per-class auto-add threshold when calibrated, else the global high threshold"""
+    if detection.class_name in calibration:
+        return calibration.is_auto_add(detection.class_name, detection.confidence / 100)
+    return detection.adjusted_confidence >= CONFIDENCE_THRESHOLDS['high_confidence']
+
 def filter_and_rank_detections(detections: List[Detection]) -> List[Detection]:
     """
     Filter overlapping detections and rank by adjusted confidence
@@ -603,43 +601,24 @@ def filter_and_rank_detections(detections: List[Detection]) -> List[Detection]:
     
     return unique_detections
 
+def product_suggestion(class_name: str, **extra) -> dict:
+    info = PRODUCT_DATABASE[class_name]
+    return {
+        "name": info['name'],
+        "barcode": info['barcode'],
+        "price": info['price'],
+        "category": info['category'],
+        "class": class_name,
+        "brand": info.get('brand'),
+        **extra
+    }
+
 def get_all_products_as_suggestions(limit: int = 10, prioritize_category: str = None):
     """Return products as suggestions, optionally prioritizing a category"""
-    products = []
-    
-    # If category specified, add those first
-    if prioritize_category:
-        for class_name, info in PRODUCT_DATABASE.items():
-            if info['category'] == prioritize_category:
-                products.append({
-                    "name": info['name'],
-                    "barcode": info['barcode'],
-                    "price": info['price'],
-                    "category": info['category'],
-                    "class": class_name,
-                    "brand": info.get('brand'),
-                    "priority": True
-                })
-    
-    # Add remaining products
-    for class_name, info in PRODUCT_DATABASE.items():
-        if prioritize_category and info['category'] == prioritize_category:
-            continue  # Already added
-        
-        products.append({
-            "name": info['name'],
-            "barcode": info['barcode'],
-            "price": info['price'],
-            "category": info['category'],
-            "class": class_name,
-            "brand": info.get('brand'),
-            "priority": False
-        })
-        
-        if len(products) >= limit:
-            break
-    
-    return products[:limit]
+    return [
+        product_suggestion(class_name, priority=in_category)
+        for class_name, in_category in suggestion_index.browse(limit, prioritize_category)
+    ]
 
 def get_smart_suggestions(detections: List[Detection], limit: int = 5) -> List[dict]:
     """
@@ -649,10 +628,9 @@ def get_smart_suggestions(detections: List[Detection], limit: int = 5) -> List[d
         return get_all_products_as_suggestions(limit)
     
     primary_detection = detections[0]
-    suggestions = []
     
     # Add the detected product first
-    suggestions.append({
+    suggestions = [{
         "name": primary_detection.product_name,
         "barcode": primary_detection.barcode,
         "price": primary_detection.price,
@@ -662,66 +640,42 @@ def get_smart_suggestions(detections: List[Detection], limit: int = 5) -> List[d
         "confidence": primary_detection.adjusted_confidence,
         "highlighted": True,
         "reason": f"{primary_detection.adjusted_confidence:.0f}% match"
-    })
-    
-    # Add products from same category
-    for class_name, info in PRODUCT_DATABASE.items():
-        if len(suggestions) >= limit:
-            break
-            
-        if (class_name != primary_detection.class_name and 
-            info['category'] == primary_detection.category):
-            suggestions.append({
-                "name": info['name'],
-                "barcode": info['barcode'],
-                "price": info['price'],
-                "category": info['category'],
-                "class": class_name,
-                "brand": info.get('brand'),
-                "highlighted": False,
-                "reason": f"Similar to {primary_detection.product_name}"
-            })
+    }]
     
-    # Fill remaining with same brand products
-    if len(suggestions) < limit and primary_detection.brand:
-        for class_name, info in PRODUCT_DATABASE.items():
-            if len(suggestions) >= limit:
-                break
-                
-            if (class_name not in [s['class'] for s in suggestions] and
-                info.get('brand') == primary_detection.brand):
-                suggestions.append({
-                    "name": info['name'],
-                    "barcode": info['barcode'],
-                    "price": info['price'],
-                    "category": info['category'],
-                    "class": class_name,
-                    "brand": info.get('brand'),
-                    "highlighted": False,
-                    "reason": f"Same brand: {primary_detection.brand}"
-                })
+    # Then products from the same category, then the same brand
+    reasons = {
+        REASON_CATEGORY: f"Similar to {primary_detection.product_name}",
+        REASON_BRAND: f"Same brand: {primary_detection.brand}",
+    }
+    for class_name, reason in suggestion_index.similar(primary_detection.class_name, limit - 1):
+        suggestions.append(product_suggestion(class_name, highlighted=False, reason=reasons[reason]))
     
     return suggestions
 
-def update_stats(processing_time: float, success: bool):
+def update_stats(processing_time: float, success: bool, cached: bool = False):
     """Update performance statistics"""
-    detection_stats['total_requests'] += 1
-    
-    if success:
-        detection_stats['successful_detections'] += 1
+    if cached:
+        outcome = OUTCOME_CACHED_SUCCESS if success else OUTCOME_CACHED_FAILED
     else:
-        detection_stats['failed_detections'] += 1
-    
-    detection_stats['total_processing_time'] += processing_time
-    detection_stats['average_processing_time'] = (
-        detection_stats['total_processing_time'] / detection_stats['total_requests']
-    )
+        outcome = OUTCOME_SUCCESS if success else OUTCOME_FAILED
+    detection_stats.record(processing_time, outcome)
 
 # API Endpoints
 
 @app.on_event("startup")
 async def startup_event():
     """Enhanced startup message"""
+    global calibration
+    if CALIBRATION_PATH:
+        try:
+            calibration = CalibrationTable.load(
+                CALIBRATION_PATH, calibration.default_min_confidence, calibration.default_auto_add
+            )
+        except Exception as e:
+            logger.error(f"✗ Using global thresholds, could not load {CALIBRATION_PATH}: {e}")
+    
+    await roboflow_client.start()
+    
     logger.info("=" * 80)
     logger.info("🚀 SARI-SARI STORE AI VISION SERVICE - ENHANCED EDITION")
     logger.info("=" * 80)
@@ -741,6 +695,11 @@ async def startup_event():
     logger.info("✓ Performance monitoring active")
     logger.info("=" * 80)
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled connections to Roboflow"""
+    await roboflow_client.close()
+
 @app.get("/")
 async def root():
     """Enhanced root endpoint"""
@@ -772,15 +731,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Enhanced health check"""
-    try:
-        # Quick test to Roboflow API
-        test_response = requests.get(
-            "https://detect.roboflow.com/",
-            timeout=5
-        )
-        roboflow_reachable = test_response.status_code == 200
-    except:
-        roboflow_reachable = False
+    # Quick test to Roboflow API (reuses the pooled connection)
+    roboflow_reachable = await roboflow_client.ping(ROBOFLOW_HEALTH_URL)
     
     return {
         "status": "healthy",
@@ -789,7 +741,7 @@ async def health_check():
         "api_configured": True,
         "roboflow_reachable": roboflow_reachable,
         "cache_size": len(detection_cache),
-        "total_requests": detection_stats['total_requests'],
+        "total_requests": sum(detection_stats.totals.values()),
         "uptime_seconds": time.time()  # Would track actual uptime in production
     }
 
@@ -815,11 +767,11 @@ async def detect_products(request: DetectionRequest):
             processing_time = time.time() - start_time
             cached_result['processing_time'] = processing_time
             cached_result['metadata']['cached'] = True
-            update_stats(processing_time, cached_result['success'])
+            update_stats(processing_time, cached_result['success'], cached=True)
             return DetectionResponse(**cached_result)
         
         # Step 3: Call Roboflow API
-        roboflow_result = call_roboflow_api(cleaned_image)
+        roboflow_result = await call_roboflow_api(cleaned_image)
         
         # Step 4: Process predictions
         detections = []
@@ -871,7 +823,7 @@ async def detect_products(request: DetectionRequest):
             detection = detections[0]
             conf = detection.adjusted_confidence
             
-            if conf >= CONFIDENCE_THRESHOLDS['high_confidence']:
+            if should_auto_add(detection):
                 # High confidence - auto-add to cart
                 response_data = {
                     'success': True,
@@ -931,7 +883,7 @@ async def detect_products(request: DetectionRequest):
             # Multiple detections
             high_confidence_count = sum(
                 1 for d in detections 
-                if d.adjusted_confidence >= CONFIDENCE_THRESHOLDS['high_confidence']
+                if should_auto_add(d)
             )
             
             response_data = {
@@ -1060,8 +1012,10 @@ async def get_model_info():
             "confidence_thresholds": CONFIDENCE_THRESHOLDS,
             "overlap_threshold": OVERLAP_THRESHOLD,
             "category_boosts": CATEGORY_CONFIDENCE_BOOST,
+            "calibration": calibration.stats(),
             "cache_enabled": True,
-            "cache_duration_seconds": int(CACHE_DURATION.total_seconds()),
+            "cache_duration_seconds": CACHE_DURATION.total_seconds(),
+            "cache_size": CACHE_SIZE,
             "image_preprocessing": True
         },
         "api": {
@@ -1080,78 +1034,44 @@ async def get_model_info():
         }
     }
 
+def versioned(request: Request, response: Response, payload: dict):
+    """Tag a dashboard payload with its inventory version; 304 if the client has it"""
+    etag = f'"inventory-{payload["version"]}"'
+    if request.headers.get('if-none-match') == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return payload
+
 @app.get("/stats")
-async def get_stats():
+async def get_stats(request: Request, response: Response):
     """Get product and store statistics"""
-    total_value = sum(info['price'] * info['stock'] for info in PRODUCT_DATABASE.values())
-    total_items = sum(info['stock'] for info in PRODUCT_DATABASE.values())
-    
-    categories = {}
-    brands = {}
-    
-    for info in PRODUCT_DATABASE.values():
-        # Category stats
-        cat = info['category']
-        if cat not in categories:
-            categories[cat] = {'count': 0, 'value': 0, 'products': 0}
-        categories[cat]['count'] += info['stock']
-        categories[cat]['value'] += info['price'] * info['stock']
-        categories[cat]['products'] += 1
-        
-        # Brand stats
-        brand = info.get('brand', 'Unknown')
-        if brand not in brands:
-            brands[brand] = {'count': 0, 'value': 0, 'products': 0}
-        brands[brand]['count'] += info['stock']
-        brands[brand]['value'] += info['price'] * info['stock']
-        brands[brand]['products'] += 1
-    
-    return {
-        "inventory": {
-            "total_products": len(PRODUCT_DATABASE),
-            "total_items": total_items,
-            "total_value": round(total_value, 2),
-            "average_price": round(total_value / total_items, 2) if total_items > 0 else 0
-        },
-        "categories": {
-            name: {
-                "products": data['products'],
-                "items": data['count'],
-                "value": round(data['value'], 2)
-            }
-            for name, data in sorted(categories.items(), key=lambda x: x[1]['value'], reverse=True)
-        },
-        "brands": {
-            name: {
-                "products": data['products'],
-                "items": data['count'],
-                "value": round(data['value'], 2)
-            }
-            for name, data in sorted(brands.items(), key=lambda x: x[1]['value'], reverse=True)
-        }
-    }
+    return versioned(request, response, inventory_stats.snapshot()['stats'])
 
 @app.get("/performance")
 async def get_performance():
     """Get performance metrics"""
-    success_rate = (
-        (detection_stats['successful_detections'] / detection_stats['total_requests'] * 100)
-        if detection_stats['total_requests'] > 0 else 0
-    )
+    totals = detection_stats.totals
+    total_requests = sum(totals.values())
+    successful = totals[OUTCOME_SUCCESS] + totals[OUTCOME_CACHED_SUCCESS]
+    failed = totals[OUTCOME_FAILED] + totals[OUTCOME_CACHED_FAILED]
+    success_rate = (successful / total_requests * 100) if total_requests > 0 else 0
     
     return {
         "requests": {
-            "total": detection_stats['total_requests'],
-            "successful": detection_stats['successful_detections'],
-            "failed": detection_stats['failed_detections'],
+            "total": total_requests,
+            "successful": successful,
+            "failed": failed,
+            "cached": totals[OUTCOME_CACHED_SUCCESS] + totals[OUTCOME_CACHED_FAILED],
             "success_rate": round(success_rate, 2)
         },
         "performance": {
-            "average_processing_time": round(detection_stats['average_processing_time'], 3),
-            "total_processing_time": round(detection_stats['total_processing_time'], 2),
+            "windows": detection_stats.snapshot(),
+            "total_processing_time": round(detection_stats.total_time, 2),
             "cache_size": len(detection_cache),
-            "cache_hit_rate": "N/A"  # Would need to track cache hits
+            "cache_hit_rate": detection_cache.stats()['hit_rate']
         },
+        "cache": detection_cache.stats(),
+        "remote": roboflow_client.stats(),
         "thresholds": {
             "target_processing_time": "< 2.0s",
             "target_success_rate": "> 85%"
@@ -1159,43 +1079,14 @@ async def get_performance():
     }
 
 @app.get("/categories")
-async def get_categories():
+async def get_categories(request: Request, response: Response):
     """Get list of all product categories"""
-    categories = {}
-    
-    for info in PRODUCT_DATABASE.values():
-        cat = info['category']
-        if cat not in categories:
-            categories[cat] = {
-                'name': cat,
-                'product_count': 0,
-                'confidence_boost': CATEGORY_CONFIDENCE_BOOST.get(cat, 0)
-            }
-        categories[cat]['product_count'] += 1
-    
-    return {
-        "total": len(categories),
-        "categories": list(categories.values())
-    }
+    return versioned(request, response, inventory_stats.snapshot()['categories'])
 
 @app.get("/brands")
-async def get_brands():
+async def get_brands(request: Request, response: Response):
     """Get list of all product brands"""
-    brands = {}
-    
-    for info in PRODUCT_DATABASE.values():
-        brand = info.get('brand', 'Unknown')
-        if brand not in brands:
-            brands[brand] = {
-                'name': brand,
-                'product_count': 0
-            }
-        brands[brand]['product_count'] += 1
-    
-    return {
-        "total": len(brands),
-        "brands": sorted(brands.values(), key=lambda x: x['product_count'], reverse=True)
-    }
+    return versioned(request, response, inventory_stats.snapshot()['brands'])
 
 # Exception handlers
 @app.exception_handler(HTTPException)
@@ -0,0 +1,134 @@
+"""
+Barcode Reader for Family Store Vision Service
+
+Decodes retail barcodes (EAN/UPC) straight from the frame /detect already
+decoded, so a product held barcode-first resolves without the separate
+BarcodeScannerModal flow.
+
+Backends, first one available wins:
+- OpenCV's built-in cv2.barcode.BarcodeDetector (opencv-python >= 4.8)
+- pyzbar (pip install pyzbar, needs the zbar system library)
+If neither is installed the reader reports unavailable and decode() returns [].
+"""
+
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyzbar import pyzbar
+except ImportError:  # optional dependency
+    pyzbar = None
+
+# OpenCV's detector misses bars that are too wide, so retry smaller
+DECODE_SCALES = (1.0, 0.5)
+CROP_PADDING = 0.15  # grow detection boxes by 15% before decoding
+
+
+class BarcodeHit:
+    """One decoded barcode and where it was found (x1, y1, x2, y2)"""
+
+    __slots__ = ('value', 'symbology', 'box')
+
+    def __init__(self, value: str, symbology: str, box: Tuple[float, float, float, float]):
+        self.value = value
+        self.symbology = symbology
+        self.box = box
+
+
+class BarcodeReader:
+    """Thread-safe barcode decoder over whole frames or box crops"""
+
+    def __init__(self):
+        self.backend = None
+        self._local = threading.local()
+
+        if hasattr(cv2, 'barcode'):
+            self.backend = 'opencv'
+        elif pyzbar is not None:
+            self.backend = 'pyzbar'
+        else:
+            logger.warning("⚠ No barcode decoder installed - barcode stage disabled")
+
+    @property
+    def available(self) -> bool:
+        return self.backend is not None
+
+    def decode(self, img: np.ndarray) -> List[BarcodeHit]:
+        """Decode every barcode in the full frame"""
+        if not self.available:
+            return []
+        return self._decode(img, 0, 0)
+
+    def decode_regions(self, img: np.ndarray, boxes: List[Tuple[float, float, float, float]]) -> List[BarcodeHit]:
+        """Decode barcodes inside (padded) x1, y1, x2, y2 boxes only"""
+        if not self.available:
+            return []
+
+        h, w = img.shape[:2]
+        hits = []
+        for x1, y1, x2, y2 in boxes:
+            pad_x = (x2 - x1) * CROP_PADDING
+            pad_y = (y2 - y1) * CROP_PADDING
+            cx1, cy1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+            cx2, cy2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+            if cx2 - cx1 < 16 or cy2 - cy1 < 16:
+                continue
+            hits.extend(self._decode(img[cy1:cy2, cx1:cx2], cx1, cy1))
+        return hits
+
+    def _decode(self, img: np.ndarray, off_x: int, off_y: int) -> List[BarcodeHit]:
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+        for scale in DECODE_SCALES:
+            scaled = gray if scale == 1.0 else cv2.resize(
+                gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+            )
+            if self.backend == 'opencv':
+                hits = self._decode_opencv(scaled)
+            else:
+                hits = self._decode_pyzbar(scaled)
+
+            if hits:
+                return [
+                    BarcodeHit(
+                        value, symbology,
+                        (off_x + x1 / scale, off_y + y1 / scale,
+                         off_x + x2 / scale, off_y + y2 / scale)
+                    )
+                    for value, symbology, (x1, y1, x2, y2) in hits
+                ]
+        return []
+
+    def _decode_opencv(self, gray: np.ndarray) -> list:
+        # BarcodeDetector is not thread-safe; keep one per worker thread
+        detector: Optional[cv2.barcode.BarcodeDetector] = getattr(self._local, 'detector', None)
+        if detector is None:
+            detector = cv2.barcode.BarcodeDetector()
+            self._local.detector = detector
+
+        ok, values, types, points = detector.detectAndDecodeWithType(gray)
+        if not ok or points is None:
+            return []
+
+        hits = []
+        for value, symbology, quad in zip(values, types, points):
+            if not value:
+                continue
+            xs, ys = quad[:, 0], quad[:, 1]
+            hits.append((value, symbology, (float(xs.min()), float(ys.min()),
+                                            float(xs.max()), float(ys.max()))))
+        return hits
+
+    def _decode_pyzbar(self, gray: np.ndarray) -> list:
+        hits = []
+        for symbol in pyzbar.decode(gray):
+            r = symbol.rect
+            hits.append((symbol.data.decode('ascii', 'ignore'), symbol.type,
+                         (r.left, r.top, r.left + r.width, r.top + r.height)))
+        return hits
@@ -0,0 +1,246 @@
+"""
+Headless batch mode for yolo_detect.py (--batch)
+
+Bulk-labels an image folder or a video file without opening a window:
+- images are decoded (and resized, if --resolution is set) by a worker pool
+  ahead of inference; video frames are decoded by a reader thread
+- frames go through the model --batch-size at a time
+- results stream to JSONL (one line per image) or CSV (one row per
+  detection), written and flushed after every batch
+- optional annotated copies are written by the same worker pool
+- re-running with the same --output skips everything already in it, so an
+  interrupted run picks up where it stopped
+"""
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from frame_pipeline import FrameQueue
+
+CSV_FIELDS = ['source', 'frame', 'width', 'height', 'class', 'confidence', 'xmin', 'ymin', 'xmax', 'ymax']
+PROGRESS_EVERY_S = 5.0
+
+
+def result_key(source, frame):
+    """Identifies one image in the output (frame is None for still images)"""
+    return (source, '' if frame is None else str(frame))
+
+
+class ResultWriter:
+    """Appends results to a JSONL or CSV file (chosen by extension) and knows what is already there"""
+
+    def __init__(self, path):
+        self.path = path
+        self.is_csv = path.lower().endswith('.csv')
+        self.done = self._load_done()
+
+        write_header = self.is_csv and (not os.path.exists(path) or os.path.getsize(path) == 0)
+        self._file = open(path, 'a', newline='')
+        if write_header:
+            csv.DictWriter(self._file, CSV_FIELDS).writeheader()
+
+    def _load_done(self):
+        """Keys already written; a half-written last line (interrupted run) is cut off"""
+        if not os.path.exists(self.path):
+            return set()
+
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+                data = data[:end]
+
+        lines = data.decode().splitlines()
+        if self.is_csv:
+            return {result_key(row['source'], row['frame'] or None) for row in csv.DictReader(lines)}
+        records = (json.loads(line) for line in lines if line.strip())
+        return {result_key(r['source'], r['frame']) for r in records}
+
+    def write(self, records):
+        """Write one batch of records in a single call and flush it"""
+        buffer = io.StringIO()
+        if self.is_csv:
+            writer = csv.DictWriter(buffer, CSV_FIELDS)
+            for r in records:
+                base = {'source': r['source'], 'frame': '' if r['frame'] is None else r['frame'],
+                        'width': r['width'], 'height': r['height']}
+                if not r['detections']:
+                    writer.writerow(base) # Keep a row so the image counts as done when resuming
+                for d in r['detections']:
+                    xmin, ymin, xmax, ymax = d['box']
+                    writer.writerow({**base, 'class': d['class'], 'confidence': d['confidence'],
+                                     'xmin': xmin, 'ymin': ymin, 'xmax': xmax, 'ymax': ymax})
+        else:
+            for r in records:
+                buffer.write(json.dumps(r) + '\n')
+
+        self._file.write(buffer.getvalue())
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def load_image(path, resize):
+    frame = cv2.imread(path)
+    if frame is not None and resize:
+        frame = cv2.resize(frame, resize)
+    return frame
+
+
+def prefetch_images(pool, items, resize, depth):
+    """(source, path) -> (source, None, image), decoded up to `depth` images ahead"""
+    pending = deque()
+    for source, path in items:
+        pending.append((source, pool.submit(load_image, path, resize)))
+        if len(pending) >= depth:
+            source, future = pending.popleft()
+            yield source, None, future.result()
+    while pending:
+        source, future = pending.popleft()
+        yield source, None, future.result()
+
+
+def read_video(cap, source, start, resize, depth):
+    """(source, frame index, frame) for every frame from `start`, decoded by a reader thread"""
+    frames = FrameQueue(depth, drop_oldest=False)
+
+    def reader():
+        index = 0
+        while index < start and cap.grab(): # Skip frames an earlier run already labeled
+            index += 1
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if resize:
+                frame = cv2.resize(frame, resize)
+            if not frames.put((source, index, frame)):
+                break
+            index += 1
+        frames.close()
+
+    thread = threading.Thread(target=reader, name='video-reader', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            yield item
+    finally:
+        frames.close()
+        thread.join(timeout=2)
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run_batch(model, labels, source_type, img_source, imgs_list, cap, output, batch_size, workers,
+              conf, resize=None, annotate_dir=None, extract=None, draw=None):
+    """
+    Label every image (or video frame) of a source and stream the results to `output`
+
+    `extract(result)` turns one model result into (xmin, ymin, xmax, ymax,
+    class index, confidence) rows; `draw(frame, rows)` annotates a frame.
+    """
+    writer = ResultWriter(output)
+    if annotate_dir:
+        os.makedirs(annotate_dir, exist_ok=True)
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-io')
+    depth = max(batch_size * 2, workers)
+
+    if source_type == 'video':
+        done_frames = [int(frame) for source, frame in writer.done if source == img_source and frame]
+        start = max(done_frames) + 1 if done_frames else 0
+        skipped = start
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+        frames = read_video(cap, img_source, start, resize, depth)
+    else:
+        root = img_source if source_type == 'folder' else os.path.dirname(img_source)
+        items = [(os.path.relpath(path, root), path) for path in sorted(imgs_list)]
+        todo = [item for item in items if result_key(item[0], None) not in writer.done]
+        skipped = len(items) - len(todo)
+        total = len(items)
+        frames = prefetch_images(pool, todo, resize, depth)
+
+    if skipped:
+        print(f'Resuming: {skipped} images already in {output}')
+
+    def annotate(source, frame_index, frame, rows):
+        draw(frame, rows)
+        name = source if frame_index is None else f'frame_{frame_index:06d}.jpg'
+        path = os.path.join(annotate_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, frame)
+
+    processed = 0
+    unreadable = 0
+    started = time.perf_counter()
+    last_report = started
+
+    try:
+        for batch in batches(frames, batch_size):
+            readable = [item for item in batch if item[2] is not None]
+            unreadable += len(batch) - len(readable)
+            if not readable:
+                continue
+
+            results = model([frame for _, _, frame in readable], conf=conf, verbose=False)
+
+            records = []
+            for (source, frame_index, frame), result in zip(readable, results):
+                rows = extract(result)
+                h, w = frame.shape[:2]
+                records.append({
+                    'source': source,
+                    'frame': frame_index,
+                    'width': w,
+                    'height': h,
+                    'detections': [
+                        {'class': labels[int(c)], 'class_id': int(c), 'confidence': round(float(p), 4),
+                         'box': [int(xmin), int(ymin), int(xmax), int(ymax)]}
+                        for xmin, ymin, xmax, ymax, c, p in rows
+                    ],
+                })
+                if annotate_dir:
+                    pool.submit(annotate, source, frame_index, frame, rows)
+
+            writer.write(records)
+            processed += len(records)
+
+            now = time.perf_counter()
+            if now - last_report >= PROGRESS_EVERY_S:
+                last_report = now
+                of_total = f'/{total}' if total else ''
+                print(f'{skipped + processed}{of_total} images, {processed / (now - started):.1f} img/s')
+    except KeyboardInterrupt:
+        print(f'Interrupted - run the same command again to resume from {output}')
+    finally:
+        pool.shutdown(wait=True) # Finish pending annotated writes
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    rate = processed / elapsed if elapsed > 0 else 0.0
+    print(f'Processed {processed} images in {elapsed:.1f}s ({rate:.1f} img/s), results in {output}')
+    if unreadable:
+        print(f'Skipped {unreadable} unreadable images')
+    return processed
@@ -0,0 +1,103 @@
+"""
+Per-request transport overhead of the vision service: TCP vs Unix socket,
+with and without keep-alive
+
+Sends the same small request back to back (like Laravel does per frame) over
+each transport and reports latency percentiles and requests per second.
+/health is the default target, so the numbers are mostly transport, not model.
+
+Start the service on both transports first, e.g.:
+    VISION_BACKEND=fake VISION_UDS=/tmp/vision.sock python app.py
+then:
+    python bench_transport.py --uds /tmp/vision.sock --requests 2000
+"""
+
+import argparse
+import json
+import sys
+import time
+
+import httpx
+import numpy as np
+
+
+def run(client_factory, url, requests, reuse, warmup=20):
+    """
+    Latencies (seconds) of `requests` GETs; with `reuse` one connection is
+    kept alive, otherwise every request opens and closes its own (what a
+    client without connection pooling pays)
+    """
+    samples = []
+    with client_factory(reuse) as client:
+        for i in range(warmup + requests):
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            if i >= warmup:
+                samples.append(elapsed)
+    return samples
+
+
+def summarize(samples):
+    values = np.asarray(samples) * 1e6
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'requests': len(values),
+        'mean_us': round(float(values.mean()), 1),
+        'p50_us': round(float(p50), 1),
+        'p90_us': round(float(p90), 1),
+        'p99_us': round(float(p99), 1),
+        'rps': round(len(values) / (values.sum() / 1e6), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tcp', help='Service base URL over TCP (empty to skip)', default='http://127.0.0.1:5000')
+    parser.add_argument('--uds', help='Path of the service\'s Unix domain socket (VISION_UDS)', default=None)
+    parser.add_argument('--path', help='Endpoint to request', default='/health')
+    parser.add_argument('--requests', help='Requests per configuration', type=int, default=1000)
+    parser.add_argument('--report', help='Also write the results to this JSON file', default=None)
+    args = parser.parse_args()
+
+    def client(base_url, uds=None):
+        def factory(reuse):
+            # No idle connections kept = a fresh connect for every request
+            limits = httpx.Limits(max_keepalive_connections=1 if reuse else 0)
+            return httpx.Client(base_url=base_url, timeout=10,
+                                transport=httpx.HTTPTransport(uds=uds, limits=limits))
+        return factory
+
+    transports = []
+    if args.tcp:
+        transports.append(('tcp', client(args.tcp)))
+    if args.uds:
+        transports.append(('uds', client('http://localhost', uds=args.uds)))
+    if not transports:
+        print('ERROR: Give --tcp and/or --uds')
+        sys.exit(1)
+
+    results = {}
+    for name, factory in transports:
+        for reuse in (True, False):
+            label = f"{name} {'keep-alive' if reuse else 'new connection'}"
+            try:
+                results[label] = summarize(run(factory, args.path, args.requests, reuse))
+            except httpx.HTTPError as e:
+                print(f'ERROR: {label}: {e}')
+                sys.exit(1)
+
+    print(f'{args.requests} x GET {args.path}')
+    print(f'{"configuration":<26}{"mean":>10}{"p50":>10}{"p90":>10}{"p99":>10}{"req/s":>10}  (us)')
+    for label, r in results.items():
+        print(f'{label:<26}' + ''.join(f'{r[k]:>10.1f}' for k in ['mean_us', 'p50_us', 'p90_us', 'p99_us', 'rps']))
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'path': args.path, 'results': results}, f, indent=2)
+        print(f'Report written to {args.report}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Headless benchmark mode for yolo_detect.py (--benchmark)
+
+Runs a source through the same steps as the interactive loop, one frame at
+a time and without a window, and times each step separately:
+
+    capture      reading/decoding the frame from the file or camera
+    preprocess   resizing to --resolution plus the model's own preprocessing
+    inference    the forward pass
+    postprocess  the model's NMS plus turning results into boxes
+    draw         drawing boxes and labels on the frame
+
+Ultralytics reports its own preprocess/inference/postprocess split per
+result (`result.speed`); for models that don't, the whole model call counts
+as inference. Percentiles go to the console and to a JSON report, so model
+files and store PCs can be compared on the same footing.
+"""
+
+import json
+import platform
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+STAGES = ['capture', 'preprocess', 'inference', 'postprocess', 'draw', 'total']
+PROGRESS_EVERY_S = 5.0
+
+
+def summarize(samples_ms):
+    values = np.asarray(samples_ms, dtype=np.float64)
+    if len(values) == 0:
+        return {'mean_ms': None, 'p50_ms': None, 'p90_ms': None, 'p99_ms': None, 'max_ms': None}
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(p50), 3),
+        'p90_ms': round(float(p90), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def run_benchmark(model, grab, extract, draw, frames=None, seconds=None, warmup=10,
+                  resize=None, report_path=None, info=None):
+    """
+    Time `frames` frames (or `seconds` of frames) from `grab()`; returns the report dict
+
+    `grab()` returns the next raw frame or None when the source ends;
+    `extract(result)` and `draw(frame, rows)` are the interactive loop's own
+    helpers. The first `warmup` frames run but are not counted.
+    """
+    samples = {stage: [] for stage in STAGES}
+    counted = 0
+    started = None
+    last_report = time.perf_counter()
+
+    def done():
+        if frames is not None and counted >= frames:
+            return True
+        return seconds is not None and started is not None and time.perf_counter() - started >= seconds
+
+    index = 0
+    while not done():
+        t0 = time.perf_counter()
+        frame = grab()
+        if frame is None:
+            break
+        t1 = time.perf_counter()
+
+        if resize:
+            frame = cv2.resize(frame, resize)
+        t2 = time.perf_counter()
+
+        result = model(frame, verbose=False)[0]
+        t3 = time.perf_counter()
+
+        rows = extract(result)
+        t4 = time.perf_counter()
+
+        draw(frame, rows)
+        t5 = time.perf_counter()
+
+        index += 1
+        if index <= warmup:
+            continue
+        if started is None:
+            started = t0
+        counted += 1
+
+        model_ms = (t3 - t2) * 1000
+        speed = getattr(result, 'speed', None) or {}
+        if 'inference' in speed:
+            # Whatever the model call spent outside its own three steps counts as preprocessing
+            overhead = max(0.0, model_ms - speed['preprocess'] - speed['inference'] - speed['postprocess'])
+            model_split = (speed['preprocess'] + overhead, speed['inference'], speed['postprocess'])
+        else:
+            model_split = (0.0, model_ms, 0.0)
+
+        samples['capture'].append((t1 - t0) * 1000)
+        samples['preprocess'].append((t2 - t1) * 1000 + model_split[0])
+        samples['inference'].append(model_split[1])
+        samples['postprocess'].append(model_split[2] + (t4 - t3) * 1000)
+        samples['draw'].append((t5 - t4) * 1000)
+        samples['total'].append((t5 - t0) * 1000)
+
+        now = time.perf_counter()
+        if now - last_report >= PROGRESS_EVERY_S:
+            last_report = now
+            print(f'{counted} frames, {counted / (now - started):.1f} FPS')
+
+    elapsed = time.perf_counter() - started if started is not None else 0.0
+    report = {
+        **(info or {}),
+        'frames': counted,
+        'warmup_frames': min(index, warmup),
+        'elapsed_s': round(elapsed, 3),
+        'fps': round(counted / elapsed, 2) if elapsed > 0 else 0.0,
+        'stages': {stage: summarize(samples[stage]) for stage in STAGES},
+        'host': {
+            'name': platform.node(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'system': f'{platform.system()} {platform.release()}',
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+        },
+        'timestamp': datetime.now().isoformat(),
+    }
+
+    print(f'Benchmarked {counted} frames in {elapsed:.1f}s ({report["fps"]:.2f} FPS)')
+    print(f'{"stage":<12}{"mean":>9}{"p50":>9}{"p90":>9}{"p99":>9}{"max":>9}  (ms)')
+    for stage in STAGES:
+        s = report['stages'][stage]
+        if s['mean_ms'] is None:
+            continue
+        print(f'{stage:<12}' + ''.join(f'{s[k]:>9.2f}' for k in ['mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms']))
+
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f'Report written to {report_path}')
+    return report
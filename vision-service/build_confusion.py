@@ -0,0 +1,126 @@
+"""
+Build the confusion-aware suggestion table used by app.py (VISION_CONFUSIONS)
+
+Runs the model over the validation split, builds the class confusion matrix
+(the numbers behind train/confusion_matrix.png) and stores, for every class
+the model can predict, the classes it most often really was:
+
+    {
+        "classes": ["ariel", ...],
+        "matrix": [[...]],            # rows = true class, cols = predicted, last = background
+        "alternatives": {"ariel": [{"class": "wings", "rate": 0.12}, ...]},
+        ...
+    }
+
+Low-confidence responses list those alternatives right after the detected
+product, so the service pays nothing at runtime beyond a dict lookup.
+
+Example:
+    python build_confusion.py --model my_model.pt --data dataset/data.yaml --output confusions.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from validation import iter_labeled_images, load_dataset, match_predictions, predict
+
+
+def confusion_matrix(model, data_yaml: str, splits: List[str], classes: List[str],
+                     conf: float = 0.25, iou: float = 0.5) -> np.ndarray:
+    """(n+1, n+1) counts, rows = true class, cols = predicted class; index n = background"""
+    index = {name: i for i, name in enumerate(classes)}
+    background = len(classes)
+    matrix = np.zeros((background + 1, background + 1), dtype=np.int64)
+
+    for _, img, labels in iter_labeled_images(data_yaml, splits):
+        for true_cls, pred_cls, _ in match_predictions(labels, predict(model, img, conf), iou):
+            matrix[index.get(true_cls, background), index.get(pred_cls, background)] += 1
+    return matrix
+
+
+def alternatives_table(matrix: np.ndarray, classes: List[str], top: int = 3,
+                       min_rate: float = 0.02) -> Dict[str, List[dict]]:
+    """
+    For each predicted class, the true classes it is most often confused with
+
+    `rate` is the share of that class's predictions that were really the
+    alternative (column-normalised, background excluded from the alternatives).
+    """
+    n = len(classes)
+    table = {}
+    for p in range(n):
+        predicted = matrix[:, p].sum()
+        if predicted == 0:
+            continue
+        rates = matrix[:n, p] / predicted
+        ranked = [
+            {'class': classes[t], 'rate': round(float(rates[t]), 4)}
+            for t in np.argsort(-rates)
+            if t != p and rates[t] >= min_rate
+        ]
+        if ranked:
+            table[classes[p]] = ranked[:top]
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='Path to the YOLO model the service runs (example: "my_model.pt")',
+                        default='my_model.pt')
+    parser.add_argument('--data', help='YOLO data.yaml of the dataset the model was trained on', required=True)
+    parser.add_argument('--output', help='Where to write the table', default='confusions.json')
+    parser.add_argument('--splits', help='Splits to evaluate (comma separated)', default='val')
+    parser.add_argument('--conf', help='Minimum prediction confidence (keep low so weak guesses count)',
+                        type=float, default=0.25)
+    parser.add_argument('--iou', help='IoU for a prediction to match a labeled box', type=float, default=0.5)
+    parser.add_argument('--top', help='Alternatives kept per class', type=int, default=3)
+    parser.add_argument('--min-rate', help='Ignore confusions rarer than this', type=float, default=0.02)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f'ERROR: Model not found: {args.model}')
+        sys.exit(1)
+
+    from ultralytics import YOLO
+    model = YOLO(args.model, task='detect')
+
+    names, _, _ = load_dataset(args.data)
+    classes = [names[i] for i in sorted(names)]
+
+    start = time.time()
+    matrix = confusion_matrix(model, args.data, args.splits.split(','), classes, args.conf, args.iou)
+    if matrix.sum() == 0:
+        print('ERROR: No labeled validation images found')
+        sys.exit(1)
+
+    table = alternatives_table(matrix, classes, args.top, args.min_rate)
+    with open(f"{args.output}.tmp", 'w') as f:
+        json.dump({
+            'classes': classes,
+            'matrix': matrix.tolist(),
+            'alternatives': table,
+            'model': args.model,
+            'conf': args.conf,
+            'iou': args.iou,
+            'built_at': datetime.now().isoformat(),
+        }, f, indent=2)
+    os.replace(f"{args.output}.tmp", args.output)
+
+    correct = int(np.trace(matrix[:-1, :-1]))
+    print(f'✓ {int(matrix.sum())} boxes evaluated in {time.time() - start:.1f}s '
+          f'({correct} correct, {int(matrix[:-1, -1].sum())} missed, {int(matrix[-1, :-1].sum())} false positives)')
+    for class_name, alternatives in table.items():
+        mixed = ', '.join(f"{a['class']} {a['rate']:.0%}" for a in alternatives)
+        print(f'  {class_name} → {mixed}')
+    print(f'Set VISION_CONFUSIONS={args.output} to use it')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Build the reference embeddings used for visual suggestions (see embeddings.py)
+
+Reads labeled images, crops every labeled product, embeds the crops with the
+detection model and writes <output>.npy / <output>.json for VISION_EMBEDDINGS.
+
+Labeled images can be either:
+- a YOLO dataset: path to its data.yaml (class names + images/ and labels/ dirs)
+- a folder with one subfolder of photos per class: <data>/<class_name>/*.jpg
+
+Example:
+    python build_embeddings.py --model my_model.pt --data dataset/data.yaml --output embeddings/reference
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+import cv2
+import numpy as np
+
+from embeddings import crop_box, embed_images
+from validation import iter_labeled_images, list_images
+
+
+def iter_folder_crops(root: str) -> Iterator[Tuple[str, np.ndarray]]:
+    """(class_name, image) for every photo in <root>/<class_name>/"""
+    for class_name in sorted(os.listdir(root)):
+        class_dir = os.path.join(root, class_name)
+        if not os.path.isdir(class_dir):
+            continue
+        for path in list_images(class_dir):
+            img = cv2.imread(path)
+            if img is not None:
+                yield class_name, img
+
+
+def iter_yolo_crops(data_yaml: str, splits: List[str]) -> Iterator[Tuple[str, np.ndarray]]:
+    """(class_name, crop) for every labeled box in a YOLO dataset"""
+    for _, img, labels in iter_labeled_images(data_yaml, splits):
+        for class_name, box in labels:
+            yield class_name, crop_box(img, *box)
+
+
+def build_reference(model, crops: Iterator[Tuple[str, np.ndarray]],
+                    batch_size: int = 16, max_per_class: int = 50) -> Dict[str, np.ndarray]:
+    """Embed crops in batches; returns {class_name: (n, D) matrix}"""
+    per_class: Dict[str, List[np.ndarray]] = {}
+    batch, labels = [], []
+
+    def flush():
+        if batch:
+            for label, vector in zip(labels, embed_images(model, batch)):
+                per_class.setdefault(label, []).append(vector)
+            batch.clear()
+            labels.clear()
+
+    taken: Dict[str, int] = {}
+    for class_name, crop in crops:
+        if taken.get(class_name, 0) >= max_per_class:
+            continue
+        taken[class_name] = taken.get(class_name, 0) + 1
+        batch.append(crop)
+        labels.append(class_name)
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    return {name: np.stack(vectors) for name, vectors in sorted(per_class.items())}
+
+
+def write_reference(prefix: str, reference: Dict[str, np.ndarray], model_path: str):
+    """Write <prefix>.npy and <prefix>.json; replaces any previous index atomically"""
+    classes = list(reference)
+    matrix = np.concatenate([reference[c] for c in classes]).astype(np.float32)
+
+    os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+    with open(f"{prefix}.npy.tmp", 'wb') as f:
+        np.save(f, matrix)
+    with open(f"{prefix}.json.tmp", 'w') as f:
+        json.dump({
+            'classes': classes,
+            'counts': [len(reference[c]) for c in classes],
+            'dim': int(matrix.shape[1]),
+            'model': model_path,
+            'built_at': datetime.now().isoformat(),
+        }, f, indent=2)
+    os.replace(f"{prefix}.npy.tmp", f"{prefix}.npy")
+    os.replace(f"{prefix}.json.tmp", f"{prefix}.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='Path to the YOLO model the service runs (example: "my_model.pt")',
+                        default='my_model.pt')
+    parser.add_argument('--data', help='YOLO data.yaml, or a folder with one subfolder per class', required=True)
+    parser.add_argument('--output', help='Output prefix (writes <prefix>.npy and <prefix>.json)',
+                        default='embeddings/reference')
+    parser.add_argument('--splits', help='YOLO splits to read (comma separated)', default='train,val')
+    parser.add_argument('--max-per-class', help='Reference crops kept per class', type=int, default=50)
+    parser.add_argument('--batch', help='Crops embedded per model call', type=int, default=16)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f'ERROR: Model not found: {args.model}')
+        sys.exit(1)
+
+    from ultralytics import YOLO
+    model = YOLO(args.model, task='detect')
+
+    if os.path.isdir(args.data):
+        crops = iter_folder_crops(args.data)
+    else:
+        crops = iter_yolo_crops(args.data, args.splits.split(','))
+
+    start = time.time()
+    reference = build_reference(model, crops, args.batch, args.max_per_class)
+    if not reference:
+        print('ERROR: No labeled images found')
+        sys.exit(1)
+
+    write_reference(args.output, reference, args.model)
+
+    total = sum(len(v) for v in reference.values())
+    print(f'✓ {total} reference embeddings for {len(reference)} classes in {time.time() - start:.1f}s')
+    for class_name, vectors in reference.items():
+        print(f'  {class_name}: {len(vectors)}')
+    print(f'Set VISION_EMBEDDINGS={args.output} to use them')
+
+
+if __name__ == '__main__':
+    main()
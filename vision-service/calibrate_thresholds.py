@@ -0,0 +1,190 @@
+"""
+Fit per-class confidence calibration and decision thresholds (see calibration.py)
+
+Runs the model over the validation split at a low confidence, matches every
+prediction to the labeled boxes and, for each class:
+- fits Platt scaling of its confidences against "was this prediction right"
+- picks min_confidence, where the calibrated probability of being right
+  drops below --keep-precision
+- picks auto_add, the lowest confidence at which predictions of this class
+  reach --target-precision (null if they never do)
+
+Classes with fewer than --min-samples predictions are left out and keep the
+service defaults (CONFIDENCE_THRESHOLD / AUTO_ADD_CONFIDENCE).
+
+Example:
+    python calibrate_thresholds.py --model my_model.pt --data dataset/data.yaml --target-precision 0.97
+then start the service with VISION_CALIBRATION=calibration.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from validation import iter_labeled_images, match_predictions, predict
+
+
+def collect_predictions(model, data_yaml: str, splits: List[str], conf: float,
+                        iou: float) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """{predicted class: (confidences, correct)} over the validation images"""
+    per_class: Dict[str, list] = {}
+    for _, img, labels in iter_labeled_images(data_yaml, splits):
+        for true_cls, pred_cls, confidence in match_predictions(labels, predict(model, img, conf), iou):
+            if pred_cls is not None:
+                per_class.setdefault(pred_cls, []).append((confidence, true_cls == pred_cls))
+
+    return {
+        cls: (np.array([c for c, _ in rows], dtype=np.float64), np.array([ok for _, ok in rows], dtype=bool))
+        for cls, rows in per_class.items()
+    }
+
+
+def fit_platt(confidences: np.ndarray, correct: np.ndarray, iterations: int = 50,
+              l2: float = 1e-3) -> Optional[List[float]]:
+    """Logistic regression of `correct` on logit(confidence); None if degenerate"""
+    if correct.all() or not correct.any():
+        return None
+
+    p = np.clip(confidences, 1e-6, 1 - 1e-6)
+    x = np.log(p / (1 - p))
+    y = correct.astype(np.float64)
+    a, b = 1.0, 0.0
+
+    # Newton-Raphson on the regularised log loss
+    for _ in range(iterations):
+        q = 1 / (1 + np.exp(-(a * x + b)))
+        w = q * (1 - q)
+        grad = np.array([np.sum((q - y) * x) + l2 * (a - 1), np.sum(q - y) + l2 * b])
+        hess = np.array([[np.sum(w * x * x) + l2, np.sum(w * x)],
+                         [np.sum(w * x), np.sum(w) + l2]])
+        try:
+            step = np.linalg.solve(hess, grad)
+        except np.linalg.LinAlgError:
+            break
+        a, b = a - step[0], b - step[1]
+        if np.abs(step).max() < 1e-8:
+            break
+
+    return [round(float(a), 6), round(float(b), 6)]
+
+
+def lowest_threshold(confidences: np.ndarray, correct: np.ndarray,
+                     precision: float) -> Tuple[Optional[float], float, float]:
+    """
+    Lowest confidence t where predictions with confidence >= t are right at
+    least `precision` of the time
+
+    Returns (t or None, precision at t, share of correct predictions kept).
+    """
+    order = np.argsort(-confidences)
+    conf_sorted, ok_sorted = confidences[order], correct[order]
+    hits = np.cumsum(ok_sorted)
+    running = hits / np.arange(1, len(ok_sorted) + 1)
+
+    # Only cut between distinct confidences, so ties fall on the same side
+    boundary = np.append(conf_sorted[1:] != conf_sorted[:-1], True)
+    candidates = np.nonzero(boundary & (running >= precision))[0]
+    if len(candidates) == 0:
+        return None, 0.0, 0.0
+
+    k = candidates[-1]
+    return float(conf_sorted[k]), float(running[k]), float(hits[k] / max(1, correct.sum()))
+
+
+def platt_threshold(platt: Optional[List[float]], probability: float) -> Optional[float]:
+    """Raw confidence at which the Platt-calibrated probability equals `probability`"""
+    if not platt or platt[0] <= 0:
+        return None
+    a, b = platt
+    z = (np.log(probability / (1 - probability)) - b) / a
+    return float(1 / (1 + np.exp(-z)))
+
+
+def calibrate(predictions: Dict[str, Tuple[np.ndarray, np.ndarray]], target_precision: float,
+              keep_precision: float, min_samples: int, floor: float) -> Dict[str, dict]:
+    table = {}
+    for class_name in sorted(predictions):
+        confidences, correct = predictions[class_name]
+        if len(confidences) < min_samples:
+            continue
+
+        platt = fit_platt(confidences, correct)
+        auto_add, precision, recall = lowest_threshold(confidences, correct, target_precision)
+        min_confidence = platt_threshold(platt, keep_precision)
+        if min_confidence is None:
+            min_confidence, _, _ = lowest_threshold(confidences, correct, keep_precision)
+        if min_confidence is None:
+            min_confidence = floor
+
+        table[class_name] = {
+            'platt': platt,
+            'min_confidence': round(float(np.clip(min_confidence, floor, 1.0)), 4),
+            'auto_add': round(auto_add, 4) if auto_add is not None else None,
+            'precision_at_auto_add': round(precision, 4),
+            'auto_add_recall': round(recall, 4),  # share of right answers resolved on first scan
+            'samples': int(len(confidences)),
+            'accuracy': round(float(correct.mean()), 4),
+        }
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', help='Path to the YOLO model the service runs (example: "my_model.pt")',
+                        default='my_model.pt')
+    parser.add_argument('--data', help='YOLO data.yaml of the dataset the model was trained on', required=True)
+    parser.add_argument('--output', help='Where to write the table', default='calibration.json')
+    parser.add_argument('--splits', help='Splits to evaluate (comma separated)', default='val')
+    parser.add_argument('--conf', help='Confidence to run the model at (lowest threshold that can be picked)',
+                        type=float, default=0.1)
+    parser.add_argument('--iou', help='IoU for a prediction to match a labeled box', type=float, default=0.5)
+    parser.add_argument('--target-precision', help='Precision required to auto-add', type=float, default=0.95)
+    parser.add_argument('--keep-precision', help='Precision required to show a detection at all',
+                        type=float, default=0.5)
+    parser.add_argument('--min-samples', help='Predictions needed before a class gets its own thresholds',
+                        type=int, default=20)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f'ERROR: Model not found: {args.model}')
+        sys.exit(1)
+
+    from ultralytics import YOLO
+    model = YOLO(args.model, task='detect')
+
+    start = time.time()
+    predictions = collect_predictions(model, args.data, args.splits.split(','), args.conf, args.iou)
+    if not predictions:
+        print('ERROR: No predictions on the validation images')
+        sys.exit(1)
+
+    table = calibrate(predictions, args.target_precision, args.keep_precision, args.min_samples, args.conf)
+    with open(f"{args.output}.tmp", 'w') as f:
+        json.dump({
+            'target_precision': args.target_precision,
+            'keep_precision': args.keep_precision,
+            'classes': table,
+            'model': args.model,
+            'built_at': datetime.now().isoformat(),
+        }, f, indent=2)
+    os.replace(f"{args.output}.tmp", args.output)
+
+    print(f'✓ Calibrated {len(table)} of {len(predictions)} classes in {time.time() - start:.1f}s')
+    for class_name, entry in table.items():
+        auto_add = f"{entry['auto_add']:.2f}" if entry['auto_add'] is not None else 'never'
+        print(f"  {class_name}: keep >= {entry['min_confidence']:.2f}, auto-add >= {auto_add} "
+              f"({entry['auto_add_recall']:.0%} resolved on first scan, n={entry['samples']})")
+    skipped = sorted(set(predictions) - set(table))
+    if skipped:
+        print(f'  too few samples, using defaults: {", ".join(skipped)}')
+    print(f'Set VISION_CALIBRATION={args.output} to use it')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-class Confidence Calibration for Family Store Vision Service
+
+Raw YOLO confidences don't mean the same thing for every class: a 0.6 on a
+distinct bottle is nearly always right, a 0.6 on one of the look-alike
+detergent packs often is not. calibrate_thresholds.py fits, per class:
+
+- a Platt scaling (a, b): calibrated = sigmoid(a * logit(confidence) + b)
+- min_confidence: below this the detection is more likely wrong than right
+- auto_add: the lowest raw confidence that still meets the target precision
+  on validation data (null = never auto-add this class)
+
+Thresholds are stored in raw-confidence space, so applying them is a plain
+comparison. Classes missing from the table use the service defaults.
+"""
+
+import json
+import logging
+import math
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _logit(p: float) -> float:
+    p = min(max(p, 1e-6), 1 - 1e-6)
+    return math.log(p / (1 - p))
+
+
+class CalibrationTable:
+    """Per-class thresholds with global fallbacks"""
+
+    def __init__(self, default_min_confidence: float, default_auto_add: float,
+                 classes: Optional[Dict[str, dict]] = None, source: Optional[str] = None,
+                 target_precision: Optional[float] = None):
+        self.default_min_confidence = default_min_confidence
+        self.default_auto_add = default_auto_add
+        self.classes = classes or {}
+        self.source = source
+        self.target_precision = target_precision
+
+    @classmethod
+    def load(cls, path: str, default_min_confidence: float, default_auto_add: float) -> 'CalibrationTable':
+        """Read a calibrate_thresholds.py output file"""
+        with open(path) as f:
+            data = json.load(f)
+        table = cls(default_min_confidence, default_auto_add, data.get('classes', {}),
+                    source=path, target_precision=data.get('target_precision'))
+        logger.info(f"✓ Calibrated thresholds for {len(table.classes)} classes from {path}"
+                    f" (target precision {table.target_precision})")
+        return table
+
+    def __contains__(self, class_name: str):
+        return class_name in self.classes
+
+    @property
+    def floor(self) -> float:
+        """Lowest confidence any class keeps - the threshold to run the model at"""
+        return min([self.default_min_confidence] + [self.min_confidence(c) for c in self.classes])
+
+    def min_confidence(self, class_name: str) -> float:
+        entry = self.classes.get(class_name)
+        if entry is None or entry.get('min_confidence') is None:
+            return self.default_min_confidence
+        return entry['min_confidence']
+
+    def auto_add(self, class_name: str) -> Optional[float]:
+        """Raw confidence needed to auto-add, or None if this class never auto-adds"""
+        entry = self.classes.get(class_name)
+        if entry is None:
+            return self.default_auto_add
+        return entry.get('auto_add')
+
+    def keeps(self, class_name: str, confidence: float) -> bool:
+        return confidence >= self.min_confidence(class_name)
+
+    def is_auto_add(self, class_name: str, confidence: float) -> bool:
+        threshold = self.auto_add(class_name)
+        return threshold is not None and confidence >= threshold
+
+    def calibrate(self, class_name: str, confidence: float) -> float:
+        """Probability the detection is right, or the raw confidence if uncalibrated"""
+        entry = self.classes.get(class_name)
+        platt = entry.get('platt') if entry else None
+        if not platt:
+            return confidence
+        a, b = platt
+        return 1 / (1 + math.exp(-(a * _logit(confidence) + b)))
+
+    def stats(self) -> dict:
+        return {
+            'source': self.source,
+            'target_precision': self.target_precision,
+            'default_min_confidence': self.default_min_confidence,
+            'default_auto_add': self.default_auto_add,
+            'classes': {
+                c: {'min_confidence': self.min_confidence(c), 'auto_add': self.auto_add(c)}
+                for c in self.classes
+            },
+        }
@@ -0,0 +1,263 @@
+"""
+Server-side camera mode for Family Store Vision Service
+
+When the camera is plugged into the machine running the service, frames
+don't need to travel browser canvas -> JPEG -> base64 -> Laravel -> JSON ->
+decode. CameraStream owns the camera instead:
+
+- a capture thread reads frames (video_sources.FrameSource, same --source
+  specs as yolo_detect.py) into a one-slot queue, so inference always gets
+  the newest frame
+- a detection thread runs them through the service's model at most
+  `max_fps` times a second
+- a product is confirmed once it shows up in `confirm_frames` processed
+  frames in a row, and is announced once; it can be announced again after it
+  has been out of view for `clear_frames` frames (the next item of the same
+  kind being put down)
+- confirmed detections are pushed to every subscriber (the SSE endpoint);
+  a slow subscriber loses its oldest events rather than holding others up
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from frame_pipeline import FrameQueue, StageMeter
+from inference_queue import QueueFullError
+from video_sources import FrameSource
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionConfirmer:
+    """Debounces per-frame detections into one event per product placed in view"""
+
+    def __init__(self, confirm_frames: int = 3, clear_frames: int = 5):
+        self.confirm_frames = confirm_frames
+        self.clear_frames = clear_frames
+        self._streak: Dict[str, int] = {}
+        self._missing: Dict[str, int] = {}
+        self._announced: Set[str] = set()
+
+    def update(self, detections: List) -> List:
+        """Feed one frame's detections; returns those confirmed on this frame"""
+        best = {}
+        for d in detections:
+            if d.class_name not in best or d.confidence > best[d.class_name].confidence:
+                best[d.class_name] = d
+
+        confirmed = []
+        for class_name, detection in best.items():
+            self._streak[class_name] = self._streak.get(class_name, 0) + 1
+            self._missing[class_name] = 0
+            if self._streak[class_name] >= self.confirm_frames and class_name not in self._announced:
+                self._announced.add(class_name)
+                confirmed.append(detection)
+
+        for class_name in list(self._streak):
+            if class_name in best:
+                continue
+            self._streak[class_name] = 0
+            self._missing[class_name] += 1
+            if self._missing[class_name] >= self.clear_frames:
+                self._announced.discard(class_name)
+                del self._streak[class_name], self._missing[class_name]
+
+        return confirmed
+
+
+class CameraStream:
+    """
+    Continuous capture + detection with pushed events
+
+    Args:
+        spec: source spec, e.g. "usb0" or a video file (see video_sources.parse_source)
+        detect: frame -> concurrent Future of a detection list (e.g. an
+            inference queue submit); called from the detection thread
+        to_event: detection -> JSON-serialisable dict for subscribers
+        resolution: (width, height) to capture at, or None for the camera default
+        max_fps: cap on frames run through the model per second (0 = no cap)
+        detect_timeout: seconds to wait for one frame's detections before skipping it
+        subscriber_queue: events buffered per subscriber
+        history: recent events kept to replay to reconnecting subscribers
+    """
+
+    def __init__(self, spec: str, detect: Callable, to_event: Callable,
+                 resolution: Optional[Tuple[int, int]] = None, max_fps: float = 10,
+                 confirm_frames: int = 3, clear_frames: int = 5, detect_timeout: float = 5.0,
+                 subscriber_queue: int = 100, history: int = 100):
+        self.spec = spec
+        self.resolution = resolution
+        self.max_fps = max_fps
+        self.detect_timeout = detect_timeout
+        self.subscriber_queue = subscriber_queue
+
+        self._detect = detect
+        self._to_event = to_event
+        self._confirmer = DetectionConfirmer(confirm_frames, clear_frames)
+        self._source: Optional[FrameSource] = None
+        self._frames: Optional[FrameQueue] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._history: Deque[dict] = deque(maxlen=history)
+        self._next_id = 1  # only touched on the event loop
+
+        self.capture_meter = StageMeter()
+        self.detect_meter = StageMeter()
+        # Each counter has a single writer: the first three the detection
+        # thread, the last two the event loop
+        self.counters = {
+            'frames_skipped': 0,      # model busy or queue full
+            'detection_timeouts': 0,
+            'detection_errors': 0,
+            'events': 0,
+            'events_dropped': 0,      # subscriber too slow
+        }
+        self.running = False
+        self.end_reason = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        """Open the source and start the threads (SourceError if it can't be opened)"""
+        self._loop = loop
+        self._source = FrameSource(self.spec, self.resolution)
+        self._frames = FrameQueue(1, drop_oldest=self._source.live)
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture, name='camera-capture', daemon=True),
+            threading.Thread(target=self._run_detection, name='camera-detect', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        self.running = True
+        logger.info(f"✓ Camera mode: {self.spec} ({self._source.source_type}), up to {self.max_fps or '∞'} FPS")
+
+    def stop(self):
+        self._stop.set()
+        if self._frames is not None:
+            self._frames.close()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        if self._source is not None:
+            self._source.release()
+            self._source = None
+        self.running = False
+
+    def _capture(self):
+        while not self._stop.is_set():
+            frame = self._source.read()
+            if frame is None:
+                self.end_reason = self._source.end_reason
+                logger.warning(f"⚠ Camera stopped: {self.end_reason}")
+                break
+            self.capture_meter.tick()
+            if not self._frames.put(frame):
+                break
+        self._frames.close()
+
+    def _run_detection(self):
+        interval = 1 / self.max_fps if self.max_fps else 0
+        next_at = 0.0
+        frame_no = 0
+
+        while not self._stop.is_set():
+            wait = next_at - time.perf_counter()
+            if wait > 0:
+                self._stop.wait(wait)
+            frame = self._frames.get()
+            if frame is None:
+                break
+            next_at = time.perf_counter() + interval
+            frame_no += 1
+
+            try:
+                detections = self._wait_for(self._detect(frame))
+            except QueueFullError:
+                self.counters['frames_skipped'] += 1
+                continue
+            except concurrent.futures.TimeoutError:
+                self.counters['detection_timeouts'] += 1
+                continue
+            except Exception as e:
+                self.counters['detection_errors'] += 1
+                logger.error(f"Camera detection failed: {e}")
+                continue
+            if detections is None:
+                break  # stopping
+            self.detect_meter.tick()
+
+            for detection in self._confirmer.update(detections):
+                self._publish(dict(self._to_event(detection), frame=frame_no))
+
+        self.running = False
+
+    def _wait_for(self, future):
+        """
+        Result of a detection future; None if the stream is stopped first,
+        TimeoutError (future cancelled) after `detect_timeout` seconds
+        """
+        give_up_at = time.perf_counter() + self.detect_timeout
+        while not concurrent.futures.wait([future], timeout=0.1).done:
+            if self._stop.is_set() or time.perf_counter() >= give_up_at:
+                future.cancel()  # drops it if still queued
+                if self._stop.is_set():
+                    return None
+                raise concurrent.futures.TimeoutError
+        return future.result()
+
+    def _publish(self, payload: dict):
+        if self._stop.is_set():
+            return
+        event = {'timestamp': datetime.now().isoformat(), **payload}
+        try:
+            self._loop.call_soon_threadsafe(self._fanout, event)
+        except RuntimeError:
+            pass  # event loop already closed - shutting down
+
+    def _fanout(self, event: dict):
+        """Runs on the event loop; numbers the event and hands it to subscribers"""
+        event = {'id': self._next_id, **event}
+        self._next_id += 1
+        self.counters['events'] += 1
+        self._history.append(event)
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.counters['events_dropped'] += 1
+            queue.put_nowait(event)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> asyncio.Queue:
+        """New subscriber queue (call on the event loop); replays events after `last_event_id`"""
+        queue = asyncio.Queue(maxsize=self.subscriber_queue)
+        if last_event_id is not None:
+            for event in self._history:
+                if event['id'] > last_event_id and not queue.full():
+                    queue.put_nowait(event)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def stats(self) -> dict:
+        return {
+            'source': self.spec,
+            'source_type': self._source.source_type if self._source else None,
+            'running': self.running,
+            'end_reason': self.end_reason,
+            'capture_fps': round(self.capture_meter.fps, 1),
+            'detect_fps': round(self.detect_meter.fps, 1),
+            'frames_captured': self.capture_meter.frames,
+            'frames_detected': self.detect_meter.frames,
+            'frames_dropped': self._frames.dropped if self._frames else 0,
+            'subscribers': len(self._subscribers),
+            **self.counters,
+        }
@@ -0,0 +1,306 @@
+"""
+Product Catalog for Family Store Vision Service
+
+Keeps an in-memory index of the POS catalog so detections come back already
+priced, without a second /units/lookup round trip.
+
+Sources:
+- static:   the hardcoded PRODUCT_DATABASE dict (used when no snapshot is set)
+- SQLite:   a copy of the Laravel database (products + product_units tables)
+- JSON:     an export of the same tables: {"products": [...], "product_units": [...]}
+
+YOLO class names are tied to catalog rows through their barcode. The class map
+(class_name -> barcode) comes from a JSON file, falling back to the barcodes in
+the static dict.
+
+Refreshes run on a background thread and build a new index state that is
+swapped in with one assignment, so readers never wait on the database or see
+half of an update. SQLite snapshots are refreshed incrementally by
+`updated_at` (plus the list of unit ids, to catch deletes); JSON exports are
+reloaded when the file changes.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rows whose product or unit changed since the watermark
+SNAPSHOT_QUERY = """
+    SELECT
+        u.id AS unit_id,
+        u.barcode,
+        u.unit_name,
+        u.price,
+        u.price_type,
+        p.id AS product_id,
+        p.name,
+        p.category,
+        p.stock_quantity,
+        MAX(COALESCE(u.updated_at, ''), COALESCE(p.updated_at, '')) AS updated_at
+    FROM product_units u
+    JOIN products p ON p.id = u.product_id
+    WHERE COALESCE(u.updated_at, '') >= ? OR COALESCE(p.updated_at, '') >= ?
+"""
+
+# Every unit still in the catalog; anything indexed but missing here was deleted
+UNIT_IDS_QUERY = "SELECT u.id FROM product_units u JOIN products p ON p.id = u.product_id"
+
+
+def _entry_from_row(row: dict) -> dict:
+    """Catalog entry in the same shape as PRODUCT_DATABASE values"""
+    return {
+        'name': row['name'],
+        'barcode': row['barcode'],
+        'price': float(row['price']),
+        'category': row.get('category') or 'Uncategorized',
+        'unit_id': row.get('unit_id'),
+        'product_id': row.get('product_id'),
+        'unit_name': row.get('unit_name'),
+        'price_type': row.get('price_type'),
+        'stock': float(row['stock_quantity']) if row.get('stock_quantity') is not None else None,
+    }
+
+
+def _unit_key(entry: dict):
+    """Units are indexed by their id; static entries have none, so by barcode"""
+    return entry['unit_id'] if entry.get('unit_id') is not None else entry['barcode']
+
+
+class _CatalogState(NamedTuple):
+    """One consistent version of every index; replaced whole, never mutated"""
+    version: int
+    by_unit: Dict[object, dict]
+    by_barcode: Dict[str, dict]
+    by_class: Dict[str, dict]
+    class_by_barcode: Dict[str, str]
+    class_ids: Dict[str, int]
+
+
+class ProductCatalog:
+    """
+    Versioned class-name and barcode index over the store catalog
+
+    `version` increases every time an entry is added, changed or removed, so
+    clients can cache catalog metadata and only refetch when it moves.
+    """
+
+    def __init__(self, static: Dict[str, dict], snapshot_path: Optional[str] = None,
+                 class_map_path: Optional[str] = None, refresh_interval: float = 30.0):
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.source = 'static'
+
+        self._static = static
+        self._class_map = self._load_class_map(class_map_path)
+
+        # Replaced by a single assignment on refresh; readers take one reference
+        self._state = _CatalogState(0, {}, {}, {}, {}, {})
+
+        self._watermark = ''
+        self._snapshot_mtime = None
+        self._listeners: List[Callable[['ProductCatalog'], None]] = []
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._install({
+            info['barcode']: dict(info, unit_id=None, product_id=None)
+            for info in static.values() if info.get('barcode')
+        })
+
+    # Lookups
+
+    @property
+    def version(self) -> int:
+        return self._state.version
+
+    def get(self, class_name: str) -> Optional[dict]:
+        """Catalog entry for a YOLO class, or None"""
+        return self._state.by_class.get(class_name)
+
+    def get_by_barcode(self, barcode: str) -> Optional[dict]:
+        """Catalog entry for a barcode, or None"""
+        return self._state.by_barcode.get(barcode)
+
+    def class_for_barcode(self, barcode: str) -> Optional[str]:
+        """YOLO class mapped to a barcode, or None for units the model doesn't know"""
+        return self._state.class_by_barcode.get(barcode)
+
+    def class_id(self, class_name: str) -> Optional[int]:
+        """Stable small integer for a class (its position in the class map)"""
+        return self._state.class_ids.get(class_name)
+
+    def items(self) -> Iterator[tuple]:
+        """(class_name, entry) pairs for every class the model knows"""
+        return iter(list(self._state.by_class.items()))
+
+    def keys(self) -> List[str]:
+        return list(self._state.by_class.keys())
+
+    def __len__(self):
+        return len(self._state.by_class)
+
+    def __contains__(self, class_name: str):
+        return class_name in self._state.by_class
+
+    def add_listener(self, callback: Callable[['ProductCatalog'], None]):
+        """Call `callback(catalog)` now and after every change (on the refresh thread)"""
+        self._listeners.append(callback)
+        callback(self)
+
+    # Loading
+
+    def start(self):
+        """Load the snapshot and keep refreshing it in the background"""
+        if not self.snapshot_path:
+            logger.info(f"Catalog: {len(self)} products from built-in PRODUCT_DATABASE")
+            return
+
+        self.refresh()
+        self._thread = threading.Thread(target=self._refresh_loop, name="catalog-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def refresh(self) -> bool:
+        """Pull changes from the snapshot; returns True if anything changed"""
+        if not self.snapshot_path:
+            return False
+
+        with self._refresh_lock:
+            try:
+                if self.snapshot_path.endswith('.json'):
+                    changed = self._refresh_json()
+                else:
+                    changed = self._refresh_sqlite()
+            except Exception as e:
+                logger.error(f"Catalog refresh failed, keeping version {self.version}: {e}")
+                return False
+
+        if changed:
+            logger.info(f"✓ Catalog v{self.version}: {len(self)} products ({self.source})")
+        return changed
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            self.refresh()
+
+    def _refresh_sqlite(self) -> bool:
+        conn = sqlite3.connect(f"file:{self.snapshot_path}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            full = self.source != 'sqlite'
+            watermark = '' if full else self._watermark
+            rows = conn.execute(SNAPSHOT_QUERY, (watermark, watermark)).fetchall()
+            unit_ids = None if full else {row[0] for row in conn.execute(UNIT_IDS_QUERY)}
+        finally:
+            conn.close()
+
+        entries = {row['unit_id']: _entry_from_row(dict(row)) for row in rows}
+        if rows:
+            self._watermark = max(self._watermark, max(row['updated_at'] for row in rows))
+
+        old = self._state.by_unit
+        if full:
+            by_unit = entries
+            changed = by_unit != old
+        else:
+            # A changed unit replaces its old entry (and so its old barcode);
+            # units no longer in the snapshot are dropped
+            by_unit = {unit_id: e for unit_id, e in old.items() if unit_id in unit_ids}
+            changed = len(by_unit) != len(old) or any(old.get(u) != e for u, e in entries.items())
+            by_unit.update(entries)
+
+        self.source = 'sqlite'
+        if not changed:
+            return False
+        return self._install({e['barcode']: e for e in by_unit.values()}, by_unit)
+
+    def _refresh_json(self) -> bool:
+        mtime = os.path.getmtime(self.snapshot_path)
+        if mtime == self._snapshot_mtime:
+            return False
+
+        with open(self.snapshot_path) as f:
+            data = json.load(f)
+
+        products = {p['id']: p for p in data.get('products', [])}
+        by_barcode = {}
+        for unit in data.get('product_units', []):
+            product = products.get(unit['product_id'])
+            if product is None:
+                continue
+            by_barcode[unit['barcode']] = _entry_from_row({
+                'unit_id': unit['id'],
+                'barcode': unit['barcode'],
+                'unit_name': unit.get('unit_name'),
+                'price': unit['price'],
+                'price_type': unit.get('price_type'),
+                'product_id': product['id'],
+                'name': product['name'],
+                'category': product.get('category'),
+                'stock_quantity': product.get('stock_quantity'),
+            })
+
+        self._snapshot_mtime = mtime
+        self.source = 'json'
+        return self._install(by_barcode) if by_barcode != self._state.by_barcode else False
+
+    def _install(self, by_barcode: Dict[str, dict], by_unit: Optional[Dict[object, dict]] = None) -> bool:
+        """Build the class index and swap a new state in"""
+        by_class = {}
+        for class_name, barcode in self._class_map.items():
+            entry = by_barcode.get(barcode)
+            if entry is None:
+                continue
+            by_class[class_name] = dict(entry, **{'class': class_name})
+
+        missing = set(self._class_map) - set(by_class)
+        if missing and self.source != 'static':
+            logger.warning(f"Catalog has no unit for classes: {sorted(missing)}")
+
+        self._state = _CatalogState(
+            version=self._state.version + 1,
+            by_unit=by_unit if by_unit is not None else {_unit_key(e): e for e in by_barcode.values()},
+            by_barcode=by_barcode,
+            by_class=by_class,
+            class_by_barcode={e['barcode']: c for c, e in by_class.items()},
+            class_ids={c: i for i, c in enumerate(self._class_map) if c in by_class},
+        )
+
+        for callback in self._listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                logger.error(f"Catalog listener failed: {e}")
+        return True
+
+    def _load_class_map(self, path: Optional[str]) -> Dict[str, str]:
+        class_map = {
+            class_name: info['barcode']
+            for class_name, info in self._static.items() if info.get('barcode')
+        }
+        if path:
+            with open(path) as f:
+                class_map.update(json.load(f))
+            logger.info(f"✓ Loaded class map for {len(class_map)} classes from {path}")
+        return class_map
+
+    def stats(self) -> dict:
+        state = self._state
+        return {
+            'version': state.version,
+            'source': self.source,
+            'products': len(state.by_class),
+            'units_indexed': len(state.by_unit),
+            'watermark': self._watermark or None,
+        }
@@ -0,0 +1,111 @@
+"""
+Visual Embeddings for Family Store Vision Service
+
+When a scan is not confident, suggestions ranked by what the frame looks like
+beat category lists once the catalog grows past a few dozen SKUs.
+
+Each crop (or the whole frame when nothing was detected) is turned into a
+pooled backbone feature vector with the detection model itself, then matched
+against reference embeddings of every product. The reference matrix is built
+offline by build_embeddings.py and stored as:
+
+    <prefix>.npy   float32 (N, D), L2-normalised, rows grouped by class
+    <prefix>.json  {"classes": [...], "counts": [...], "dim": D, ...}
+
+The .npy is memory-mapped, so the service does not copy it into RAM and
+several workers share the same pages.
+"""
+
+import json
+import logging
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CROP_PADDING = 0.1  # grow boxes by 10% before embedding
+MIN_CROP = 16       # smaller crops are embedded as the full frame instead
+
+
+def embed_images(model, imgs: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Pooled backbone features for each image, shape (len(imgs), D), L2-normalised
+
+    Uses `model.embed()` (ultralytics >= 8.1, also provided by FakeDetector).
+    """
+    vectors = model.embed(list(imgs), verbose=False)
+    out = np.stack([
+        np.asarray(v.cpu() if hasattr(v, 'cpu') else v, dtype=np.float32).ravel()
+        for v in vectors
+    ])
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.maximum(norms, 1e-12)
+
+
+def crop_box(img: np.ndarray, x1: float, y1: float, x2: float, y2: float) -> np.ndarray:
+    """Padded crop of x1, y1, x2, y2, or the full frame if the box is too small"""
+    h, w = img.shape[:2]
+    pad_x, pad_y = (x2 - x1) * CROP_PADDING, (y2 - y1) * CROP_PADDING
+    cx1, cy1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    cx2, cy2 = min(w, int(x2 + pad_x)), min(h, int(y2 + pad_y))
+    if cx2 - cx1 < MIN_CROP or cy2 - cy1 < MIN_CROP:
+        return img
+    return img[cy1:cy2, cx1:cx2]
+
+
+class VisualIndex:
+    """
+    Top-k product search over a memory-mapped reference embedding matrix
+
+    A product scores the best cosine similarity of any of its reference rows.
+    Scoring is one matrix-vector product plus a per-class max, so it stays
+    cheap with thousands of references.
+    """
+
+    def __init__(self, prefix: str):
+        with open(f"{prefix}.json") as f:
+            meta = json.load(f)
+
+        self.prefix = prefix
+        self.matrix = np.load(f"{prefix}.npy", mmap_mode='r')
+        self.classes: List[str] = meta['classes']
+        self.model = meta.get('model')
+
+        counts = np.asarray(meta['counts'], dtype=np.int64)
+        if len(counts) != len(self.classes) or counts.sum() != self.matrix.shape[0]:
+            raise ValueError(f"{prefix}.json does not match {prefix}.npy")
+        if (counts == 0).any():
+            raise ValueError("Every class needs at least one reference embedding")
+        self._starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        logger.info(f"✓ Visual index: {self.matrix.shape[0]} references for "
+                    f"{len(self.classes)} products ({self.dim}-d)")
+
+    @property
+    def dim(self) -> int:
+        return self.matrix.shape[1]
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        """(class_name, similarity) for the k closest products, best first"""
+        if query.shape[-1] != self.dim:
+            raise ValueError(f"Query has {query.shape[-1]} dims, index has {self.dim}")
+
+        scores = self.matrix @ query.astype(np.float32, copy=False)
+        per_class = np.maximum.reduceat(scores, self._starts)
+
+        k = min(k, len(per_class))
+        if k <= 0:
+            return []
+        top = np.argpartition(-per_class, k - 1)[:k]
+        top = top[np.argsort(-per_class[top])]
+        return [(self.classes[i], float(per_class[i])) for i in top]
+
+    def stats(self) -> dict:
+        return {
+            'path': self.prefix,
+            'references': int(self.matrix.shape[0]),
+            'products': len(self.classes),
+            'dim': self.dim,
+            'model': self.model,
+        }
@@ -0,0 +1,168 @@
+"""
+Deterministic Fake Detector for Family Store Vision Service
+
+Stand-in for the YOLO model so the HTTP, queueing, caching and serialization
+layers can be tested, benchmarked and profiled without my_model.pt (or torch).
+
+It is called exactly like an ultralytics YOLO model:
+    results = model(img_or_list, conf=0.5, verbose=False)
+and returns objects with the same `.boxes` / `.names` shape that app.py reads.
+`model.embed(...)` is mirrored too, for visual suggestions.
+
+Two modes:
+- seeded random: the same seed + same frame always gives the same detections
+- scripted:      detections are replayed from a JSON file, one entry per image
+
+Script file format (cycled when exhausted):
+    [
+        [{"class": "ariel", "confidence": 0.92, "box": [10, 20, 200, 300]}],
+        []
+    ]
+
+Select it at startup with VISION_BACKEND=fake (see app.py).
+"""
+
+import json
+import logging
+import threading
+import time
+import zlib
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class FakeBox:
+    """One detection, indexed the way ultralytics boxes are (box.conf[0] etc.)"""
+
+    def __init__(self, xyxy: List[float], confidence: float, class_id: int):
+        self.xyxy = np.array([xyxy], dtype=np.float32)
+        self.conf = np.array([confidence], dtype=np.float32)
+        self.cls = np.array([class_id], dtype=np.float32)
+
+
+class FakeBoxes:
+    """Container mirroring ultralytics `Boxes` (iterable, sized, array views)"""
+
+    def __init__(self, boxes: List[FakeBox]):
+        self._boxes = boxes
+        self.xyxy = np.array([b.xyxy[0] for b in boxes], dtype=np.float32).reshape(-1, 4)
+        self.conf = np.array([b.conf[0] for b in boxes], dtype=np.float32)
+        self.cls = np.array([b.cls[0] for b in boxes], dtype=np.float32)
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __iter__(self):
+        return iter(self._boxes)
+
+    def __getitem__(self, idx):
+        return self._boxes[idx]
+
+
+class FakeResult:
+    """Per-image result mirroring ultralytics `Results`"""
+
+    def __init__(self, boxes: FakeBoxes, names: dict, orig_shape: tuple):
+        self.boxes = boxes
+        self.names = names
+        self.orig_shape = orig_shape
+
+
+class FakeDetector:
+    """
+    Drop-in replacement for `YOLO(MODEL_PATH)`
+
+    Args:
+        class_names: classes to emit (index = class id)
+        seed: base seed for random detections
+        batch_latency: simulated seconds per model call
+        image_latency: extra simulated seconds per image in the call
+        max_detections: upper bound on random boxes per image
+        script_path: optional JSON file with scripted detections
+    """
+
+    def __init__(self, class_names: List[str], seed: int = 0,
+                 batch_latency: float = 0.05, image_latency: float = 0.0,
+                 max_detections: int = 3, script_path: Optional[str] = None):
+        self.names = {i: name for i, name in enumerate(class_names)}
+        self._ids = {name: i for i, name in self.names.items()}
+        self.seed = seed
+        self.batch_latency = batch_latency
+        self.image_latency = image_latency
+        self.max_detections = max_detections
+
+        self._script = None
+        self._script_pos = 0
+        self._lock = threading.Lock()
+        if script_path:
+            with open(script_path) as f:
+                self._script = json.load(f)
+            logger.info(f"✓ Fake detector replaying {len(self._script)} scripted frames")
+
+    def __call__(self, source, conf: float = 0.25, verbose: bool = False, **kwargs):
+        images = source if isinstance(source, list) else [source]
+
+        time.sleep(self.batch_latency + self.image_latency * len(images))
+
+        return [self._detect(img, conf) for img in images]
+
+    predict = __call__
+
+    def embed(self, source, verbose: bool = False, **kwargs) -> List[np.ndarray]:
+        """Mirrors YOLO.embed(): one feature vector per image (a tiny colour thumbnail)"""
+        images = source if isinstance(source, list) else [source]
+
+        time.sleep(self.batch_latency + self.image_latency * len(images))
+
+        return [
+            cv2.resize(img, (8, 8), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+            for img in images
+        ]
+
+    def _detect(self, img: np.ndarray, conf: float) -> FakeResult:
+        h, w = img.shape[:2]
+
+        if self._script is not None:
+            boxes = self._scripted_boxes(conf)
+        else:
+            boxes = self._random_boxes(img, w, h, conf)
+
+        return FakeResult(FakeBoxes(boxes), self.names, (h, w))
+
+    def _scripted_boxes(self, conf: float) -> List[FakeBox]:
+        with self._lock:
+            frame = self._script[self._script_pos % len(self._script)] if self._script else []
+            self._script_pos += 1
+
+        boxes = []
+        for det in frame:
+            if det['confidence'] < conf:
+                continue
+            class_id = self._ids.get(det['class'])
+            if class_id is None:
+                logger.warning(f"Scripted class not in catalog: {det['class']}")
+                continue
+            boxes.append(FakeBox(det['box'], det['confidence'], class_id))
+        return boxes
+
+    def _random_boxes(self, img: np.ndarray, w: int, h: int, conf: float) -> List[FakeBox]:
+        # Same frame + same seed => same detections, so caches and
+        # regressions can be checked byte-for-byte
+        frame_hash = zlib.crc32(np.ascontiguousarray(img[::8, ::8]).data)
+        rng = np.random.default_rng([self.seed, frame_hash])
+
+        boxes = []
+        for _ in range(rng.integers(0, self.max_detections + 1)):
+            confidence = float(rng.uniform(0.3, 0.99))
+            class_id = int(rng.integers(0, len(self.names)))
+            bw = float(rng.uniform(0.1, 0.5)) * w
+            bh = float(rng.uniform(0.1, 0.5)) * h
+            x1 = float(rng.uniform(0, w - bw))
+            y1 = float(rng.uniform(0, h - bh))
+            if confidence >= conf:
+                boxes.append(FakeBox([x1, y1, x1 + bw, y1 + bh], confidence, class_id))
+        return boxes
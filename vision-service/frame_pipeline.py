@@ -0,0 +1,171 @@
+"""
+Building blocks for threaded frame pipelines (see yolo_detect.py)
+
+- FrameQueue: bounded hand-off between stages. Live sources use drop-oldest,
+  so a slow consumer always gets the newest frame instead of a backlog;
+  files use blocking puts so no frame is skipped.
+- StageMeter: per-stage frames-per-second over a sliding window.
+- AsyncVideoWriter: video encoding on a background thread, so a slow
+  encoder or disk never stalls the stage that produces the frames.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Optional, Tuple
+
+import cv2
+
+
+class FrameQueue:
+    """
+    Bounded queue between two pipeline stages
+
+    Args:
+        maxsize: items held before put() drops or blocks
+        drop_oldest: when full, discard the oldest item (True) or wait for room (False)
+    """
+
+    def __init__(self, maxsize: int = 2, drop_oldest: bool = True):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.dropped = 0
+        self.passed = 0
+        self._items: Deque[Any] = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def put(self, item: Any) -> bool:
+        """Queue an item; False if the queue was closed first"""
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._closed:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    self._cond.wait()
+            if self._closed:
+                return False
+            self._items.append(item)
+            self.passed += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """
+        Next item; None once the queue is closed and drained
+
+        Raises TimeoutError if nothing arrives within `timeout` seconds.
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                raise TimeoutError
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """No more items; consumers drain what is left, then get None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {'size': len(self._items), 'maxsize': self.maxsize,
+                'passed': self.passed, 'dropped': self.dropped}
+
+
+class StageMeter:
+    """Frames per second of one stage over its last `window` frames"""
+
+    def __init__(self, window: int = 200):
+        self._ticks: Deque[float] = deque(maxlen=window)
+        self.frames = 0
+
+    def tick(self):
+        self._ticks.append(time.perf_counter())
+        self.frames += 1
+
+    @property
+    def fps(self) -> float:
+        if len(self._ticks) < 2:
+            return 0.0
+        span = self._ticks[-1] - self._ticks[0]
+        return (len(self._ticks) - 1) / span if span > 0 else 0.0
+
+
+class AsyncVideoWriter:
+    """
+    cv2.VideoWriter fed through a FrameQueue by a background thread
+
+    Args:
+        path: output file
+        fps / size: frame rate and (width, height) of the video; frames of
+            another size are resized to it
+        queue_size: frames buffered while the encoder catches up
+        policy: 'drop' discards the oldest buffered frame when the encoder
+            falls behind, 'block' makes write() wait (every frame is kept)
+        fourcc: codec, MJPG by default
+    """
+
+    POLICIES = ('drop', 'block')
+
+    def __init__(self, path: str, fps: float, size: Tuple[int, int], queue_size: int = 64,
+                 policy: str = 'drop', fourcc: str = 'MJPG'):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+
+        self.path = path
+        self.size = size
+        self.policy = policy
+        self.written = 0
+        self.encode_time = 0.0
+
+        self._writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        self._queue = FrameQueue(queue_size, drop_oldest=(policy == 'drop'))
+        self._thread = threading.Thread(target=self._run, name=f'writer-{path}', daemon=True)
+        self._thread.start()
+
+    def write(self, frame) -> bool:
+        """Queue a frame for encoding; the caller must not modify it afterwards"""
+        return self._queue.put(frame)
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            started = time.perf_counter()
+            if (frame.shape[1], frame.shape[0]) != self.size:
+                frame = cv2.resize(frame, self.size)
+            self._writer.write(frame)
+            self.encode_time += time.perf_counter() - started
+            self.written += 1
+
+    def close(self):
+        """Encode whatever is still queued, then finish the file"""
+        self._queue.close()
+        self._thread.join()
+        self._writer.release()
+
+    @property
+    def dropped(self) -> int:
+        return self._queue.dropped
+
+    def __len__(self):
+        return len(self._queue)
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'policy': self.policy,
+            'written': self.written,
+            'dropped': self.dropped,
+            'queued': len(self._queue),
+            'encoder_fps': round(self.written / self.encode_time, 1) if self.encode_time > 0 else 0.0,
+        }
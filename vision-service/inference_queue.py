@@ -0,0 +1,280 @@
+"""
+Priority Inference Queue for Family Store Vision Service
+
+Runs model calls on dedicated worker threads so the FastAPI event loop never
+blocks on inference, and so a cashier's manual scan is not stuck behind
+auto-scan frames from other terminals.
+
+Priority classes:
+- interactive: manual "scan" button presses, always dispatched first
+- background:  continuous auto-scan frames, capped to a share of capacity
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BACKGROUND = 'background'
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_BACKGROUND)
+
+
+class QueueFullError(Exception):
+    """Raised when a priority lane has no room for another job"""
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a job's deadline passed before a worker picked it up"""
+
+
+class _Job:
+    __slots__ = ('fn', 'args', 'kwargs', 'priority', 'deadline', 'enqueued_at', 'future')
+
+    def __init__(self, fn: Callable, args: tuple, kwargs: dict, priority: str,
+                 deadline: Optional[float]):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.perf_counter()
+        self.future = Future()
+
+
+class _LaneStats:
+    """Counters and recent queue-wait samples for one priority class"""
+
+    def __init__(self, sample_size: int = 1000):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.expired = 0
+        self.late = 0
+        self.late_compute = 0.0
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waits: Deque[float] = deque(maxlen=sample_size)
+
+    def record_wait(self, wait: float):
+        self.started += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.waits.append(wait)
+
+    def snapshot(self, pending: int) -> dict:
+        samples = sorted(self.waits)
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            idx = min(len(samples) - 1, int(round(p * (len(samples) - 1))))
+            return round(samples[idx] * 1000, 2)
+
+        return {
+            'pending': pending,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'cancelled': self.cancelled,
+            'expired': self.expired,
+            'late': self.late,
+            'late_compute_s': round(self.late_compute, 3),
+            'wait_ms': {
+                'avg': round(self.total_wait / self.started * 1000, 2) if self.started else 0.0,
+                'p50': pct(0.50),
+                'p95': pct(0.95),
+                'max': round(self.max_wait * 1000, 2),
+            },
+        }
+
+
+class InferenceQueue:
+    """
+    Two-lane priority queue in front of the model
+
+    Interactive jobs are always taken before background jobs. A job that is
+    already running is never interrupted; instead background jobs draw from a
+    time budget that refills at `background_max_share` of worker capacity, so
+    there is usually a free worker when a manual scan arrives.
+    """
+
+    def __init__(self, workers: int = 1, background_max_share: float = 0.5,
+                 budget_window: float = 5.0, max_pending: int = 32):
+        if not 0 < background_max_share <= 1:
+            raise ValueError("background_max_share must be in (0, 1]")
+
+        self.workers = max(1, workers)
+        self.background_max_share = background_max_share
+        self.max_pending = max_pending
+
+        # Background budget, in worker-seconds
+        self._refill_rate = background_max_share * self.workers
+        self._budget_cap = self._refill_rate * budget_window
+        self._budget = self._budget_cap
+        self._budget_updated = time.perf_counter()
+
+        self._lanes: Dict[str, Deque[_Job]] = {p: deque() for p in PRIORITIES}
+        self._stats: Dict[str, _LaneStats] = {p: _LaneStats() for p in PRIORITIES}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        """Start worker threads"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"inference-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(
+            f"✓ Inference queue started ({self.workers} worker(s), "
+            f"background share ≤ {self.background_max_share:.0%})"
+        )
+
+    def stop(self):
+        """Stop workers and fail anything still queued"""
+        with self._cond:
+            self._running = False
+            for lane in self._lanes.values():
+                while lane:
+                    future = lane.popleft().future
+                    if future.set_running_or_notify_cancel():
+                        future.set_exception(RuntimeError("Inference queue stopped"))
+            self._cond.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, fn: Callable, *args, priority: str = PRIORITY_INTERACTIVE,
+               deadline: Optional[float] = None, **kwargs) -> Future:
+        """
+        Queue `fn(*args, **kwargs)` and return a Future for its result
+
+        `deadline` is a time.perf_counter() value. Jobs still queued when it
+        passes are dropped with DeadlineExceededError instead of being run;
+        jobs whose Future was cancelled are dropped as well.
+        """
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        job = _Job(fn, args, kwargs, priority, deadline)
+
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Inference queue is not running")
+
+            stats = self._stats[priority]
+            if len(self._lanes[priority]) >= self.max_pending:
+                stats.rejected += 1
+                raise QueueFullError(f"Too many pending {priority} requests")
+
+            stats.submitted += 1
+            self._lanes[priority].append(job)
+            self._cond.notify()
+
+        return job.future
+
+    def stats(self) -> dict:
+        """Per-class queue statistics"""
+        with self._cond:
+            self._refill(time.perf_counter())
+            return {
+                'workers': self.workers,
+                'background_max_share': self.background_max_share,
+                'background_budget_s': round(self._budget, 3),
+                'classes': {
+                    p: self._stats[p].snapshot(len(self._lanes[p]))
+                    for p in PRIORITIES
+                },
+            }
+
+    # Internal helpers (call with self._cond held)
+
+    def _refill(self, now: float):
+        elapsed = now - self._budget_updated
+        self._budget_updated = now
+        self._budget = min(self._budget_cap, self._budget + elapsed * self._refill_rate)
+
+    def _next_job(self) -> tuple:
+        """Return (job, None) or (None, seconds to wait before retrying)"""
+        if self._lanes[PRIORITY_INTERACTIVE]:
+            return self._lanes[PRIORITY_INTERACTIVE].popleft(), None
+
+        if self._lanes[PRIORITY_BACKGROUND]:
+            self._refill(time.perf_counter())
+            if self._budget > 0:
+                return self._lanes[PRIORITY_BACKGROUND].popleft(), None
+            return None, max(0.001, -self._budget / self._refill_rate)
+
+        return None, None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job, retry_in = None, None
+                while self._running:
+                    job, retry_in = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait(timeout=retry_in)
+
+                if job is None:
+                    return
+
+                stats = self._stats[job.priority]
+                started = time.perf_counter()
+                stats.record_wait(started - job.enqueued_at)
+
+            # Drop abandoned work before spending any compute on it
+            if not job.future.set_running_or_notify_cancel():
+                with self._cond:
+                    stats.cancelled += 1
+                continue
+
+            if job.deadline is not None and started >= job.deadline:
+                job.future.set_exception(DeadlineExceededError(
+                    f"Deadline passed after {started - job.enqueued_at:.3f}s in queue"
+                ))
+                with self._cond:
+                    stats.expired += 1
+                continue
+
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                failed = True
+            else:
+                job.future.set_result(result)
+                failed = False
+
+            with self._cond:
+                finished = time.perf_counter()
+                if failed:
+                    stats.failed += 1
+                else:
+                    stats.completed += 1
+                if job.deadline is not None and finished > job.deadline:
+                    # Nobody is waiting for this result any more
+                    stats.late += 1
+                    stats.late_compute += finished - started
+                if job.priority == PRIORITY_BACKGROUND:
+                    self._refill(finished)
+                    self._budget -= finished - started
@@ -0,0 +1,298 @@
+"""
+Inference Router for Family Store Vision Service
+
+Sends every frame to the local model first and uses a remote backend (the
+hosted Roboflow model, see remote_inference.py) only when that helps:
+
+- overflow: the local queue is full or the local call failed
+- hedging:  the local call is slower than its own recent p95 (configurable),
+            so the remote is fired too and whichever answers first wins
+
+The remote sits behind a circuit breaker: after `failure_threshold`
+consecutive failures it is skipped for `reset_timeout` seconds, then one
+probe request decides whether it is back.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LOCAL = 'local'
+BACKEND_REMOTE = 'remote'
+
+BREAKER_CLOSED = 'closed'
+BREAKER_OPEN = 'open'
+BREAKER_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a request may go to the remote now (reserves the probe slot)"""
+        with self._lock:
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = BREAKER_HALF_OPEN
+            if self.state == BREAKER_HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def release(self):
+        """Give back a probe slot without a verdict (request abandoned)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != BREAKER_CLOSED:
+                logger.info("✓ Remote backend recovered - circuit closed")
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.state == BREAKER_HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != BREAKER_OPEN:
+                    self.opened += 1
+                    logger.warning(f"⚠ Remote backend failing - circuit open for {self.reset_timeout}s")
+                self.state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'times_opened': self.opened,
+            'rejected': self.rejected,
+        }
+
+
+class _LatencyWindow:
+    """Recent latencies (seconds) of one backend; fed from worker threads too"""
+
+    def __init__(self, size: int = 500):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+    def snapshot(self) -> dict:
+        def ms(p):
+            value = self.percentile(p)
+            return round(value * 1000, 2) if value is not None else None
+        return {'samples': len(self.samples), 'p50_ms': ms(50), 'p95_ms': ms(95), 'p99_ms': ms(99)}
+
+
+class InferenceRouter:
+    """
+    Local-first routing with remote overflow and optional hedging
+
+    Args:
+        breaker: circuit breaker guarding the remote backend
+        hedge_percentile: fire the remote once the local call has taken longer
+            than this percentile of recent local latencies (None = no hedging)
+        hedge_min_samples: local latencies needed before hedging starts
+    """
+
+    def __init__(self, breaker: CircuitBreaker, hedge_percentile: Optional[float] = None,
+                 hedge_min_samples: int = 20, window: int = 500):
+        self.breaker = breaker
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+
+        self._latency = {BACKEND_LOCAL: _LatencyWindow(window), BACKEND_REMOTE: _LatencyWindow(window)}
+        self.counters = {
+            'served_local': 0,
+            'served_remote': 0,
+            'overflow_saturated': 0,
+            'overflow_error': 0,
+            'remote_failures': 0,
+            'hedges_fired': 0,
+            'hedge_wins_remote': 0,
+            'hedge_wins_local': 0,
+            'hedge_local_dropped': 0,  # local frame still queued when the remote won - not computed
+            'latency_saved_s': 0.0,    # remote wins only: local finish - remote finish, where local still ran
+        }
+        self._lock = threading.Lock()  # counters touched from queue done-callbacks
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait on the local backend before hedging, or None"""
+        window = self._latency[BACKEND_LOCAL]
+        if self.hedge_percentile is None or len(window.samples) < self.hedge_min_samples:
+            return None
+        return window.percentile(self.hedge_percentile)
+
+    async def route(self, local: Callable[[Callable[[Future], None]], Awaitable],
+                    remote: Optional[Callable[[], Awaitable]],
+                    overflow_on: Callable[[BaseException], Optional[str]]) -> Tuple[object, str]:
+        """
+        Run a frame; returns (result, backend that served it)
+
+        `local(on_submit)` must call `on_submit(future)` with the inference
+        queue's future for the frame. Local latency is taken from that
+        future, so it is measured even when a hedge abandons the local call,
+        and a hedged frame the remote already answered can be dropped.
+        `overflow_on(error)` tells whether a local error should go to the
+        remote: 'saturated', 'error' or None to re-raise.
+        """
+        started = time.perf_counter()
+        local_jobs: List[Future] = []
+
+        def on_submit(job: Future):
+            local_jobs.append(job)
+            job.add_done_callback(lambda f: self._record_local(f, started))
+
+        local_task = asyncio.ensure_future(local(on_submit))
+
+        hedge_delay = self.hedge_delay() if remote is not None else None
+        if hedge_delay is not None:
+            try:
+                done, _ = await asyncio.wait({local_task}, timeout=hedge_delay)
+            except asyncio.CancelledError:
+                local_task.cancel()
+                raise
+            if not done and self.breaker.allow():
+                return await self._race(local_task, remote, local_jobs)
+
+        try:
+            result = await local_task
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = overflow_on(e) if remote is not None else None
+            if reason is None or not self.breaker.allow():
+                raise
+            self.counters[f'overflow_{reason}'] += 1
+            logger.info(f"↪ Local backend {reason} - sending frame to remote")
+            try:
+                result = await self._call_remote(remote)
+            except Exception as remote_error:
+                logger.warning(f"Remote overflow failed too: {remote_error}")
+                raise e
+            self.counters['served_remote'] += 1
+            return result, BACKEND_REMOTE
+
+        self.counters['served_local'] += 1
+        return result, BACKEND_LOCAL
+
+    async def _race(self, local_task: asyncio.Future, remote: Callable[[], Awaitable],
+                    local_jobs: List[Future]) -> Tuple[object, str]:
+        """Local is slow: fire the remote and take whichever succeeds first"""
+        self.counters['hedges_fired'] += 1
+        remote_task = asyncio.ensure_future(self._call_remote(remote))
+        tasks = {local_task: BACKEND_LOCAL, remote_task: BACKEND_REMOTE}
+        pending = set(tasks)
+        first_error = None
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        first_error = first_error or (task.exception() if not task.cancelled() else None)
+                        continue
+
+                    winner = tasks[task]
+                    won_at = time.perf_counter()
+                    self.counters[f'served_{winner}'] += 1
+                    self.counters[f'hedge_wins_{winner}'] += 1
+                    for loser in pending:
+                        self._settle_loser(loser, tasks[loser], won_at, local_jobs)
+                    return task.result(), winner
+        except asyncio.CancelledError:
+            for task in pending:
+                task.cancel()
+            raise
+
+        raise first_error or RuntimeError("Both backends failed")
+
+    def _settle_loser(self, task: asyncio.Future, backend: str, won_at: float,
+                      local_jobs: List[Future]):
+        """
+        Cancel the losing call; a remote win saved the time the local job
+        still needed, which is only known if that job runs to the end
+        """
+        task.cancel()
+        if backend == BACKEND_REMOTE or not local_jobs:
+            return  # local won: hedging saved nothing
+
+        def finished(f):
+            if not f.cancelled() and f.exception() is None:
+                with self._lock:
+                    self.counters['latency_saved_s'] += time.perf_counter() - won_at
+
+        job = local_jobs[0]
+        if job.cancel():
+            self.counters['hedge_local_dropped'] += 1
+        else:
+            job.add_done_callback(finished)
+
+    def _record_local(self, job: Future, started: float):
+        """Queue future done-callback: local latency up to the job's real completion"""
+        if not job.cancelled() and job.exception() is None:
+            self._latency[BACKEND_LOCAL].add(time.perf_counter() - started)
+
+    async def _call_remote(self, remote: Callable[[], Awaitable]):
+        """Call the remote; the caller has already been let through by breaker.allow()"""
+        try:
+            result = await self._timed(BACKEND_REMOTE, remote)
+        except asyncio.CancelledError:
+            self.breaker.release()  # abandoned, not failed
+            raise
+        except Exception:
+            self.counters['remote_failures'] += 1
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _timed(self, backend: str, call: Callable[[], Awaitable]):
+        started = time.perf_counter()
+        result = await call()
+        self._latency[backend].add(time.perf_counter() - started)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        counters['latency_saved_s'] = round(counters['latency_saved_s'], 3)
+        return {
+            **counters,
+            'hedge_percentile': self.hedge_percentile,
+            'hedge_delay_ms': round(self.hedge_delay() * 1000, 2) if self.hedge_delay() is not None else None,
+            'latency': {backend: window.snapshot() for backend, window in self._latency.items()},
+            'breaker': self.breaker.stats(),
+        }
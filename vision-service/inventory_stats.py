@@ -0,0 +1,126 @@
+"""
+Inventory aggregates for the back-office dashboard
+
+Category and brand totals (products, items in stock, stock value) are kept
+up to date as prices and stock change - each update is O(1) - instead of
+being summed over the whole product database on every poll. Readers get a
+prebuilt snapshot tagged with a version that bumps on every change, so a
+dashboard can skip re-rendering (or send If-None-Match) when nothing moved.
+"""
+
+import threading
+from typing import Dict, Optional
+
+UNKNOWN_BRAND = 'Unknown'
+
+
+class _Totals:
+    __slots__ = ('products', 'items', 'value')
+
+    def __init__(self):
+        self.products = 0
+        self.items = 0
+        self.value = 0.0
+
+    def add(self, products: int, items: int, value: float):
+        self.products += products
+        self.items += items
+        self.value += value
+
+
+class InventoryAggregates:
+    """
+    Running category/brand/store totals over a product database
+
+    Args:
+        products: {class_name: info} with price/stock/category/brand; updates
+            go through update() so the totals and the dict stay in step
+        category_boosts: confidence boost reported per category
+    """
+
+    def __init__(self, products: Dict[str, dict], category_boosts: Optional[Dict[str, float]] = None):
+        self.products = products
+        self.category_boosts = category_boosts or {}
+        self.version = 0
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+        self._store = _Totals()
+        self._categories: Dict[str, _Totals] = {}
+        self._brands: Dict[str, _Totals] = {}
+        for info in products.values():
+            self._apply(info, 1, info['stock'], info['price'])
+
+    def _apply(self, info: dict, products: int, stock: int, price: float):
+        value = price * stock
+        self._store.add(products, stock, value)
+        self._categories.setdefault(info['category'], _Totals()).add(products, stock, value)
+        self._brands.setdefault(info.get('brand', UNKNOWN_BRAND), _Totals()).add(products, stock, value)
+
+    def update(self, class_name: str, price: Optional[float] = None, stock: Optional[int] = None) -> dict:
+        """Change a product's price and/or stock; returns the updated product info"""
+        with self._lock:
+            info = self.products[class_name]
+            new_price = info['price'] if price is None else price
+            new_stock = info['stock'] if stock is None else stock
+            if new_price == info['price'] and new_stock == info['stock']:
+                return info
+
+            self._apply(info, 0, -info['stock'], info['price'])
+            self._apply(info, 0, new_stock, new_price)
+            info['price'] = new_price
+            info['stock'] = new_stock
+
+            self.version += 1
+            self._snapshot = None
+            return info
+
+    def snapshot(self) -> dict:
+        """Prebuilt /stats, /categories and /brands payloads for the current version"""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._build()
+            return self._snapshot
+
+    def _build(self) -> dict:
+        def rows(totals: Dict[str, _Totals]) -> dict:
+            ordered = sorted(totals.items(), key=lambda x: x[1].value, reverse=True)
+            return {
+                name: {'products': t.products, 'items': t.items, 'value': round(t.value, 2)}
+                for name, t in ordered if t.products
+            }
+
+        store = self._store
+        categories = [
+            {
+                'name': name,
+                'product_count': t.products,
+                'confidence_boost': self.category_boosts.get(name, 0)
+            }
+            for name, t in self._categories.items() if t.products
+        ]
+        brands = sorted(
+            ({'name': name, 'product_count': t.products} for name, t in self._brands.items() if t.products),
+            key=lambda x: x['product_count'], reverse=True
+        )
+
+        return {
+            'version': self.version,
+            'stats': {
+                'version': self.version,
+                'inventory': {
+                    'total_products': store.products,
+                    'total_items': store.items,
+                    'total_value': round(store.value, 2),
+                    'average_price': round(store.value / store.items, 2) if store.items > 0 else 0
+                },
+                'categories': rows(self._categories),
+                'brands': rows(self._brands),
+            },
+            'categories': {'version': self.version, 'total': len(categories), 'categories': categories},
+            'brands': {'version': self.version, 'total': len(brands), 'brands': brands},
+        }
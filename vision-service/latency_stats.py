@@ -0,0 +1,127 @@
+"""
+Windowed latency and throughput recorder
+
+Fixed memory regardless of traffic: latencies go into a log-bucketed
+histogram (HDR-style, ~5% relative error) held in two rings - one slot per
+second for the last 5 minutes and one per minute for the last hour. A
+window query sums the slots it covers, so p50/p90/p99/max and requests per
+second come out per outcome over 1m, 5m and 1h without keeping samples.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+WINDOWS = {'1m': 60, '5m': 300, '1h': 3600}
+PERCENTILES = (50, 90, 99)
+
+
+class _Ring:
+    """`slots` histograms, one per `resolution` seconds"""
+
+    def __init__(self, slots: int, resolution: int, outcomes: int, bins: int):
+        self.resolution = resolution
+        self.counts = np.zeros((slots, outcomes, bins), dtype=np.uint32)
+        self.maxima = np.zeros((slots, outcomes), dtype=np.float64)
+        self.stamps = np.full(slots, -1, dtype=np.int64)
+
+    def slot(self, now: float) -> int:
+        period = int(now // self.resolution)
+        index = period % len(self.stamps)
+        if self.stamps[index] != period:
+            self.counts[index] = 0
+            self.maxima[index] = 0
+            self.stamps[index] = period
+        return index
+
+    def covering(self, now: float, seconds: int) -> np.ndarray:
+        """Slot indices holding data from the last `seconds` (current slot included)"""
+        period = int(now // self.resolution)
+        oldest = period - math.ceil(seconds / self.resolution) + 1
+        return np.nonzero((self.stamps >= oldest) & (self.stamps <= period))[0]
+
+
+class LatencyRecorder:
+    """
+    Latency histograms per outcome over sliding windows
+
+    Args:
+        outcomes: labels requests are recorded under (e.g. success/failed/cached)
+        min_latency / max_latency: seconds covered by the histogram; values
+            outside are clamped to the first/last bucket (max stays exact)
+        growth: ratio between consecutive bucket bounds
+    """
+
+    def __init__(self, outcomes: Iterable[str], min_latency: float = 0.001,
+                 max_latency: float = 120.0, growth: float = 1.1):
+        self.outcomes = list(outcomes)
+        self._outcome_index = {name: i for i, name in enumerate(self.outcomes)}
+        self._min = min_latency
+        self._log_growth = math.log(growth)
+        bins = int(math.ceil(math.log(max_latency / min_latency) / self._log_growth)) + 2
+        # Upper bound of each bucket (bucket 0 is everything below min_latency)
+        # and the geometric middle reported for values that land in it
+        self._bounds = min_latency * growth ** np.arange(bins)
+        self._middles = self._bounds / math.sqrt(growth)
+        self._middles[0] = min_latency
+
+        self._seconds = _Ring(300, 1, len(self.outcomes), bins)
+        self._minutes = _Ring(60, 60, len(self.outcomes), bins)
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+        self.totals = {name: 0 for name in self.outcomes}
+        self.total_time = 0.0
+
+    def _bucket(self, seconds: float) -> int:
+        if seconds <= self._min:
+            return 0
+        return min(len(self._bounds) - 1, int(math.ceil(math.log(seconds / self._min) / self._log_growth)))
+
+    def record(self, seconds: float, outcome: str):
+        o = self._outcome_index[outcome]
+        b = self._bucket(seconds)
+        now = time.time()
+        with self._lock:
+            for ring in (self._seconds, self._minutes):
+                i = ring.slot(now)
+                ring.counts[i, o, b] += 1
+                if seconds > ring.maxima[i, o]:
+                    ring.maxima[i, o] = seconds
+            self.totals[outcome] += 1
+            self.total_time += seconds
+
+    def window(self, seconds: int, now: Optional[float] = None) -> Dict[str, dict]:
+        """{outcome and 'all': {count, rps, p50_ms, p90_ms, p99_ms, max_ms}} for the last `seconds`"""
+        now = time.time() if now is None else now
+        ring = self._seconds if seconds <= 300 else self._minutes
+        with self._lock:
+            slots = ring.covering(now, seconds)
+            counts = ring.counts[slots].sum(axis=0, dtype=np.uint64)
+            maxima = ring.maxima[slots].max(axis=0) if len(slots) else np.zeros(len(self.outcomes))
+
+        span = max(1.0, min(seconds, now - self._started))
+        summary = {name: self._summarise(counts[i], maxima[i], span) for i, name in enumerate(self.outcomes)}
+        summary['all'] = self._summarise(counts.sum(axis=0), maxima.max(initial=0.0), span)
+        return summary
+
+    def _summarise(self, histogram: np.ndarray, maximum: float, span: float) -> dict:
+        count = int(histogram.sum())
+        summary = {'count': count, 'rps': round(count / span, 3)}
+        if count == 0:
+            summary.update({f'p{p}_ms': None for p in PERCENTILES}, max_ms=None)
+            return summary
+
+        cumulative = np.cumsum(histogram)
+        for p in PERCENTILES:
+            b = int(np.searchsorted(cumulative, math.ceil(p / 100 * count)))
+            summary[f'p{p}_ms'] = round(float(min(self._middles[b], maximum)) * 1000, 2)
+        summary['max_ms'] = round(float(maximum) * 1000, 2)
+        return summary
+
+    def snapshot(self) -> dict:
+        now = time.time()
+        return {name: self.window(seconds, now) for name, seconds in WINDOWS.items()}
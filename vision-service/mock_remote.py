@@ -0,0 +1,95 @@
+"""
+Local stand-in for the Roboflow hosted detection API
+
+Speaks the same protocol as https://detect.roboflow.com/<model>: POST a
+base64 image body with api_key/confidence/overlap query parameters, get back
+{"predictions": [{"class", "confidence", "x", "y", "width", "height"}, ...]}.
+Detections come from FakeDetector, so they are deterministic per frame.
+
+Knobs (env vars) to exercise retries, timeouts and fallbacks:
+    MOCK_REMOTE_LATENCY_MS   base latency per request (default 150)
+    MOCK_REMOTE_JITTER_MS    extra uniform random latency (default 50)
+    MOCK_REMOTE_ERROR_RATE   share of requests answered 503 (default 0)
+    MOCK_REMOTE_429_RATE     share of requests answered 429 (default 0)
+    MOCK_REMOTE_CLASSES      comma-separated class names (default app_old's)
+
+Run:
+    python mock_remote.py              # http://localhost:5050/<anything>
+then point a client at it:
+    ROBOFLOW_API_ENDPOINT=http://localhost:5050/mock/1 python app_old.py
+    MOCK_REMOTE_CLASSES=ariel,downy,... VISION_REMOTE_ENDPOINT=http://localhost:5050/mock/1 python app.py
+"""
+
+import asyncio
+import base64
+import os
+import random
+
+import cv2
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fake_detector import FakeDetector
+
+LATENCY_MS = float(os.getenv("MOCK_REMOTE_LATENCY_MS", "150"))
+JITTER_MS = float(os.getenv("MOCK_REMOTE_JITTER_MS", "50"))
+ERROR_RATE = float(os.getenv("MOCK_REMOTE_ERROR_RATE", "0"))
+RATE_LIMIT_RATE = float(os.getenv("MOCK_REMOTE_429_RATE", "0"))
+CLASSES = os.getenv("MOCK_REMOTE_CLASSES")
+
+app = FastAPI(title="Mock Roboflow API")
+stats = {'requests': 0, 'errors': 0, 'rate_limited': 0}
+
+
+def default_classes():
+    if CLASSES:
+        return CLASSES.split(',')
+    from app_old import PRODUCT_DATABASE
+    return list(PRODUCT_DATABASE)
+
+
+detector = FakeDetector(default_classes(), batch_latency=0)
+
+
+@app.get("/")
+async def root():
+    return {"service": "Mock Roboflow API", **stats}
+
+
+@app.post("/{model_path:path}")
+async def detect(model_path: str, request: Request, confidence: float = 40, overlap: float = 30):
+    stats['requests'] += 1
+    await asyncio.sleep((LATENCY_MS + random.uniform(0, JITTER_MS)) / 1000)
+
+    roll = random.random()
+    if roll < RATE_LIMIT_RATE:
+        stats['rate_limited'] += 1
+        return JSONResponse({"message": "Rate limit exceeded"}, status_code=429, headers={"Retry-After": "0.2"})
+    if roll < RATE_LIMIT_RATE + ERROR_RATE:
+        stats['errors'] += 1
+        return JSONResponse({"message": "Internal error"}, status_code=503)
+
+    body = await request.body()
+    img = cv2.imdecode(np.frombuffer(base64.b64decode(body), np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        return JSONResponse({"message": "Could not decode image"}, status_code=400)
+
+    result = detector(img, conf=confidence / 100)[0]
+    predictions = []
+    for box in result.boxes:
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        predictions.append({
+            "class": result.names[int(box.cls[0])],
+            "confidence": round(float(box.conf[0]), 4),
+            "x": (x1 + x2) / 2, "y": (y1 + y2) / 2,
+            "width": x2 - x1, "height": y2 - y1,
+        })
+
+    h, w = img.shape[:2]
+    return {"predictions": predictions, "image": {"width": w, "height": h}}
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("MOCK_REMOTE_PORT", "5050")), log_level="warning")
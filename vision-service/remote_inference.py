@@ -0,0 +1,197 @@
+"""
+Remote Inference Client for Family Store Vision Service
+
+Async client for the Roboflow hosted detection API (or anything that speaks
+the same protocol, e.g. mock_remote.py for local testing).
+
+- One shared httpx.AsyncClient: connections are kept alive and reused, so
+  only the first request pays for the TCP + TLS handshake
+- At most `max_concurrency` requests in flight toward the remote API; the
+  rest wait (up to `queue_timeout`) instead of piling onto a rate limit
+- Connect / read timeouts per request
+- Retries on 429, 5xx, timeouts and connection errors with full-jitter
+  exponential backoff (asyncio.sleep, never blocks the event loop);
+  429 Retry-After is honoured
+"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RemoteInferenceError(Exception):
+    """Remote detection failed; status_code is what to answer the caller with"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class RoboflowClient:
+    """
+    Pooled, rate-limited async client for a Roboflow-style detect endpoint
+
+    Args:
+        endpoint: full model URL, e.g. https://detect.roboflow.com/<model>/<version>
+        api_key: sent as the api_key query parameter
+        timeout: seconds to wait for the response once connected
+        connect_timeout: seconds to establish a connection
+        max_concurrency: requests in flight at once
+        queue_timeout: seconds a request may wait for a free slot
+        max_retries: extra attempts after the first one
+        backoff_base / backoff_max: seconds, for the jittered backoff
+        transport: optional httpx transport (e.g. httpx.MockTransport in tests)
+    """
+
+    def __init__(self, endpoint: str, api_key: str, timeout: float = 10.0,
+                 connect_timeout: float = 3.0, max_concurrency: int = 4,
+                 queue_timeout: float = 5.0, max_retries: int = 2,
+                 backoff_base: float = 0.25, backoff_max: float = 4.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.endpoint = endpoint
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(max_connections=max_concurrency,
+                                    max_keepalive_connections=max_concurrency)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        self.stats_counters = {
+            'requests': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'retries': 0,
+            'rate_limited': 0,
+            'timeouts': 0,
+            'queue_timeouts': 0,
+            'in_flight': 0,
+            'total_time': 0.0,
+        }
+
+    async def start(self):
+        """Open the connection pool (call from the app's startup hook)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self._timeout, limits=self._limits,
+                                             transport=self._transport)
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def detect(self, base64_image: str, confidence: int, overlap: int) -> dict:
+        """POST one base64 image; returns the parsed JSON ({'predictions': [...]})"""
+        await self.start()
+        stats = self.stats_counters
+        stats['requests'] += 1
+        started = time.perf_counter()
+
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            stats['queue_timeouts'] += 1
+            stats['failed'] += 1
+            raise RemoteInferenceError(503, "Too many requests in flight to the detection service")
+
+        stats['in_flight'] += 1
+        try:
+            result = await self._post_with_retries(base64_image, confidence, overlap)
+            stats['succeeded'] += 1
+            return result
+        except RemoteInferenceError:
+            stats['failed'] += 1
+            raise
+        finally:
+            stats['in_flight'] -= 1
+            stats['total_time'] += time.perf_counter() - started
+            self._slots.release()
+
+    async def _post_with_retries(self, base64_image: str, confidence: int, overlap: int) -> dict:
+        params = {"api_key": self.api_key, "confidence": confidence, "overlap": overlap}
+        attempts = self.max_retries + 1
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            retry_after = None
+
+            try:
+                response = await self._client.post(
+                    self.endpoint,
+                    params=params,
+                    content=base64_image,
+                    headers={"Content-Type": "application/x-www-form-urlencoded"},
+                )
+            except httpx.TimeoutException:
+                self.stats_counters['timeouts'] += 1
+                if last:
+                    raise RemoteInferenceError(504, "Detection service timeout")
+                logger.warning(f"Remote timeout (attempt {attempt + 1}/{attempts})")
+            except httpx.TransportError as e:
+                if last:
+                    raise RemoteInferenceError(503, f"Cannot reach detection service: {e}")
+                logger.warning(f"Remote network error (attempt {attempt + 1}/{attempts}): {e}")
+            else:
+                if response.status_code == 200:
+                    return response.json()
+
+                if response.status_code not in RETRY_STATUSES or last:
+                    raise RemoteInferenceError(
+                        response.status_code, f"Roboflow API error: {response.text[:500]}"
+                    )
+
+                if response.status_code == 429:
+                    self.stats_counters['rate_limited'] += 1
+                    retry_after = _parse_retry_after(response.headers.get('retry-after'))
+                logger.warning(f"Remote returned {response.status_code} (attempt {attempt + 1}/{attempts})")
+
+            self.stats_counters['retries'] += 1
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+        raise RemoteInferenceError(503, "Detection service unavailable after retries")
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        """Full jitter: uniform(0, min(max, base * 2^attempt)), at least Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    async def ping(self, url: str, timeout: float = 5.0) -> bool:
+        """True if `url` answers 200 (uses the shared pool)"""
+        await self.start()
+        try:
+            response = await self._client.get(url, timeout=timeout)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def stats(self) -> dict:
+        stats = dict(self.stats_counters)
+        done = stats['succeeded'] + stats['failed']
+        stats['average_time'] = stats['total_time'] / done if done else 0.0
+        stats['max_concurrency'] = self.max_concurrency
+        return stats
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,120 @@
+"""
+Suggestion Index for Family Store Vision Service
+
+Precomputes category and brand indexes (and a ranked "similar products" list
+per class) when the catalog loads, so building fallback suggestions costs
+O(limit) per request instead of several scans over the whole catalog.
+
+Shared by app.py, vision_service.py and app_old.py; each service formats
+the returned class names into its own suggestion dicts.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+REASON_CATEGORY = 'category'
+REASON_BRAND = 'brand'
+REASON_OTHER = 'other'
+
+
+class SuggestionIndex:
+    """
+    Ranked top-k suggestion lists over a {class_name: info} catalog
+
+    Within each list products keep catalog order. Rebuilding swaps in a new
+    index in one assignment, so lookups never see a half-built state.
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, dict]] = (), max_k: int = 10):
+        self.max_k = max_k
+        self._state = None
+        self.rebuild(items)
+
+    def rebuild(self, items: Iterable[Tuple[str, dict]]):
+        """Recompute all indexes from (class_name, info) pairs"""
+        order: List[str] = []
+        info: Dict[str, dict] = {}
+        by_category: Dict[str, List[str]] = {}
+        by_brand: Dict[str, List[str]] = {}
+
+        for class_name, entry in items:
+            order.append(class_name)
+            info[class_name] = entry
+            by_category.setdefault(entry.get('category'), []).append(class_name)
+            if entry.get('brand'):
+                by_brand.setdefault(entry['brand'], []).append(class_name)
+
+        similar: Dict[str, List[Tuple[str, str]]] = {}
+        for class_name in order:
+            entry = info[class_name]
+            ranked = []
+            seen = {class_name}
+
+            for other in by_category.get(entry.get('category'), ()):
+                if len(ranked) >= self.max_k:
+                    break
+                if other not in seen:
+                    ranked.append((other, REASON_CATEGORY))
+                    seen.add(other)
+
+            for other in by_brand.get(entry.get('brand'), ()) if entry.get('brand') else ():
+                if len(ranked) >= self.max_k:
+                    break
+                if other not in seen:
+                    ranked.append((other, REASON_BRAND))
+                    seen.add(other)
+
+            similar[class_name] = ranked
+
+        category_sets = {c: set(members) for c, members in by_category.items()}
+        self._state = (order, info, by_category, category_sets, similar)
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def info(self, class_name: str) -> Optional[dict]:
+        return self._state[1].get(class_name)
+
+    def similar(self, class_name: str, limit: int, fill: bool = False) -> List[Tuple[str, str]]:
+        """
+        Products related to `class_name`: same category first, then same brand
+
+        With `fill`, pads the list with other products up to `limit`.
+        Does not include `class_name` itself.
+        """
+        order, _, _, _, similar = self._state
+        ranked = similar.get(class_name, [])[:limit]
+
+        if fill and len(ranked) < limit:
+            seen = {class_name, *(c for c, _ in ranked)}
+            for other in order:
+                if len(ranked) >= limit:
+                    break
+                if other not in seen:
+                    ranked.append((other, REASON_OTHER))
+        return ranked
+
+    def browse(self, limit: int, category: Optional[str] = None) -> List[Tuple[str, bool]]:
+        """
+        Up to `limit` products, those in `category` first
+
+        Returns (class_name, in_category) pairs. At most len(category) + limit
+        entries are looked at, whatever the catalog size.
+        """
+        order, _, by_category, category_sets, _ = self._state
+        picked = []
+
+        if category is not None:
+            members = by_category.get(category, [])
+            picked = [(c, True) for c in members[:limit]]
+            if len(picked) >= limit:
+                return picked
+            skip = category_sets.get(category, ())
+        else:
+            skip = ()
+
+        for class_name in order:
+            if len(picked) >= limit:
+                break
+            if class_name not in skip:
+                picked.append((class_name, False))
+        return picked
@@ -0,0 +1,112 @@
+"""
+Tiled Inference Helpers for Family Store Vision Service
+
+Small items (e.g. great_taste sachets spread on the counter) shrink below
+what the model can see once a large frame is downscaled to 640. Splitting the
+frame into overlapping tiles keeps them at native resolution; the tiles run
+through the model as one batch and the boxes are merged back into
+full-image coordinates with a cross-tile NMS. Items too big for any tile come
+from a downscaled full-frame pass, merged in separately (merge_full_frame).
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+Tile = Tuple[int, int, int, int]  # x1, y1, x2, y2 in full-image pixels
+
+
+def _axis_starts(length: int, tile: int, stride: int) -> List[int]:
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)  # last tile flush with the edge
+    return starts
+
+
+def make_tiles(width: int, height: int, tile_size: int = 640, overlap: float = 0.2) -> List[Tile]:
+    """Overlapping tile grid covering the whole image"""
+    if not 0 <= overlap < 1:
+        raise ValueError("overlap must be in [0, 1)")
+
+    stride = max(1, int(tile_size * (1 - overlap)))
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in _axis_starts(height, tile_size, stride)
+        for x in _axis_starts(width, tile_size, stride)
+    ]
+
+
+def _overlap(box: np.ndarray, boxes: np.ndarray, metric: str = 'ios') -> np.ndarray:
+    """Overlap of one box with each of `boxes`, by 'iou' or 'ios'"""
+    ix1 = np.maximum(box[0], boxes[:, 0])
+    iy1 = np.maximum(box[1], boxes[:, 1])
+    ix2 = np.minimum(box[2], boxes[:, 2])
+    iy2 = np.minimum(box[3], boxes[:, 3])
+    inter = np.maximum(0, ix2 - ix1) * np.maximum(0, iy2 - iy1)
+
+    area = max(0.0, box[2] - box[0]) * max(0.0, box[3] - box[1])
+    areas = np.maximum(0, boxes[:, 2] - boxes[:, 0]) * np.maximum(0, boxes[:, 3] - boxes[:, 1])
+    if metric == 'iou':
+        denom = area + areas - inter
+    else:
+        denom = np.minimum(area, areas)
+    return inter / np.maximum(denom, 1e-9)
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray,
+        threshold: float = 0.5, metric: str = 'ios') -> List[int]:
+    """
+    Class-aware non-maximum suppression
+
+    `metric` is 'iou' (intersection over union) or 'ios' (intersection over
+    the smaller box). IoS also removes the clipped half-box a neighbouring
+    tile sees of an item that sits on a tile edge.
+
+    Returns the indexes of the boxes to keep, highest score first.
+    """
+    if len(boxes) == 0:
+        return []
+
+    order = np.argsort(-scores)
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(int(i))
+        rest = order[1:]
+
+        overlap = _overlap(boxes[i], boxes[rest], metric)
+        suppressed = (overlap > threshold) & (classes[rest] == classes[i])
+        order = rest[~suppressed]
+
+    return keep
+
+
+def merge_full_frame(tile_boxes: np.ndarray, tile_classes: np.ndarray,
+                     full_boxes: np.ndarray, full_scores: np.ndarray, full_classes: np.ndarray,
+                     min_size: int, threshold: float = 0.5) -> Tuple[List[int], List[int]]:
+    """
+    Add the full-frame pass to already merged tile boxes
+
+    Only full-frame boxes wider or taller than `min_size` (the tile size) are
+    used: smaller items are left to the tiles, so the full frame's coarse
+    view - one box over a cluster of sachets - can't override them. No tile
+    sees a bigger item whole, so such a box is kept and replaces the
+    same-class tile boxes lying mostly inside it (the clipped pieces).
+
+    Returns (tile indexes to keep, full-frame indexes to keep).
+    """
+    tile_keep = np.ones(len(tile_boxes), dtype=bool)
+    full_keep = []
+
+    for i in np.argsort(-full_scores):
+        box = full_boxes[i]
+        if max(box[2] - box[0], box[3] - box[1]) <= min_size:
+            continue
+        if len(tile_boxes):
+            pieces = (tile_classes == full_classes[i]) & (_overlap(box, tile_boxes, 'ios') > threshold)
+            tile_keep &= ~pieces
+        full_keep.append(int(i))
+
+    return [int(i) for i in np.flatnonzero(tile_keep)], full_keep
@@ -0,0 +1,140 @@
+"""
+Validation Set Helpers for the offline vision-service tools
+
+Reads a YOLO dataset (data.yaml + images/ and labels/ dirs), runs the model
+over it and matches predictions to ground-truth boxes the way ultralytics'
+confusion matrix does: greedy by confidence, one prediction per truth box,
+IoU >= 0.5 regardless of class.
+
+Used by build_embeddings.py and build_confusion.py.
+"""
+
+import glob
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+IMG_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+Box = Tuple[float, float, float, float]  # x1, y1, x2, y2 in pixels
+
+
+def list_images(folder: str) -> List[str]:
+    return sorted(
+        path for path in glob.glob(os.path.join(folder, '**', '*'), recursive=True)
+        if path.lower().endswith(IMG_EXTENSIONS)
+    )
+
+
+def load_dataset(data_yaml: str) -> Tuple[Dict[int, str], str, dict]:
+    """(class names by id, dataset root, raw data.yaml)"""
+    import yaml
+
+    with open(data_yaml) as f:
+        data = yaml.safe_load(f)
+
+    names = data['names']
+    if isinstance(names, list):
+        names = dict(enumerate(names))
+    base = data.get('path') or os.path.dirname(os.path.abspath(data_yaml))
+    return names, base, data
+
+
+def label_path_for(image_path: str) -> str:
+    return os.path.splitext(
+        image_path.replace(f'{os.sep}images{os.sep}', f'{os.sep}labels{os.sep}')
+    )[0] + '.txt'
+
+
+def iter_labeled_images(data_yaml: str, splits: List[str]) -> Iterator[Tuple[str, np.ndarray, List[Tuple[str, Box]]]]:
+    """(path, image, [(class_name, box), ...]) for every labeled image in the splits"""
+    names, base, data = load_dataset(data_yaml)
+
+    for split in splits:
+        if not data.get(split):
+            continue
+        for path in list_images(os.path.join(base, data[split])):
+            label_path = label_path_for(path)
+            if not os.path.exists(label_path):
+                continue
+            img = cv2.imread(path)
+            if img is None:
+                continue
+
+            h, w = img.shape[:2]
+            labels = []
+            with open(label_path) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) < 5:
+                        continue
+                    cx, cy, bw, bh = (float(v) for v in parts[1:5])
+                    labels.append((names[int(parts[0])], (
+                        (cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h
+                    )))
+            yield path, img, labels
+
+
+def predict(model, img: np.ndarray, conf: float) -> List[Tuple[str, float, Box]]:
+    """(class_name, confidence, box) for every prediction on one image"""
+    predictions = []
+    for result in model(img, conf=conf, verbose=False):
+        if result.boxes is None:
+            continue
+        for box in result.boxes:
+            predictions.append((
+                result.names[int(box.cls[0])],
+                float(box.conf[0]),
+                tuple(box.xyxy[0].tolist()),
+            ))
+    return predictions
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes -> (N, M)"""
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.maximum(0, ix2 - ix1) * np.maximum(0, iy2 - iy1)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def match_predictions(truth: List[Tuple[str, Box]], predictions: List[Tuple[str, float, Box]],
+                      iou_threshold: float = 0.5) -> List[Tuple[Optional[str], Optional[str], Optional[float]]]:
+    """
+    Pair predictions with truth boxes
+
+    Returns (true_class, predicted_class, confidence) triples; true_class is
+    None for a false positive on background, predicted_class/confidence are
+    None for a missed truth box.
+    """
+    if not predictions:
+        return [(cls, None, None) for cls, _ in truth]
+    if not truth:
+        return [(None, cls, conf) for cls, conf, _ in predictions]
+
+    ious = box_iou(
+        np.array([box for _, box in truth], dtype=np.float32),
+        np.array([box for _, _, box in predictions], dtype=np.float32),
+    )
+
+    matched_truth = set()
+    pairs = []
+    for p in sorted(range(len(predictions)), key=lambda i: -predictions[i][1]):
+        pred_cls, conf, _ = predictions[p]
+        candidates = [t for t in np.argsort(-ious[:, p]) if t not in matched_truth and ious[t, p] >= iou_threshold]
+        if candidates:
+            t = int(candidates[0])
+            matched_truth.add(t)
+            pairs.append((truth[t][0], pred_cls, conf))
+        else:
+            pairs.append((None, pred_cls, conf))
+
+    pairs.extend((truth[t][0], None, None) for t in range(len(truth)) if t not in matched_truth)
+    return pairs
@@ -0,0 +1,126 @@
+"""
+Frame sources shared by yolo_detect.py and the vision service's camera mode
+
+A source spec is what --source takes: an image file ("test.jpg"), an image
+folder ("test_dir"), a video file ("testvid.mp4"), a USB camera ("usb0") or
+a Picamera ("picamera0"). FrameSource opens one and hands out raw BGR frames.
+"""
+
+import glob
+import os
+
+import cv2
+import numpy as np
+
+img_ext_list = ['.jpg','.JPG','.jpeg','.JPEG','.png','.PNG','.bmp','.BMP']
+vid_ext_list = ['.avi','.mov','.mp4','.mkv','.wmv']
+
+LIVE_SOURCE_TYPES = ['usb', 'picamera']
+
+
+class SourceError(ValueError):
+    """A source spec that can't be used; the message is meant for the user"""
+
+
+def parse_source(spec):
+    """Work out what kind of source a spec is -> (source_type, index of USB/Picamera or None)"""
+    if os.path.isdir(spec):
+        return 'folder', None
+    elif os.path.isfile(spec):
+        _, ext = os.path.splitext(spec)
+        if ext in img_ext_list:
+            return 'image', None
+        elif ext in vid_ext_list:
+            return 'video', None
+        raise SourceError(f'File extension {ext} is not supported.')
+    elif 'usb' in spec:
+        return 'usb', int(spec[3:])
+    elif 'picamera' in spec:
+        return 'picamera', int(spec[8:])
+    raise SourceError(f'Input {spec} is invalid. Please try again.')
+
+
+def list_images(folder):
+    """Image files directly inside a folder"""
+    imgs_list = []
+    for file in glob.glob(folder + '/*'):
+        _, file_ext = os.path.splitext(file)
+        if file_ext in img_ext_list:
+            imgs_list.append(file)
+    return imgs_list
+
+
+class FrameSource:
+    """
+    One opened source; read() returns the next raw BGR frame, or None once
+    the source has ended (see `end_reason`)
+
+    Args:
+        spec: source spec, see parse_source()
+        resolution: (width, height) to ask cameras for; required for Picamera
+    """
+
+    def __init__(self, spec, resolution=None):
+        self.spec = spec
+        self.source_type, self.index = parse_source(spec)
+        self.live = self.source_type in LIVE_SOURCE_TYPES
+        self.end_reason = None
+        self.imgs_list = None
+        self.cap = None
+        self._next_image = 0
+
+        if self.source_type == 'image':
+            self.imgs_list = [spec]
+        elif self.source_type == 'folder':
+            self.imgs_list = list_images(spec)
+        elif self.source_type == 'video' or self.source_type == 'usb':
+            self.cap = cv2.VideoCapture(spec if self.source_type == 'video' else self.index)
+
+            # Set camera or video resolution if specified by user
+            if resolution:
+                self.cap.set(3, resolution[0])
+                self.cap.set(4, resolution[1])
+        elif self.source_type == 'picamera':
+            if not resolution:
+                raise SourceError('Please specify resolution to capture Picamera frames at.')
+            from picamera2 import Picamera2
+            self.cap = Picamera2()
+            self.cap.configure(self.cap.create_video_configuration(main={"format": 'XRGB8888', "size": resolution}))
+            self.cap.start()
+
+    def read(self):
+        if self.source_type == 'image' or self.source_type == 'folder':
+            while self._next_image < len(self.imgs_list):
+                frame = cv2.imread(self.imgs_list[self._next_image])
+                self._next_image += 1
+                if frame is not None:
+                    return frame
+            self.end_reason = 'All images have been processed.'
+            return None
+
+        elif self.source_type == 'video': # If source is a video, load next frame from video file
+            ret, frame = self.cap.read()
+            if not ret:
+                self.end_reason = 'Reached end of the video file.'
+                return None
+
+        elif self.source_type == 'usb': # If source is a USB camera, grab frame from camera
+            ret, frame = self.cap.read()
+            if (frame is None) or (not ret):
+                self.end_reason = 'Unable to read frames from the camera. This indicates the camera is disconnected or not working.'
+                return None
+
+        elif self.source_type == 'picamera': # If source is a Picamera, grab frames using picamera interface
+            frame_bgra = self.cap.capture_array()
+            if (frame_bgra is None):
+                self.end_reason = 'Unable to read frames from the Picamera. This indicates the camera is disconnected or not working.'
+                return None
+            frame = cv2.cvtColor(np.copy(frame_bgra), cv2.COLOR_BGRA2BGR)
+
+        return frame
+
+    def release(self):
+        if self.source_type == 'video' or self.source_type == 'usb':
+            self.cap.release()
+        elif self.source_type == 'picamera':
+            self.cap.stop()
@@ -15,8 +15,12 @@ import logging
 from datetime import datetime
 from typing import List, Optional
 import io
+import os
 from PIL import Image
 
+from catalog import ProductCatalog
+from suggestions import SuggestionIndex
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -65,6 +69,18 @@ PRODUCT_CLASSES = {
     # Add more products as you train them
 }
 
+# Prices, stock and real barcodes come from the POS database snapshot when set
+catalog = ProductCatalog(
+    static=PRODUCT_CLASSES,
+    snapshot_path=os.getenv("VISION_CATALOG_SNAPSHOT"),
+    class_map_path=os.getenv("VISION_CLASS_MAP"),
+    refresh_interval=float(os.getenv("VISION_CATALOG_REFRESH_S", "30")),
+)
+
+SUGGESTION_LIMIT = 10
+suggestion_index = SuggestionIndex(max_k=SUGGESTION_LIMIT)
+catalog.add_listener(lambda c: suggestion_index.rebuild(c.items()))
+
 # Request/Response Models
 class DetectionRequest(BaseModel):
     image: str  # Base64 encoded image
@@ -81,6 +97,8 @@ class Detection(BaseModel):
     barcode: str
     confidence: float
     bbox: BoundingBox
+    price: Optional[float] = None
+    unit_id: Optional[int] = None
 
 class DetectionResponse(BaseModel):
     success: bool
@@ -165,7 +183,7 @@ def preprocess_image(img: np.ndarray, target_size: int = 640) -> np.ndarray:
 
 def map_detection_to_product(class_name: str, confidence: float) -> Optional[Detection]:
     """Map YOLO detection to product information"""
-    product_info = PRODUCT_CLASSES.get(class_name)
+    product_info = catalog.get(class_name)
     
     if not product_info:
         logger.warning(f"Unknown class detected: {class_name}")
@@ -175,7 +193,9 @@ def map_detection_to_product(class_name: str, confidence: float) -> Optional[Det
         'class_name': class_name,
         'product_name': product_info['name'],
         'barcode': product_info['barcode'],
-        'confidence': confidence
+        'confidence': confidence,
+        'price': product_info.get('price'),
+        'unit_id': product_info.get('unit_id')
     }
 
 # API Endpoints
@@ -187,6 +207,8 @@ async def startup_event():
     logger.info("🚀 Starting YOLO11 Vision Service for Family Store POS")
     logger.info("=" * 60)
     
+    catalog.start()
+    
     if not load_model():
         logger.error("Failed to initialize model!")
     else:
@@ -202,7 +224,8 @@ async def root():
         "version": "1.0.0",
         "model": "YOLO11 Nano (Ultralytics 2026)",
         "status": "online" if model is not None else "model not loaded",
-        "supported_products": len(PRODUCT_CLASSES),
+        "supported_products": len(catalog),
+        "catalog_version": catalog.version,
         "confidence_threshold": CONFIDENCE_THRESHOLD
     }
 
@@ -271,7 +294,9 @@ async def detect_products(request: DetectionRequest):
                             product_name=product_info['product_name'],
                             barcode=product_info['barcode'],
                             confidence=confidence,
-                            bbox=BoundingBox(x1=x1, y1=y1, x2=x2, y2=y2)
+                            bbox=BoundingBox(x1=x1, y1=y1, x2=x2, y2=y2),
+                            price=product_info['price'],
+                            unit_id=product_info['unit_id']
                         )
                         
                         detections.append(detection)
@@ -353,12 +378,15 @@ async def get_supported_products():
         {
             "class": class_name,
             "name": info['name'],
-            "barcode": info['barcode']
+            "barcode": info['barcode'],
+            "price": info.get('price'),
+            "unit_id": info.get('unit_id')
         }
-        for class_name, info in PRODUCT_CLASSES.items()
+        for class_name, info in catalog.items()
     ]
     
     return {
+        "catalog_version": catalog.version,
         "total": len(products),
         "products": products
     }
@@ -373,34 +401,34 @@ async def get_model_info():
         "model_type": "YOLO11 Nano",
         "framework": "Ultralytics",
         "version": "2026 Release",
-        "classes": list(PRODUCT_CLASSES.keys()),
-        "num_classes": len(PRODUCT_CLASSES),
+        "classes": catalog.keys(),
+        "num_classes": len(catalog),
         "input_size": 640,
         "confidence_threshold": CONFIDENCE_THRESHOLD,
         "iou_threshold": IOU_THRESHOLD
     }
 
 # Helper function for suggestions
-def get_all_products_as_suggestions():
-    """Return all products as suggestions"""
-    return [
-        {
+def get_all_products_as_suggestions(limit: int = SUGGESTION_LIMIT):
+    """Return products as suggestions, up to `limit`"""
+    suggestions = []
+    for class_name, _ in suggestion_index.browse(limit):
+        info = suggestion_index.info(class_name)
+        suggestions.append({
             "name": info['name'],
             "barcode": info['barcode'],
+            "price": info.get('price'),
             "class": class_name
-        }
-        for class_name, info in PRODUCT_CLASSES.items()
-    ]
+        })
+    return suggestions
 
 def get_similar_products(detected_class: str, limit: int = 3):
-    """Get similar products for suggestions"""
-    # Simple implementation - return a few random products
-    # You can enhance this with similarity logic
+    """Get similar products for suggestions (same category, then same brand)"""
     suggestions = []
     
     # Add the detected product first
-    if detected_class in PRODUCT_CLASSES:
-        info = PRODUCT_CLASSES[detected_class]
+    info = suggestion_index.info(detected_class)
+    if info is not None:
         suggestions.append({
             "name": info['name'],
             "barcode": info['barcode'],
@@ -408,17 +436,15 @@ def get_similar_products(detected_class: str, limit: int = 3):
             "suggested": True
         })
     
-    # Add a few other products
-    count = 0
-    for class_name, info in PRODUCT_CLASSES.items():
-        if class_name != detected_class and count < limit - 1:
-            suggestions.append({
-                "name": info['name'],
-                "barcode": info['barcode'],
-                "class": class_name,
-                "suggested": False
-            })
-            count += 1
+    # Then the closest other products
+    for class_name, _ in suggestion_index.similar(detected_class, limit - 1, fill=True):
+        info = suggestion_index.info(class_name)
+        suggestions.append({
+            "name": info['name'],
+            "barcode": info['barcode'],
+            "class": class_name,
+            "suggested": False
+        })
     
     return suggestions
 
@@ -1,21 +1,24 @@
 import os
 import sys
 import argparse
-import glob
-import time
+import itertools
+import threading
 
 import cv2
-import numpy as np
 from ultralytics import YOLO
 
+from frame_pipeline import AsyncVideoWriter, FrameQueue, StageMeter
+from video_sources import FrameSource, SourceError, parse_source
+
 # Define and parse user input arguments
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--model', help='Path to YOLO model file (example: "runs/detect/train/weights/best.pt")',
                     required=True)
 parser.add_argument('--source', help='Image source, can be image file ("test.jpg"), \
-                    image folder ("test_dir"), video file ("testvid.mp4"), or index of USB camera ("usb0")', 
-                    required=True)
+                    image folder ("test_dir"), video file ("testvid.mp4"), or index of USB camera ("usb0"). \
+                    Give several (example: "--source usb0 usb1") to run them together, batched into one model call per round', 
+                    nargs='+', action='extend', required=True)
 parser.add_argument('--thresh', help='Minimum confidence threshold for displaying detected objects (example: "0.4")',
                     default=0.5)
 parser.add_argument('--resolution', help='Resolution in WxH to display inference results at (example: "640x480"), \
@@ -23,14 +26,44 @@ parser.add_argument('--resolution', help='Resolution in WxH to display inference
                     default=None)
 parser.add_argument('--record', help='Record results from video or webcam and save it as "demo1.avi". Must specify --resolution argument to record.',
                     action='store_true')
+parser.add_argument('--record-streams', help='What --record saves: "annotated" (demo1.avi), "raw" frames without boxes (demo1_raw.avi), or "both"',
+                    choices=['annotated', 'raw', 'both'], default='annotated')
+parser.add_argument('--record-policy', help='When the video encoder falls behind: "drop" the oldest buffered frames or "block" until it catches up',
+                    choices=['drop', 'block'], default='drop')
+parser.add_argument('--record-queue', help='Frames buffered for the video encoder (example: "64")',
+                    type=int, default=64)
+parser.add_argument('--queue-size', help='Frames buffered between capture, inference and display; live cameras keep only the newest frame for inference (example: "2")',
+                    type=int, default=2)
+parser.add_argument('--batch', help='Headless batch mode for image folders and video files: no window, results go to --output',
+                    action='store_true')
+parser.add_argument('--benchmark', help='Headless benchmark: time capture, preprocess, inference, postprocess and draw separately and write a JSON report',
+                    action='store_true')
+parser.add_argument('--bench-frames', help='Benchmark this many frames (default: 300 unless --bench-seconds is given)',
+                    type=int, default=None)
+parser.add_argument('--bench-seconds', help='Benchmark for this many seconds',
+                    type=float, default=None)
+parser.add_argument('--bench-warmup', help='Frames run before timing starts (example: "10")',
+                    type=int, default=10)
+parser.add_argument('--bench-report', help='Where to write the benchmark report (example: "benchmark.json")',
+                    default='benchmark.json')
+parser.add_argument('--batch-size', help='Images per inference call in batch mode (example: "16")',
+                    type=int, default=16)
+parser.add_argument('--workers', help='Threads decoding images and writing annotated copies in batch mode (example: "4")',
+                    type=int, default=4)
+parser.add_argument('--output', help='Batch mode results file, JSONL or CSV by extension (example: "labels.csv"). \
+                    Re-running with the same file resumes where it stopped',
+                    default='results.jsonl')
+parser.add_argument('--annotate', help='Batch mode: also save annotated images to this folder (example: "annotated")',
+                    default=None)
+
 
 args = parser.parse_args()
 
 
 # Parse user inputs
 model_path = args.model
-img_source = args.source
-min_thresh = args.thresh
+img_sources = args.source
+min_thresh = float(args.thresh)
 user_res = args.resolution
 record = args.record
 
@@ -43,30 +76,14 @@ if (not os.path.exists(model_path)):
 model = YOLO(model_path, task='detect')
 labels = model.names
 
-# Parse input to determine if image source is a file, folder, video, or USB camera
-img_ext_list = ['.jpg','.JPG','.jpeg','.JPEG','.png','.PNG','.bmp','.BMP']
-vid_ext_list = ['.avi','.mov','.mp4','.mkv','.wmv']
-
-if os.path.isdir(img_source):
-    source_type = 'folder'
-elif os.path.isfile(img_source):
-    _, ext = os.path.splitext(img_source)
-    if ext in img_ext_list:
-        source_type = 'image'
-    elif ext in vid_ext_list:
-        source_type = 'video'
-    else:
-        print(f'File extension {ext} is not supported.')
-        sys.exit(0)
-elif 'usb' in img_source:
-    source_type = 'usb'
-    usb_idx = int(img_source[3:])
-elif 'picamera' in img_source:
-    source_type = 'picamera'
-    picam_idx = int(img_source[8:])
-else:
-    print(f'Input {img_source} is invalid. Please try again.')
+# Parse inputs to determine if each image source is a file, folder, video, or USB camera
+try:
+    source_types = [parse_source(img_source)[0] for img_source in img_sources]
+except SourceError as e:
+    print(e)
     sys.exit(0)
+single_source = len(img_sources) == 1
+img_source, source_type = img_sources[0], source_types[0]
 
 # Parse user-specified display resolution
 resize = False
@@ -76,6 +93,9 @@ if user_res:
 
 # Check if recording is valid and set up recording
 if record:
+    if not single_source:
+        print('Recording only works with a single source. Please try again.')
+        sys.exit(0)
     if source_type not in ['video','usb']:
         print('Recording only works for video and camera sources. Please try again.')
         sys.exit(0)
@@ -83,117 +103,60 @@ if record:
         print('Please specify resolution to record video at.')
         sys.exit(0)
     
-    # Set up recording
+    # Set up recording; encoding runs on background threads so it never stalls the display loop
     record_name = 'demo1.avi'
+    record_raw_name = 'demo1_raw.avi'
     record_fps = 30
-    recorder = cv2.VideoWriter(record_name, cv2.VideoWriter_fourcc(*'MJPG'), record_fps, (resW,resH))
-
-# Load or initialize image source
-if source_type == 'image':
-    imgs_list = [img_source]
-elif source_type == 'folder':
-    imgs_list = []
-    filelist = glob.glob(img_source + '/*')
-    for file in filelist:
-        _, file_ext = os.path.splitext(file)
-        if file_ext in img_ext_list:
-            imgs_list.append(file)
-elif source_type == 'video' or source_type == 'usb':
-
-    if source_type == 'video': cap_arg = img_source
-    elif source_type == 'usb': cap_arg = usb_idx
-    cap = cv2.VideoCapture(cap_arg)
-
-    # Set camera or video resolution if specified by user
-    if user_res:
-        ret = cap.set(3, resW)
-        ret = cap.set(4, resH)
-
-elif source_type == 'picamera':
-    from picamera2 import Picamera2
-    cap = Picamera2()
-    cap.configure(cap.create_video_configuration(main={"format": 'XRGB8888', "size": (resW, resH)}))
-    cap.start()
+    recorder = raw_recorder = None
+    if args.record_streams in ['annotated', 'both']:
+        recorder = AsyncVideoWriter(record_name, record_fps, (resW,resH), args.record_queue, args.record_policy)
+    if args.record_streams in ['raw', 'both']:
+        raw_recorder = AsyncVideoWriter(record_raw_name, record_fps, (resW,resH), args.record_queue, args.record_policy)
+    recorders = [r for r in (recorder, raw_recorder) if r is not None]
+
+# Check if batch and benchmark modes are valid
+if (args.batch or args.benchmark) and not single_source:
+    print('Batch and benchmark modes take a single source. Please try again.')
+    sys.exit(0)
+if (args.batch or args.benchmark) and record:
+    print('Recording is not available in batch or benchmark mode. Please try again.')
+    sys.exit(0)
+if args.batch and source_type not in ['image','folder','video']:
+    print('Batch mode only works for image, folder and video sources. Please try again.')
+    sys.exit(0)
+
+# Load or initialize image sources
+try:
+    sources = [FrameSource(spec, (resW, resH) if resize else None) for spec in img_sources]
+except SourceError as e:
+    print(e)
+    sys.exit(0)
 
 # Set bounding box colors (using the Tableu 10 color scheme)
 bbox_colors = [(164,120,87), (68,148,228), (93,97,209), (178,182,133), (88,159,106), 
               (96,202,231), (159,124,168), (169,162,241), (98,118,150), (172,176,184)]
 
-# Initialize control and status variables
-avg_frame_rate = 0
-frame_rate_buffer = []
-fps_avg_len = 200
-img_count = 0
-
-# Begin inference loop
-while True:
-
-    t_start = time.perf_counter()
-
-    # Load frame from image source
-    if source_type == 'image' or source_type == 'folder': # If source is image or image folder, load the image using its filename
-        if img_count >= len(imgs_list):
-            print('All images have been processed. Exiting program.')
-            sys.exit(0)
-        img_filename = imgs_list[img_count]
-        frame = cv2.imread(img_filename)
-        img_count = img_count + 1
-    
-    elif source_type == 'video': # If source is a video, load next frame from video file
-        ret, frame = cap.read()
-        if not ret:
-            print('Reached end of the video file. Exiting program.')
-            break
-    
-    elif source_type == 'usb': # If source is a USB camera, grab frame from camera
-        ret, frame = cap.read()
-        if (frame is None) or (not ret):
-            print('Unable to read frames from the camera. This indicates the camera is disconnected or not working. Exiting program.')
-            break
-
-    elif source_type == 'picamera': # If source is a Picamera, grab frames using picamera interface
-        frame_bgra = cap.capture_array()
-        frame = cv2.cvtColor(np.copy(frame_bgra), cv2.COLOR_BGRA2BGR)
-        if (frame is None):
-            print('Unable to read frames from the Picamera. This indicates the camera is disconnected or not working. Exiting program.')
-            break
-
-    # Resize frame to desired display resolution
-    if resize == True:
-        frame = cv2.resize(frame,(resW,resH))
-
-    # Run inference on frame
-    results = model(frame, verbose=False)
-
-    # Extract results
-    detections = results[0].boxes
-
-    # Initialize variable for basic object counting example
+def extract_detections(result):
+    """Pull (xmin, ymin, xmax, ymax, class index, confidence) rows out of one YOLO result"""
+    # Ultralytics returns results in Tensor format, which have to be converted to regular Python values
+    detections = result.boxes
+    xyxy = detections.xyxy.cpu().numpy().astype(int)
+    classes = detections.cls.cpu().numpy().astype(int)
+    confs = detections.conf.cpu().numpy()
+    return [(*xyxy[i], classes[i], float(confs[i])) for i in range(len(detections))]
+
+def draw_detections(frame, detections):
+    """Draw every detection above the confidence threshold; returns how many were drawn"""
     object_count = 0
-
-    # Go through each detection and get bbox coords, confidence, and class
-    for i in range(len(detections)):
-
-        # Get bounding box coordinates
-        # Ultralytics returns results in Tensor format, which have to be converted to a regular Python array
-        xyxy_tensor = detections[i].xyxy.cpu() # Detections in Tensor format in CPU memory
-        xyxy = xyxy_tensor.numpy().squeeze() # Convert tensors to Numpy array
-        xmin, ymin, xmax, ymax = xyxy.astype(int) # Extract individual coordinates and convert to int
-
-        # Get bounding box class ID and name
-        classidx = int(detections[i].cls.item())
-        classname = labels[classidx]
-
-        # Get bounding box confidence
-        conf = detections[i].conf.item()
+    for xmin, ymin, xmax, ymax, classidx, conf in detections:
 
         # Draw box if confidence threshold is high enough
-        if conf > 0.5:
+        if conf > min_thresh:
 
             color = bbox_colors[classidx % 10]
             cv2.rectangle(frame, (xmin,ymin), (xmax,ymax), color, 2)
 
-            label = f'{classname}: {int(conf*100)}%'
+            label = f'{labels[classidx]}: {int(conf*100)}%'
             labelSize, baseLine = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1) # Get font size
             label_ymin = max(ymin, labelSize[1] + 10) # Make sure not to draw label too close to top of window
             cv2.rectangle(frame, (xmin, label_ymin-labelSize[1]-10), (xmin+labelSize[0], label_ymin+baseLine-10), color, cv2.FILLED) # Draw white box to put label text in
@@ -202,48 +165,192 @@ while True:
             # Basic example: count the number of objects in the image
             object_count = object_count + 1
 
-    # Calculate and draw framerate (if using video, USB, or Picamera source)
-    if source_type == 'video' or source_type == 'usb' or source_type == 'picamera':
-        cv2.putText(frame, f'FPS: {avg_frame_rate:0.2f}', (10,20), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw framerate
-    
-    # Display detection results
-    cv2.putText(frame, f'Number of objects: {object_count}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw total number of detected objects
-    cv2.imshow('YOLO detection results',frame) # Display image
-    if record: recorder.write(frame)
+    return object_count
 
-    # If inferencing on individual images, wait for user keypress before moving to next image. Otherwise, wait 5ms before moving to next frame.
-    if source_type == 'image' or source_type == 'folder':
-        key = cv2.waitKey()
-    elif source_type == 'video' or source_type == 'usb' or source_type == 'picamera':
-        key = cv2.waitKey(5)
-    
+def handle_key(key, frame):
+    """React to a keypress in the results window; returns False to quit"""
     if key == ord('q') or key == ord('Q'): # Press 'q' to quit
-        break
+        return False
     elif key == ord('s') or key == ord('S'): # Press 's' to pause inference
         cv2.waitKey()
     elif key == ord('p') or key == ord('P'): # Press 'p' to save a picture of results on this frame
         cv2.imwrite('capture.png',frame)
-    
-    # Calculate FPS for this frame
-    t_stop = time.perf_counter()
-    frame_rate_calc = float(1/(t_stop - t_start))
-
-    # Append FPS result to frame_rate_buffer (for finding average FPS over multiple frames)
-    if len(frame_rate_buffer) >= fps_avg_len:
-        temp = frame_rate_buffer.pop(0)
-        frame_rate_buffer.append(frame_rate_calc)
+    return True
+
+# Headless batch mode: label the whole source without a window
+if args.batch:
+    from batch_mode import run_batch
+    run_batch(model, labels, source_type, img_source, sources[0].imgs_list, sources[0].cap,
+              args.output, args.batch_size, args.workers,
+              conf=min_thresh, resize=(resW, resH) if resize else None, annotate_dir=args.annotate,
+              extract=extract_detections, draw=draw_detections)
+    sources[0].release()
+    sys.exit(0)
+
+# Headless benchmark: time each step of the loop separately and write a JSON report
+if args.benchmark:
+    from benchmark_mode import run_benchmark
+    if source_type == 'image' or source_type == 'folder':
+        image_cycle = itertools.cycle(sources[0].imgs_list) # Loop over the images until enough frames are timed
+        grab = lambda: cv2.imread(next(image_cycle))
     else:
-        frame_rate_buffer.append(frame_rate_calc)
+        grab = sources[0].read
+    frames = args.bench_frames if args.bench_frames or args.bench_seconds else 300
+    run_benchmark(model, grab, extract_detections, draw_detections, frames=frames, seconds=args.bench_seconds,
+                  warmup=args.bench_warmup, resize=(resW, resH) if resize else None, report_path=args.bench_report,
+                  info={'model': model_path, 'source': img_source, 'source_type': source_type,
+                        'resolution': user_res})
+    sources[0].release()
+    sys.exit(0)
 
-    # Calculate average FPS for past frames
-    avg_frame_rate = np.mean(frame_rate_buffer)
+# A single image or image folder: one image at a time, wait for a keypress before moving to the next
+if single_source and (source_type == 'image' or source_type == 'folder'):
+    for img_filename in sources[0].imgs_list:
+        frame = cv2.imread(img_filename)
+        if resize == True:
+            frame = cv2.resize(frame,(resW,resH))
+
+        results = model(frame, verbose=False)
+        object_count = draw_detections(frame, extract_detections(results[0]))
+
+        cv2.putText(frame, f'Number of objects: {object_count}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw total number of detected objects
+        cv2.imshow('YOLO detection results',frame) # Display image
+        if not handle_key(cv2.waitKey(), frame):
+            break
+    else:
+        print('All images have been processed. Exiting program.')
+    cv2.destroyAllWindows()
+    sys.exit(0)
+
+# Everything else runs as a three-stage pipeline so camera I/O and display overlap
+# with inference instead of adding to it:
+#   capture thread per source -> capture_queues -> inference thread -> render_queue -> display (main thread)
+# The inference thread takes the next frame from every source that has one and runs
+# them through the model as one batch, so two cameras cost about one model call, then
+# hands each result back to its own window.
+# Live cameras get a one-slot capture queue that drops the older frame, so inference
+# always sees the newest one and what is shown is always recent; video files and
+# folders buffer --queue-size frames and block instead so every frame is processed.
+any_live = any(source.live for source in sources)
+capture_queues = [FrameQueue(1 if source.live else args.queue_size, drop_oldest=source.live) for source in sources]
+render_queue = FrameQueue(args.queue_size * len(sources), drop_oldest=any_live)
+frames_ready = threading.Event()
+stop_event = threading.Event()
+capture_meters = [StageMeter() for _ in sources]
+inference_meter = StageMeter()
+display_meters = [StageMeter() for _ in sources]
+inference_calls = 0
+
+if single_source:
+    window_names = ['YOLO detection results']
+else:
+    window_names = [f'YOLO detection results - {spec}' for spec in img_sources]
+
+def capture_stage(idx):
+    source = sources[idx]
+    while not stop_event.is_set():
+        frame = source.read()
+        if frame is None:
+            print(f'{source.end_reason} Exiting program.' if single_source else f'{source.spec}: {source.end_reason}')
+            break
+        if resize == True: # Resize frame to desired display resolution
+            frame = cv2.resize(frame,(resW,resH))
+        capture_meters[idx].tick()
+        if not capture_queues[idx].put(frame):
+            break
+        frames_ready.set()
+    capture_queues[idx].close()
+    frames_ready.set()
+
+def inference_stage():
+    global inference_calls
+    open_sources = set(range(len(sources)))
+    while open_sources and not stop_event.is_set():
+        frames_ready.wait(0.1)
+        frames_ready.clear()
+
+        # Next frame from every source that has one ready (the newest, for live cameras)
+        batch = []
+        for idx in sorted(open_sources):
+            try:
+                frame = capture_queues[idx].get(timeout=0)
+            except TimeoutError:
+                continue
+            if frame is None:
+                open_sources.discard(idx)
+                continue
+            batch.append((idx, frame))
+        if not batch:
+            continue
+
+        results = model([frame for _, frame in batch], verbose=False)
+        inference_calls += 1
+        for (idx, frame), result in zip(batch, results):
+            inference_meter.tick()
+            if not render_queue.put((idx, frame, extract_detections(result))):
+                return
+    render_queue.close()
+
+def pipeline_status():
+    capture = '/'.join(f'{meter.fps:0.1f}' for meter in capture_meters)
+    display = '/'.join(f'{meter.fps:0.1f}' for meter in display_meters)
+    queued = ' '.join(f'{len(queue)}/{queue.maxsize}' for queue in [*capture_queues, render_queue])
+    status = f'capture {capture} | inference {inference_meter.fps:0.1f} | display {display} | queued {queued}'
+    if record:
+        status += ' | recording ' + ' '.join(f'{len(r)}/{args.record_queue}' for r in recorders)
+    return status
+
+stages = [threading.Thread(target=capture_stage, args=(idx,), name=f'capture-{idx}', daemon=True)
+          for idx in range(len(sources))]
+stages.append(threading.Thread(target=inference_stage, name='inference', daemon=True))
+for stage in stages:
+    stage.start()
+
+# Display loop
+while True:
+    try:
+        item = render_queue.get(timeout=0.1)
+    except TimeoutError:
+        cv2.waitKey(1) # Keep the windows responsive while waiting on inference
+        continue
+    if item is None:
+        break
+
+    idx, frame, detections = item
+    if record and raw_recorder is not None: raw_recorder.write(frame.copy()) # Copy before boxes are drawn on it
+    object_count = draw_detections(frame, detections)
+    display_meters[idx].tick()
+
+    # Draw framerate, per-stage throughput and queue occupancy
+    cv2.putText(frame, f'FPS: {display_meters[idx].fps:0.2f}', (10,20), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw framerate
+    cv2.putText(frame, f'Number of objects: {object_count}', (10,40), cv2.FONT_HERSHEY_SIMPLEX, .7, (0,255,255), 2) # Draw total number of detected objects
+    cv2.putText(frame, pipeline_status(), (10,60), cv2.FONT_HERSHEY_SIMPLEX, .45, (0,255,255), 1)
+    cv2.imshow(window_names[idx],frame) # Display image
+    if record and recorder is not None: recorder.write(frame)
+
+    if not handle_key(cv2.waitKey(1), frame):
+        break
 
 
 # Clean up
-print(f'Average pipeline FPS: {avg_frame_rate:.2f}')
-if source_type == 'video' or source_type == 'usb':
-    cap.release()
-elif source_type == 'picamera':
-    cap.stop()
-if record: recorder.release()
+stop_event.set()
+for queue in [*capture_queues, render_queue]:
+    queue.close()
+for stage in stages:
+    stage.join(timeout=2)
+
+for spec, meter in zip(img_sources, display_meters):
+    print(f'Average pipeline FPS: {meter.fps:.2f}' if single_source else f'Average pipeline FPS ({spec}): {meter.fps:.2f}')
+print(f'Stage FPS: {pipeline_status()}')
+if inference_calls:
+    print(f'Model calls: {inference_calls} for {inference_meter.frames} frames ({inference_meter.frames / inference_calls:.2f} frames per call)')
+dropped = ', '.join(str(queue.dropped) for queue in capture_queues)
+print(f'Dropped frames: capture->inference {dropped}, inference->display {render_queue.dropped}')
+for source in sources:
+    source.release()
+if record:
+    for r in recorders:
+        r.close() # Finish encoding what is still queued
+        stats = r.stats()
+        print(f'Recorded {stats["written"]} frames to {stats["path"]} ({stats["dropped"]} dropped, encoder {stats["encoder_fps"]:.1f} FPS)')
 cv2.destroyAllWindows()